@@ -0,0 +1,1350 @@
+"""
+Load / performance checks for the mySettle backend.
+
+Each scenario boots its own uvicorn server in a background thread against the
+database given with --db (set before any srcs module is imported), so the
+numbers are comparable between configurations:
+
+    python benchmark.py dashboard --db sqlite:///bench.db
+    python benchmark.py dashboard --db sqlite://
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+import requests
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    CYAN = '\033[96m'
+    END = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def log(title: str, value: str = ""):
+    print(f"{Colors.CYAN}[bench]{Colors.END} {title} {Colors.BOLD}{value}{Colors.END}")
+
+
+def configure(db_url: str):
+    # Must run before srcs.config is imported anywhere
+    os.environ["DATABASE_URL"] = db_url
+    if db_url.startswith("sqlite:///"):
+        # Start every run from an empty file
+        db_file = db_url[len("sqlite:///"):]
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_file + suffix):
+                os.remove(db_file + suffix)
+
+
+def start_server():
+    """Runs main:app on a free port in a daemon thread, returns (base URL, uvicorn server)."""
+    import uvicorn
+    import main
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+def start_tile_server(delay: float = 0.0):
+    """
+    Local stand-in for the satellite tile provider on a free port, in a daemon
+    thread: serves a distinct noisy JPEG for any /{z}/{x}/{y}.jpg, each after
+    delay seconds (network latency). Returns (URL template, counters) where
+    counters["requests"] counts tile requests and counters["connections"] the
+    connections clients opened.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import numpy as np
+    from PIL import Image
+
+    counters = {"requests": 0, "connections": 0}
+    counters_lock = threading.Lock()
+
+    class TileHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            # One handler per connection, serving all of its keep-alive requests
+            super().setup()
+            with counters_lock:
+                counters["connections"] += 1
+
+        def do_GET(self):
+            z, x, y = (int(part) for part in self.path.strip("/").split(".")[0].split("/"))
+            with counters_lock:
+                counters["requests"] += 1
+            # Noise compresses about as badly as aerial imagery
+            rng = np.random.default_rng(hash((z, x, y)) & 0xFFFFFFFF)
+            time.sleep(delay)
+            buf = io.BytesIO()
+            Image.fromarray(rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)).save(buf, "JPEG", quality=40)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(buf.tell()))
+            self.end_headers()
+            self.wfile.write(buf.getvalue())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TileHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/{{z}}/{{x}}/{{y}}.jpg", counters
+
+
+# --- Fixtures ---
+
+SAMPLE_DRAFT = {
+    "weather": "Cerah",
+    "accident_time": "2025-01-01T10:00:00Z",
+    "road_surface": "Kering",
+    "road_type": "Jalan Bandar",
+    "location": "Jalan Tun Razak, Kuala Lumpur",
+    "description": "Kenderaan B melanggar bahagian belakang kenderaan A.",
+}
+SAMPLE_EVIDENCE = [
+    {"type": "PHOTO", "tag": "Car Front", "content": "aGVsbG8gd29ybGQ=" * 256},
+    {"type": "PHOTO", "tag": "Car Back", "content": "aGVsbG8gd29ybGQ=" * 256},
+]
+
+
+def open_case(http: requests.Session, base_url: str) -> tuple[str, str, str]:
+    """Login two drivers and create + join a session. Returns (session_id, driver A, driver B)."""
+    user_a, user_b = f"bench-a-{uuid.uuid4().hex[:8]}", f"bench-b-{uuid.uuid4().hex[:8]}"
+    for user_id in (user_a, user_b):
+        # The mock login hands out a limited set of profiles, seed users directly instead
+        seed_user(user_id)
+
+    res = http.post(f"{base_url}/session/create", params={"user_id": user_a})
+    res.raise_for_status()
+    created = res.json()
+    res = http.post(f"{base_url}/session/join", params={"otp": created["otp"], "user_id": user_b})
+    res.raise_for_status()
+    return created["session_id"], user_a, user_b
+
+
+def submit_draft(http: requests.Session, base_url: str, session_id: str, user_id: str) -> requests.Response:
+    return http.post(f"{base_url}/report/submit", json={
+        "session_id": session_id,
+        "user_id": user_id,
+        "evidences": SAMPLE_EVIDENCE,
+        "draft": SAMPLE_DRAFT,
+    })
+
+
+def create_case(http: requests.Session, base_url: str, submit_both: bool = True) -> str:
+    """Login two drivers, create + join a session and submit the drafts."""
+    session_id, user_a, user_b = open_case(http, base_url)
+
+    drivers = (user_a, user_b) if submit_both else (user_a,)
+    for user_id in drivers:
+        submit_draft(http, base_url, session_id, user_id).raise_for_status()
+    return session_id
+
+
+def seed_user(user_id: str):
+    from sqlmodel import Session
+    from srcs.database import engine
+    from srcs.models.user import User
+
+    with Session(engine) as db:
+        db.add(User(
+            id=user_id, name=f"Pemandu {user_id}", ic_no="900101-14-5566", car_plate="WXY 1234",
+            car_model="Perodua Myvi", insurance_policy="AXA-999-888", address="Kuala Lumpur",
+            phone_number="012-3456789", job="Engineer", license_number="L-900101145566",
+        ))
+        db.commit()
+
+
+def sample_details():
+    """A fully filled PoliceReportDetails, like generate_test_reports.py draws."""
+    from datetime import datetime
+    from srcs.models.report import PoliceReportDetails
+
+    return PoliceReportDetails(
+        id=1, session_id="bench-session", report_no="TRAFF/001/25",
+        balai_polis="Balai Polis Trafik Jalan Tun H.S. Lee", daerah="Kuala Lumpur", kontinjen="WPKL", tahun="2025",
+        tarikh_repot=datetime(2025, 12, 22, 10, 0), penerima_nama="Kpl 12345 Hassan", penerima_id="12345",
+        pengadu_nama="Ali Bin Abu", pengadu_ic="900101-14-5566", pengadu_alamat="No 1, Jalan Ampang, Kuala Lumpur",
+        pengadu_tel="012-3456789", pengadu_pekerjaan="Engineer",
+        tarikh_kejadian=datetime(2025, 12, 22, 8, 30), tempat_kejadian="Jalan Tun Razak, Kuala Lumpur",
+        jenis_kejadian="Kemalangan Jalan Raya", keterangan_kes=SAMPLE_DRAFT["description"] * 5,
+        pegawai_penyiasat_sketch="Insp. Johan",
+        kenderaan_a_no="WXY 1234", kenderaan_a_jenis="Perodua Myvi", pemandu_a_nama="Ali Bin Abu",
+        pemandu_a_ic="900101-14-5566", pemandu_a_lesen="L-900101145566",
+        kenderaan_b_no="VAB 5678", kenderaan_b_jenis="Honda City", pemandu_b_nama="Chong Wei",
+        pemandu_b_ic="880202-10-1122", pemandu_b_lesen="L-880202101122",
+        seksyen_kesalahan="Seksyen 43(1) APJ 1987", keputusan_awal="Kompaun",
+        catatan_keputusan="Pemandu B gagal mengawal jarak.", pegawai_penyiasat_nama="Insp. Johan",
+        pegawai_penyiasat_pangkat="Inspektor",
+    )
+
+
+# --- Scenarios ---
+
+def bench_dashboard(args):
+    """
+    /police/dashboard read throughput while /report/submit writes run in parallel.
+    """
+    configure(args.db)
+    base_url, _ = start_server()
+
+    log("Database", args.db)
+    log("Seeding cases", str(args.seed))
+    with requests.Session() as http:
+        for _ in range(args.seed):
+            create_case(http, base_url)
+
+    stop = threading.Event()
+    read_latencies, write_count, errors = [], [0], [0]
+    lock = threading.Lock()
+
+    def reader():
+        with requests.Session() as http:
+            while not stop.is_set():
+                start = time.perf_counter()
+                res = http.get(f"{base_url}/police/dashboard")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if res.status_code == 200:
+                        read_latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+
+    def writer():
+        with requests.Session() as http:
+            while not stop.is_set():
+                try:
+                    create_case(http, base_url)
+                    with lock:
+                        write_count[0] += 1
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    log("Readers / writers", f"{args.readers} / {args.writers}")
+    log("Dashboard reads/s", f"{len(read_latencies) / args.seconds:.1f}")
+    if read_latencies:
+        read_latencies.sort()
+        log("Dashboard p50 / p95 (ms)", f"{statistics.median(read_latencies) * 1000:.1f} / "
+                                        f"{read_latencies[int(len(read_latencies) * 0.95)] * 1000:.1f}")
+    log("Submitted cases/s", f"{write_count[0] / args.seconds:.1f}")
+    log("Errors", str(errors[0]))
+
+
+def bench_sse_latency(args):
+    """
+    Event-loop lag of the server while N SSE subscribers are connected and
+    /report/submit is hammered from worker threads. Any database call made on
+    the loop shows up directly as lag (and as late events for every subscriber).
+
+    The subscribers are spread over a number of slots, each holding an open
+    case. A writer submits both drivers' drafts of a slot's case, which closes
+    it, so the slot first gets a fresh case and its subscribers move over to it
+    when they see ALL_REPORTS_SUBMITTED. Any rejected submit fails the run.
+    """
+    import httpx
+
+    configure(args.db)
+    base_url, server = start_server()
+    server_loop = server.servers[0].get_loop()
+
+    # Every writer needs slots of its own, two writers must not submit to one case
+    n_slots = max(args.sessions, args.writers)
+    with requests.Session() as http:
+        slots = [open_case(http, base_url) for _ in range(n_slots)]
+
+    stop = threading.Event()
+    lag_samples, events_received, submits, failures = [], [0], [0], []
+
+    async def lag_probe():
+        interval = 0.01
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag_samples.append(time.perf_counter() - start - interval)
+
+    async def subscribers():
+        limits = httpx.Limits(max_connections=args.subscribers + 10)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+            async def listen(slot):
+                while not stop.is_set():
+                    session_id = slots[slot][0]
+                    async with client.stream("GET", f"/session/stream/{session_id}") as res:
+                        async for line in res.aiter_lines():
+                            if line.startswith("event:"):
+                                events_received[0] += 1
+                            if stop.is_set() or line.strip() == "event: ALL_REPORTS_SUBMITTED":
+                                break
+
+            tasks = [asyncio.create_task(listen(i % n_slots)) for i in range(args.subscribers)]
+            while not stop.is_set():
+                await asyncio.sleep(0.1)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def writer(worker_id):
+        own_slots = range(worker_id, n_slots, args.writers)
+        with requests.Session() as http:
+            i = 0
+            while not stop.is_set():
+                slot = own_slots[i % len(own_slots)]
+                session_id, user_a, user_b = slots[slot]
+                for user_id in (user_a, user_b):
+                    if user_id == user_b:
+                        # B closes the case: its subscribers must find the next one in the slot
+                        slots[slot] = open_case(http, base_url)
+                    res = submit_draft(http, base_url, session_id, user_id)
+                    if not res.ok:
+                        failures.append(f"submit {session_id} as {user_id}: {res.status_code} {res.text}")
+                        stop.set()
+                        return
+                    submits[0] += 1
+                i += 1
+
+    subscriber_thread = threading.Thread(target=lambda: asyncio.run(subscribers()))
+    subscriber_thread.start()
+    time.sleep(2)  # let the streams connect
+    connected = sum(len(queues) for queues in _event_manager().subscribers.values())
+
+    lag_future = asyncio.run_coroutine_threadsafe(lag_probe(), server_loop)
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for t in writers:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in writers:
+        t.join()
+    lag_future.result()
+    subscriber_thread.join()
+
+    lag_samples.sort()
+    log("SSE subscribers connected", str(connected))
+    log("Submits/s", f"{submits[0] / args.seconds:.1f}")
+    log("Events delivered", str(events_received[0]))
+    if lag_samples:
+        log("Loop lag p50 / p99 / max (ms)", f"{statistics.median(lag_samples) * 1000:.1f} / "
+                                             f"{lag_samples[int(len(lag_samples) * 0.99)] * 1000:.1f} / "
+                                             f"{lag_samples[-1] * 1000:.1f}")
+    if failures or not submits[0]:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        print(f"FAILED: {len(failures)} rejected submits, {submits[0]} accepted")
+        sys.exit(1)
+
+
+def count_statements(engine):
+    """Attaches counters for SQL statements and commits to an engine."""
+    from sqlalchemy import event
+
+    counts = {"statements": 0, "commits": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    return counts
+
+
+def bench_submit_commits(args):
+    """
+    Commits and SQL round trips of the two /report/submit calls that complete a case.
+    """
+    configure("sqlite://")
+    from fastapi.testclient import TestClient
+    import main
+    from srcs.database import engine
+
+    with TestClient(main.app) as client:
+        seed_user("driver-a")
+        seed_user("driver-b")
+        created = client.post("/session/create", params={"user_id": "driver-a"}).json()
+        client.post("/session/join", params={"otp": created["otp"], "user_id": "driver-b"})
+        evidences = [{"type": "PHOTO", "tag": "Damage Part", "content": f"cGhvdG8g{i:04d}"} for i in range(args.evidences)]
+
+        counts = count_statements(engine)
+        for user_id in ("driver-a", "driver-b"):
+            before = dict(counts)
+            res = client.post("/report/submit", json={
+                "session_id": created["session_id"],
+                "user_id": user_id,
+                "evidences": evidences,
+                "draft": SAMPLE_DRAFT,
+            })
+            log(f"Submit {user_id} -> {res.json()['status']}",
+                f"{counts['commits'] - before['commits']} commits, {counts['statements'] - before['statements']} statements")
+
+    log(f"Total for both drivers ({args.evidences} evidences each)",
+        f"{counts['commits']} commits, {counts['statements']} statements")
+
+
+def bench_stress_transitions(args):
+    """
+    Fires the racing calls of a case at the same moment across many sessions:
+    a second driver joining, both drivers submitting and both drivers signing.
+    Afterwards every session must have exactly one report, all three
+    signatures and status COMPLETED, with no 5xx along the way.
+    """
+    configure(args.db)
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlmodel import Session, select
+    from srcs.database import engine
+    from srcs.models.user import User
+    from srcs.models.report import AccidentReport
+    from srcs.models.session import AccidentSession
+    from srcs.models.enums import SessionStatus
+
+    base_url, _ = start_server()
+
+    n = args.sessions
+    # Users of this run only, so a database that is not reset (not a SQLite file) can be reused
+    run = uuid.uuid4().hex[:8]
+    log("Database", args.db)
+    log("Sessions", f"{n} (concurrency {args.concurrency})")
+    with Session(engine) as db:
+        for i in range(n):
+            for role in ("a", "b", "x"):
+                db.add(User(
+                    id=f"stress-{run}-{role}-{i}", name=f"Pemandu {role.upper()}{i}", ic_no="900101-14-5566",
+                    car_plate=f"W{role.upper()} {i}", car_model="Perodua Myvi", insurance_policy="AXA-999-888",
+                ))
+        db.commit()
+
+    local = threading.local()
+    statuses = {}
+    lock = threading.Lock()
+
+    def call(method: str, path: str, **kwargs) -> requests.Response:
+        if not hasattr(local, "http"):
+            local.http = requests.Session()
+        res = local.http.request(method, f"{base_url}{path}", **kwargs)
+        with lock:
+            statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+        return res
+
+    def phase(name: str, calls):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda c: c(), calls))
+        elapsed = time.perf_counter() - start
+        log(f"{name:<32}", f"{len(calls)} calls in {elapsed:.2f}s ({len(calls) / elapsed:.0f}/s)")
+        return results
+
+    created = phase("Create", [
+        lambda i=i: call("POST", "/session/create", params={"user_id": f"stress-{run}-a-{i}"}).json()
+        for i in range(n)
+    ])
+    session_ids = [c["session_id"] for c in created]
+
+    # Driver B and an intruder scan the same code at the same time
+    joins = phase("Join (B vs intruder)", [
+        lambda i=i, role=role: call("POST", "/session/join", params={"otp": created[i]["otp"], "user_id": f"stress-{run}-{role}-{i}"}).status_code
+        for i in range(n) for role in ("b", "x")
+    ])
+    double_joins = sum(1 for i in range(n) if joins[2 * i] == 200 and joins[2 * i + 1] == 200)
+
+    # Only sessions B actually joined take part from here on (the intruder may have won)
+    joined = [i for i in range(n) if joins[2 * i] == 200]
+    phase("Submit (A and B at once)", [
+        lambda i=i, role=role: call("POST", "/report/submit", json={
+            "session_id": session_ids[i], "user_id": f"stress-{run}-{role}-{i}", "draft": SAMPLE_DRAFT,
+        })
+        for i in joined for role in ("a", "b")
+    ])
+    phase("Police sign", [
+        lambda i=i: call("POST", "/police/sign", params={"session_id": session_ids[i], "police_id": "stress-police", "signature": "sig-p"})
+        for i in joined
+    ])
+    phase("Sign (A and B at once)", [
+        lambda i=i, role=role: call("POST", "/session/sign", params={"session_id": session_ids[i], "user_id": f"stress-{run}-{role}-{i}", "signature": f"sig-{role}"})
+        for i in joined for role in ("a", "b")
+    ])
+
+    failures = []
+    total_reports = 0
+    with Session(engine) as db:
+        for i in joined:
+            reports = db.exec(select(AccidentReport).where(AccidentReport.session_id == session_ids[i])).all()
+            total_reports += len(reports)
+            session_obj = db.get(AccidentSession, session_ids[i])
+            if len(reports) != 1:
+                failures.append(f"{session_ids[i]}: {len(reports)} reports")
+            elif not (reports[0].police_signature and reports[0].driver_a_signature and reports[0].driver_b_signature):
+                failures.append(f"{session_ids[i]}: lost a signature")
+            elif session_obj.status != SessionStatus.COMPLETED:
+                failures.append(f"{session_ids[i]}: status {session_obj.status.value}")
+
+    log("Responses by status code", str(dict(sorted(statuses.items()))))
+    log("Sessions joined by B", f"{len(joined)} / {n} (double joins: {double_joins})")
+    log("Reports created", f"{total_reports} for {len(joined)} sessions")
+
+    server_errors = sum(count for code, count in statuses.items() if code >= 500)
+    if failures or double_joins or server_errors:
+        for failure in failures[:20]:
+            print(f"FAILED: {failure}")
+        print(f"FAILED: {len(failures)} inconsistent sessions, {double_joins} double joins, {server_errors} server errors")
+        sys.exit(1)
+    log("Every session closed exactly once", "OK")
+
+
+def bench_report_downloads(args):
+    """
+    Report downloads through the render cache: N concurrent requests for a PDF
+    that is not rendered yet (must coalesce into one render), then repeat
+    downloads and conditional requests.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    configure(args.db)
+    base_url, _ = start_server()
+
+    with requests.Session() as http:
+        session_id = create_case(http, base_url)
+    url = f"{base_url}/police/reports/{session_id}/download/{args.report_type}"
+
+    def fetch(headers=None):
+        start = time.perf_counter()
+        res = requests.get(url, headers=headers or {})
+        return time.perf_counter() - start, res
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        cold = list(pool.map(lambda _: fetch(), range(args.concurrency)))
+    metrics = requests.get(f"{base_url}/util/metrics").json()["report_render_cache"]
+    log(f"{args.concurrency} concurrent cold downloads", f"{max(t for t, _ in cold) * 1000:.1f} ms slowest, {metrics['renders']} render(s)")
+
+    etag = cold[0][1].headers["etag"]
+    warm = [fetch()[0] for _ in range(args.requests)]
+    revalidated = [fetch({"If-None-Match": etag}) for _ in range(args.requests)]
+    log("Repeat download p50", f"{statistics.median(warm) * 1000:.2f} ms")
+    log("If-None-Match p50", f"{statistics.median(t for t, _ in revalidated) * 1000:.2f} ms (status {revalidated[0][1].status_code})")
+
+    metrics = requests.get(f"{base_url}/util/metrics").json()["report_render_cache"]
+    log("Render cache", str(metrics))
+    if metrics["renders"] != 1 or any(res.status_code != 304 for _, res in revalidated):
+        print("FAILED: expected exactly one render and 304 for every revalidation")
+        sys.exit(1)
+    log("One render for every download", "OK")
+
+
+def bench_pdf_batch(args):
+    """
+    Wall-clock time to draw the three case documents one after another in this
+    process versus PDFService.generate_batch across the worker processes. The
+    speedup is bounded by the number of cores (and the slowest document).
+    """
+    import tempfile
+    from srcs.config import PDF_WORKERS
+    from srcs.services.pdf_service import PDFService, REPORT_GENERATORS
+
+    details = sample_details()
+    sketch_path = os.path.abspath(os.path.join(current_dir, "../webapp/src/assets/rajahkasar.png"))
+    documents = {
+        "polis_repot": {"signed_by_pengadu": details.pengadu_nama, "signed_by_police": details.pegawai_penyiasat_nama},
+        "rajah_kasar": {"sketch_data": sketch_path if os.path.exists(sketch_path) else None},
+        "keputusan": {},
+    }
+    log("Cores / PDF workers", f"{os.cpu_count()} / {PDF_WORKERS}")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        pdf_service = PDFService(output_dir)
+        # Start the workers and load ReportLab in them before timing
+        pdf_service.generate_batch(details, documents)
+
+        sequential, batch = [], []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            for report_type, kwargs in documents.items():
+                getattr(pdf_service, REPORT_GENERATORS[report_type])(details, **kwargs)
+            sequential.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            paths = pdf_service.generate_batch(details, documents)
+            batch.append(time.perf_counter() - start)
+        PDFService.shutdown_pool()
+
+    seq_ms, batch_ms = statistics.median(sequential) * 1000, statistics.median(batch) * 1000
+    log("Sequential, in process p50", f"{seq_ms:.1f} ms")
+    log("generate_batch p50", f"{batch_ms:.1f} ms ({seq_ms / batch_ms:.2f}x)")
+    if set(paths) != set(documents):
+        print(f"FAILED: batch returned {sorted(paths)}")
+        sys.exit(1)
+
+
+def bench_pdf_render(args):
+    """
+    Per-document render time and size in one process, the merged case bundle
+    last. The first render also compiles the shared templates (styles and
+    fixed flowables); later ones reuse them. Each document is then rendered
+    again with the templates dropped before every call, which builds them per
+    render as the generators did before CompiledTemplates.
+    """
+    import tempfile
+    from srcs.services import pdf_service as pdf_module
+    from srcs.services.pdf_service import PDFService, REPORT_GENERATORS
+
+    details = sample_details()
+    sketch_path = os.path.abspath(os.path.join(current_dir, "../webapp/src/assets/rajahkasar.png"))
+    documents = {
+        "polis_repot": {"signed_by_pengadu": details.pengadu_nama, "signed_by_police": details.pegawai_penyiasat_nama},
+        "rajah_kasar": {"sketch_data": sketch_path if os.path.exists(sketch_path) else None},
+        "keputusan": {},
+    }
+    documents["bundle"] = {**documents["polis_repot"], **documents["rajah_kasar"]}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        pdf_service = PDFService(output_dir, args.profile)
+        for report_type, kwargs in documents.items():
+            generate = getattr(pdf_service, REPORT_GENERATORS[report_type])
+            timings = []
+            for _ in range(args.rounds + 1):
+                start = time.perf_counter()
+                path = generate(details, **kwargs)
+                timings.append(time.perf_counter() - start)
+            per_call = []
+            for _ in range(args.rounds):
+                pdf_module._templates = None
+                start = time.perf_counter()
+                generate(details, **kwargs)
+                per_call.append(time.perf_counter() - start)
+            compiled_ms, per_call_ms = statistics.median(timings[1:]) * 1000, statistics.median(per_call) * 1000
+            log(f"{report_type}", f"first {timings[0] * 1000:.1f} ms, p50 {compiled_ms:.2f} ms compiled, "
+                f"{per_call_ms:.2f} ms per call ({per_call_ms / compiled_ms:.2f}x), {os.path.getsize(path)} bytes")
+
+
+def bench_pdf_sign(args):
+    """
+    Cost of a new signature state of the signed documents: a full render
+    against stamping the signatures onto the cached unsigned base.
+    """
+    from srcs.services.pdf_service import PDFService, SIGNED_DOCUMENTS
+
+    details = sample_details()
+    sketch_path = os.path.abspath(os.path.join(current_dir, "../webapp/src/assets/rajahkasar.png"))
+    states = {
+        "unsigned": (None, None),
+        "pengadu signed": (details.pengadu_nama, None),
+        "both signed": (details.pengadu_nama, details.pegawai_penyiasat_nama),
+    }
+    pdf_service = PDFService(profile=args.profile)
+    for report_type in SIGNED_DOCUMENTS:
+        kwargs = {"sketch_data": sketch_path if os.path.exists(sketch_path) else None} if report_type == "bundle" else {}
+        start = time.perf_counter()
+        base, layout = pdf_service.render_signature_base(report_type, details, **kwargs)
+        log(f"{report_type} base", f"{(time.perf_counter() - start) * 1000:.1f} ms, {len(base)} bytes")
+
+        for state, (pengadu, police) in states.items():
+            full, stamped = [], []
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                pdf_service.render_bytes(report_type, details, signed_by_pengadu=pengadu, signed_by_police=police, **kwargs)
+                full.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                pdf = pdf_service.stamp_signatures(report_type, base, layout, pengadu, police)
+                stamped.append(time.perf_counter() - start)
+            log(f"{report_type} {state}", f"full p50 {statistics.median(full) * 1000:.2f} ms, "
+                f"stamped p50 {statistics.median(stamped) * 1000:.2f} ms, {len(pdf)} bytes")
+
+
+def check_pdf_xref(args):
+    """
+    Asserts signature stamping leaves a well-formed PDF in every output
+    profile: re-reading the stamped file from its startxref, every entry of
+    every xref section (the appended one and the original, via /Prev) points
+    at the object it names.
+    """
+    import re
+    from srcs.services.pdf_service import PDFService, PDF_PROFILES, SIGNED_DOCUMENTS
+    from srcs.services.pdf_stamp import read_xref
+
+    details = sample_details()
+    sketch_path = os.path.abspath(os.path.join(current_dir, "../webapp/src/assets/rajahkasar.png"))
+    failures = []
+    for profile in PDF_PROFILES:
+        pdf_service = PDFService(profile=profile)
+        for report_type in SIGNED_DOCUMENTS:
+            kwargs = {"sketch_data": sketch_path if os.path.exists(sketch_path) else None} if report_type == "bundle" else {}
+            base, layout = pdf_service.render_signature_base(report_type, details, **kwargs)
+            for signers in ((details.pengadu_nama, None), (details.pengadu_nama, details.pegawai_penyiasat_nama)):
+                pdf = pdf_service.stamp_signatures(report_type, base, layout, *signers)
+                if pdf is None:
+                    failures.append(f"{profile} {report_type}: signature did not fit the slot")
+                    continue
+                sections, checked = 0, 0
+                offset = int(re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", pdf).group(1))
+                while offset is not None:
+                    entries, trailer = read_xref(pdf, offset)
+                    for number, object_offset in entries.items():
+                        if not re.compile(rb"%d\s+\d+\s+obj\b" % number).match(pdf, object_offset):
+                            failures.append(f"{profile} {report_type}: object {number} not at {object_offset}")
+                    sections += 1
+                    checked += len(entries)
+                    prev = re.search(rb"/Prev\s+(\d+)", trailer)
+                    offset = int(prev.group(1)) if prev else None
+                log(f"{profile:<9} {report_type:<12} {sum(1 for s in signers if s)} signer(s)",
+                    f"{sections} xref sections, {checked} entries, {len(pdf)} bytes")
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        sys.exit(1)
+    log("Every xref entry points at its object", "OK")
+
+
+def check_tile_cache(args):
+    """
+    Asserts scene sketches read their map tiles from the persistent tile cache
+    after the first fetch, that it stays within its size limit and survives a
+    restart. Runs against a local stand-in tile server, never the provider.
+    """
+    import tempfile
+    from xyzservices import TileProvider
+    from srcs.services.map_service import MapService, SCENE_ZOOM
+    from srcs.services.tile_cache import TileCache
+
+    url, served = start_tile_server()
+    failures = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_path = os.path.join(cache_dir, "tiles.mbtiles")
+        cache = TileCache(cache_path, max_bytes=args.max_kb * 1024)
+        service = MapService(TileProvider(name="stand-in", url=url, attribution=""), cache)
+
+        lat, lng = 3.1390, 101.6869
+        for run in ("cold", "warm"):
+            requests_before = served["requests"]
+            start = time.perf_counter()
+            service._generate_scene_sketch_sync(lat, lng)
+            elapsed = time.perf_counter() - start
+            fetched = served["requests"] - requests_before
+            log(f"Scene sketch ({run})", f"{elapsed * 1000:.0f} ms, {fetched} tiles fetched, {cache.stats()}")
+            if run == "warm" and fetched:
+                failures.append(f"warm sketch fetched {fetched} tiles")
+
+        # Sketches along a road fill the cache past its limit
+        for step in range(1, args.locations + 1):
+            d = 0.001
+            lng_step = lng + step * 0.002
+            service.tile_mosaic(lng_step - d, lat - d, lng_step + d, lat + d, SCENE_ZOOM)
+        stats = cache.stats()
+        log(f"After {args.locations} more locations", f"{stats}")
+        if stats["bytes"] > stats["max_bytes"]:
+            failures.append(f"cache holds {stats['bytes']} bytes, over its {stats['max_bytes']} limit")
+        if not stats["evictions"]:
+            failures.append("no tile was evicted")
+
+        reopened = TileCache(cache_path, max_bytes=args.max_kb * 1024).stats()
+        log("Reopened cache", f"{reopened['tiles']} tiles, {reopened['bytes']} bytes")
+        if (reopened["tiles"], reopened["bytes"]) != (stats["tiles"], stats["bytes"]):
+            failures.append("the reopened cache differs")
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        sys.exit(1)
+    log("Tiles served from the tile cache", "OK")
+
+
+def _matplotlib_scene(image, extent) -> bytes:
+    """The scene sketch as MapService drew it before the NumPy/Pillow compositor."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(frameon=False)
+    fig.set_size_inches(6, 6)
+    ax = plt.Axes(fig, [0., 0., 1., 1.])
+    ax.set_axis_off()
+    fig.add_axes(ax)
+    ax.imshow(image, extent=extent, aspect="auto")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=400, bbox_inches="tight", pad_inches=0)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _scene_sketch_worker(compositor: str, url: str, cache_path: str, rounds: int, results):
+    # Own process per compositor, so the peak RSS of one does not hide the other's
+    import resource
+    from xyzservices import TileProvider
+    from srcs.services.map_service import MapService, SCENE_ZOOM
+    from srcs.services.tile_cache import TileCache
+
+    service = MapService(TileProvider(name="stand-in", url=url, attribution=""), TileCache(cache_path))
+    lat, lng, d = 3.1390, 101.6869, 0.001
+    bbox = (lng - d, lat - d, lng + d, lat + d)
+    service.tile_mosaic(*bbox, SCENE_ZOOM)
+    if compositor == "matplotlib":
+        import matplotlib.pyplot  # noqa: F401  (import cost is not render cost)
+
+        def render():
+            return _matplotlib_scene(*service.tile_mosaic(*bbox, SCENE_ZOOM))
+    else:
+        def render():
+            return service._generate_scene_sketch_sync(lat, lng)
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds + 1):
+            start = time.perf_counter()
+            image = render()
+            timings.append(time.perf_counter() - start)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((compositor, timings, peak_kb - baseline_kb, len(image)))
+
+
+def bench_scene_sketch(args):
+    """
+    Scene sketch latency and peak memory, NumPy/Pillow compositor against the
+    former matplotlib figure, from warm tiles (local stand-in tile server).
+    Each runs in a fresh process; peak memory is the RSS high-water mark above
+    what the process held before the first render. Then latency, zoom and
+    bytes per output size and format. matplotlib is no longer an app
+    dependency; the comparison runs only where it is installed.
+    """
+    import importlib.util
+    import multiprocessing
+    import tempfile
+    from xyzservices import TileProvider
+    from srcs.services.map_service import MapService, SCENE_FORMATS
+    from srcs.services.tile_cache import TileCache
+
+    url, _ = start_tile_server()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_path = os.path.join(cache_dir, "tiles.mbtiles")
+        compositors = ("pillow",)
+        if importlib.util.find_spec("matplotlib"):
+            compositors = ("matplotlib", "pillow")
+        else:
+            log("matplotlib", "not installed, comparison skipped")
+        for compositor in compositors:
+            worker = context.Process(target=_scene_sketch_worker, args=(compositor, url, cache_path, args.rounds, results))
+            worker.start()
+            name, timings, peak_kb, size = results.get()
+            worker.join()
+            log(f"{name:<10}", f"first {timings[0] * 1000:.0f} ms, p50 {statistics.median(timings[1:]) * 1000:.0f} ms, "
+                f"peak +{peak_kb / 1024:.1f} MB, {size} bytes PNG")
+
+        service = MapService(TileProvider(name="stand-in", url=url, attribution=""), TileCache(cache_path))
+        lat, lng = 3.1390, 101.6869
+        for size in (None, 1024, 512, 256):
+            for image_format in SCENE_FORMATS:
+                key = service.scene_key(lat, lng, size, image_format)
+                timings = []
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(args.rounds + 1):
+                        start = time.perf_counter()
+                        image = service._generate_scene_sketch_sync(lat, lng, size, image_format, key[5])
+                        timings.append(time.perf_counter() - start)
+                log(f"size {size or 'full'} {image_format:<5}", f"zoom {key[2]}, first {timings[0] * 1000:.0f} ms, "
+                    f"p50 {statistics.median(timings[1:]) * 1000:.0f} ms, {len(image)} bytes")
+
+
+def bench_scene_map_burst(args):
+    """
+    A burst of concurrent /util/scene-map requests for a few spots, each asked
+    for by many clients with GPS jitter (as both drivers and their retries
+    do). Reports how many renders ran, how many requests shared one and how
+    deep the render queue got. Tiles come from a local stand-in tile server.
+    """
+    import random
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from xyzservices import TileProvider
+
+    configure("sqlite://")
+    from srcs.services.map_service import map_service
+    from srcs.services.tile_cache import TileCache
+
+    url, served = start_tile_server()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        map_service.provider = TileProvider(name="stand-in", url=url, attribution="")
+        map_service.cache = TileCache(os.path.join(cache_dir, "tiles.mbtiles"))
+        base_url, server = start_server()
+
+        spots = [(3.1390 + i * 0.002, 101.6869) for i in range(args.spots)]
+
+        def request(i: int):
+            lat, lng = spots[i % len(spots)]
+            # Jitter well below the rounding, so every request for a spot shares its render
+            body = {"lat": lat + random.uniform(-3e-5, 3e-5), "lng": lng + random.uniform(-3e-5, 3e-5)}
+            start = time.perf_counter()
+            res = requests.post(f"{base_url}/util/scene-map", json=body, timeout=120)
+            return res.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            results = list(pool.map(request, range(args.clients)))
+        elapsed = time.perf_counter() - start
+        stats = requests.get(f"{base_url}/util/metrics").json()["scene_map"]
+        server.should_exit = True
+
+    ok = [latency for status, latency in results if status == 200]
+    log(f"{args.clients} requests for {args.spots} spots", f"{elapsed:.2f} s, {len(ok)} OK, "
+        f"{sum(1 for status, _ in results if status == 503)} x 503")
+    if ok:
+        log("Latency", f"p50 {statistics.median(ok) * 1000:.0f} ms, max {max(ok) * 1000:.0f} ms")
+    log("Renders", f"{stats['renders']} (coalesced {stats['coalesced']}, rejected {stats['rejected']}), "
+        f"max queue depth {stats['max_queue_depth']} on {stats['workers']} workers, {served['requests']} tiles fetched")
+
+
+def bench_tile_fetch(args):
+    """
+    Cold-cache tile downloads for one scene sketch against a local stand-in
+    tile server answering each tile after --latency-ms: one request after the
+    other on fresh connections (as contextily fetched them) against the
+    pooled, concurrent TileFetcher. Then a whole cold sketch through it.
+    """
+    import mercantile
+    import tempfile
+    from xyzservices import TileProvider
+    from srcs.services.map_service import MapService, SCENE_ZOOM
+    from srcs.services.tile_cache import TileCache
+    from srcs.services.tile_fetcher import TileFetcher
+
+    url, served = start_tile_server(args.latency_ms / 1000)
+    provider = TileProvider(name="stand-in", url=url, attribution="")
+    lat, lng = 3.1390, 101.6869
+    bbox = MapService.scene_bbox(lat, lng)
+    urls = [provider.build_url(x=tile.x, y=tile.y, z=tile.z) for tile in mercantile.tiles(*bbox, [SCENE_ZOOM])]
+    fetcher = TileFetcher()
+
+    def sequential():
+        for tile_url in urls:
+            requests.get(tile_url, timeout=30).raise_for_status()
+
+    for name, fetch in (("sequential", sequential), ("TileFetcher", lambda: fetcher.fetch_all(urls))):
+        timings = []
+        connections_before = served["connections"]
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            fetch()
+            timings.append(time.perf_counter() - start)
+        log(f"{name:<12} {len(urls)} tiles", f"p50 {statistics.median(timings) * 1000:.0f} ms, "
+            f"{served['connections'] - connections_before} connections in {args.rounds} rounds")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = MapService(provider, TileCache(os.path.join(cache_dir, "tiles.mbtiles")), fetcher=fetcher)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            service._generate_scene_sketch_sync(lat, lng)
+        log("Cold scene sketch", f"{(time.perf_counter() - start) * 1000:.0f} ms with {args.latency_ms} ms per tile")
+
+
+def check_details_queries(args):
+    """
+    Asserts GET /police/reports/{id}/details stays a single SQL statement (the
+    PoliceCaseView lookup) and reports what assembling it from the tables costs.
+    """
+    configure("sqlite://")
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+    import main
+    from srcs.database import engine
+    from srcs.services.case_view import build_case_view
+
+    with TestClient(main.app) as client:
+        seed_user("driver-a")
+        seed_user("driver-b")
+        created = client.post("/session/create", params={"user_id": "driver-a"}).json()
+        client.post("/session/join", params={"otp": created["otp"], "user_id": "driver-b"})
+        for user_id in ("driver-a", "driver-b"):
+            client.post("/report/submit", json={
+                "session_id": created["session_id"],
+                "user_id": user_id,
+                "evidences": SAMPLE_EVIDENCE,
+                "draft": SAMPLE_DRAFT,
+            }).raise_for_status()
+
+        counts = count_statements(engine)
+        with Session(engine) as db:
+            build_case_view(db, created["session_id"])
+        log("Assembled from tables", f"{counts['statements']} statements")
+
+        counts["statements"] = 0
+        res = client.get(f"/police/reports/{created['session_id']}/details")
+        res.raise_for_status()
+        log("GET /police/reports/{id}/details", f"{counts['statements']} statements")
+
+    if counts["statements"] > args.max_statements:
+        print(f"FAILED: details issued {counts['statements']} statements (max {args.max_statements})")
+        sys.exit(1)
+    log("Details served from the read model", "OK")
+
+
+def check_idempotency(args):
+    """
+    Asserts Idempotency-Key replays stay with the driver that sent the key:
+    both drivers of a case submitting with the same key each get their draft
+    saved, and a retry by either one replays their own result.
+    """
+    configure("sqlite://")
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, select
+    import main
+    from srcs.database import engine
+    from srcs.models.report import AccidentReport, AccidentReportDraft
+
+    failures = []
+    with TestClient(main.app) as client:
+        seed_user("driver-a")
+        seed_user("driver-b")
+        created = client.post("/session/create", params={"user_id": "driver-a"}).json()
+        client.post("/session/join", params={"otp": created["otp"], "user_id": "driver-b"})
+
+        def submit(user_id: str) -> dict:
+            res = client.post("/report/submit", headers={"Idempotency-Key": args.key}, json={
+                "session_id": created["session_id"],
+                "user_id": user_id,
+                "evidences": SAMPLE_EVIDENCE,
+                "draft": SAMPLE_DRAFT,
+            })
+            res.raise_for_status()
+            return res.json()
+
+        expected = [
+            ("driver-a", "WAITING_FOR_PARTNER"),
+            ("driver-b", "SUBMITTED"),
+            ("driver-a", "WAITING_FOR_PARTNER"),
+            ("driver-b", "SUBMITTED"),
+        ]
+        for user_id, status in expected:
+            result = submit(user_id)
+            log(f"Submit {user_id} with key {args.key}", result["status"])
+            if result["status"] != status:
+                failures.append(f"{user_id} got {result['status']}, expected {status}")
+
+    with Session(engine) as db:
+        drafts = db.exec(select(AccidentReportDraft).where(AccidentReportDraft.session_id == created["session_id"])).all()
+        reports = db.exec(select(AccidentReport).where(AccidentReport.session_id == created["session_id"])).all()
+    log("Drafts / reports saved", f"{len(drafts)} / {len(reports)}")
+    if sorted(d.user_id for d in drafts) != ["driver-a", "driver-b"]:
+        failures.append(f"drafts saved for {sorted(d.user_id for d in drafts)}")
+    if len(reports) != 1:
+        failures.append(f"{len(reports)} reports")
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        sys.exit(1)
+    log("Each driver replays only their own submission", "OK")
+
+
+def check_upload_guards(args):
+    """
+    Asserts chunked evidence uploads are refused for missing sessions, users
+    outside the case, wrong MIME types and oversized files, and that a PUT past
+    the declared size leaves the stored offset where it was.
+    """
+    configure("sqlite://")
+    from fastapi.testclient import TestClient
+    import main
+    from srcs.config import EVIDENCE_UPLOAD_MAX_BYTES
+
+    failures = []
+    with TestClient(main.app) as client:
+        seed_user("driver-a")
+        seed_user("driver-b")
+        seed_user("stranger")
+        created = client.post("/session/create", params={"user_id": "driver-a"}).json()
+        client.post("/session/join", params={"otp": created["otp"], "user_id": "driver-b"})
+        upload = {"session_id": created["session_id"], "user_id": "driver-b", "type": "VIDEO",
+                  "tag": "Dashcam", "mime_type": "video/mp4", "total_size": args.size}
+
+        def start(expected: int, title: str, **changes):
+            res = client.post("/report/evidence/uploads", json={**upload, **changes})
+            log(title, res.status_code)
+            if res.status_code != expected:
+                failures.append(f"{title}: {res.status_code}, expected {expected}")
+            return res.json()
+
+        start(404, "Unknown session", session_id="no-such-session")
+        start(403, "User outside the case", user_id="stranger")
+        start(415, "Image MIME type for a video", mime_type="image/png")
+        start(400, "Text evidence", type="TEXT", mime_type=None)
+        start(413, "total_size over the limit", total_size=EVIDENCE_UPLOAD_MAX_BYTES + 1)
+
+        upload_path = f"/report/evidence/uploads/{start(200, 'Driver B starts an upload')['upload_id']}"
+        res = client.put(upload_path, params={"offset": 0}, content=os.urandom(args.size + 1))
+        offset = client.get(upload_path).json()["offset"]
+        log("PUT past total_size", f"{res.status_code}, offset {offset}")
+        if res.status_code != 413 or offset != 0:
+            failures.append(f"PUT past total_size: {res.status_code}, offset {offset}")
+        res = client.put(upload_path, params={"offset": 0}, content=os.urandom(args.size))
+        res = client.post(f"{upload_path}/complete")
+        log("Resent within total_size and completed", res.status_code)
+        if res.status_code != 200 or not res.json()["evidence_id"]:
+            failures.append(f"complete after resend: {res.status_code}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        sys.exit(1)
+    log("Uploads checked at start and while streaming", "OK")
+
+
+def _event_manager():
+    from srcs.services.event_service import event_manager
+    return event_manager
+
+
+def route_queries() -> dict[str, dict[str, tuple]]:
+    """
+    The SELECTs each route really issues, with their parameters, keyed by
+    route: one case is walked through every route (and its report job) while
+    the engine records what runs. Call after configure().
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    import main
+    from srcs.database import engine
+    from srcs.services.report_cache import DOWNLOAD_TYPES
+
+    queries: dict[str, dict[str, tuple]] = {}
+    current = [None]
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if current[0] and statement.lstrip().upper().startswith("SELECT"):
+            queries.setdefault(current[0], {}).setdefault(statement, parameters)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+
+    with TestClient(main.app) as client:
+        def call(method: str, route: str, path: str | None = None, **kwargs):
+            current[0] = route
+            try:
+                res = client.request(method, path or route.split(" ", 1)[1], **kwargs)
+            finally:
+                current[0] = None
+            res.raise_for_status()
+            return res.json() if res.headers.get("content-type") == "application/json" else res
+
+        seed_user("driver-a")
+        seed_user("driver-b")
+        created = call("POST", "POST /session/create", params={"user_id": "driver-a"})
+        session_id, otp = created["session_id"], created["otp"]
+        call("POST", "POST /session/join", params={"otp": otp, "user_id": "driver-b"})
+        call("POST", "POST /session/reconnect", params={"otp": otp, "user_id": "driver-a"})
+
+        video = os.urandom(64 * 1024)
+        upload = call("POST", "POST /report/evidence/uploads", json={
+            "session_id": session_id, "user_id": "driver-a", "type": "VIDEO", "tag": "Dashcam",
+            "mime_type": "video/mp4", "total_size": len(video)
+        })
+        upload_path = f"/report/evidence/uploads/{upload['upload_id']}"
+        call("PUT", "PUT /report/evidence/uploads/{id}", upload_path, params={"offset": 0}, content=video)
+        call("GET", "GET /report/evidence/uploads/{id}", upload_path)
+        evidence_id = call("POST", "POST /report/evidence/uploads/{id}/complete", f"{upload_path}/complete")["evidence_id"]
+        call("GET", "GET /report/evidence/{id}/content", f"/report/evidence/{evidence_id}/content")
+
+        for user_id, evidence_ids in (("driver-a", [evidence_id]), ("driver-b", [])):
+            call("POST", "POST /report/submit", json={
+                "session_id": session_id, "user_id": user_id, "evidences": SAMPLE_EVIDENCE,
+                "evidence_ids": evidence_ids, "draft": SAMPLE_DRAFT,
+            })
+        call("GET", "GET /session/report/{id}/meta", f"/session/report/{session_id}/meta")
+
+        # A second case, so the dashboard has a next page to walk
+        seed_user("driver-c")
+        seed_user("driver-d")
+        other = call("POST", "POST /session/create", params={"user_id": "driver-c"})
+        call("POST", "POST /session/join", params={"otp": other["otp"], "user_id": "driver-d"})
+        for user_id in ("driver-c", "driver-d"):
+            call("POST", "POST /report/submit", json={
+                "session_id": other["session_id"], "user_id": user_id, "draft": SAMPLE_DRAFT,
+            })
+
+        page = call("GET", "GET /police/dashboard", params={"limit": 1})
+        call("GET", "GET /police/dashboard", params={"limit": 1, "cursor": page["next_cursor"], "fields": "summary"})
+        call("GET", "GET /police/dashboard", params={"status": "PENDING_POLICE", "police_id": "police-1"})
+        call("GET", "GET /police/dashboard", params={"date_from": "2025-01-01T00:00:00", "date_to": "2100-01-01T00:00:00"})
+        call("GET", "GET /police/reports/{id}/details", f"/police/reports/{session_id}/details")
+        call("POST", "POST /police/meeting", params={"session_id": session_id, "police_id": "police-1"})
+        report_id = call("GET", "GET /police/reports/{id}/details", f"/police/reports/{session_id}/details")["report_id"]
+        call("POST", "POST /police/reports/generate", json={"report_id": report_id, "faulty_driver": "B"})
+        call("POST", "POST /police/sign", params={"session_id": session_id, "police_id": "police-1", "signature": "sig-p"})
+        for report_type in DOWNLOAD_TYPES:
+            call("GET", "GET /police/reports/{id}/download/{type}", f"/police/reports/{session_id}/download/{report_type}")
+        call("GET", "GET /police/reports/export", params={"station": "Balai Polis Trafik", "date_from": "2025-01-01T00:00:00"})
+
+        call("POST", "POST /session/sign", params={"session_id": session_id, "user_id": "driver-a", "signature": "sig-a"})
+        signed = call("POST", "POST /session/sign", params={"session_id": session_id, "user_id": "driver-b", "signature": "sig-b"})
+        # The report job renders on its own threads, what it queries is recorded under the signing route
+        current[0] = "POST /session/sign"
+        try:
+            for _ in range(600):
+                job = client.get(f"/session/jobs/{signed['job_id']}").json()
+                if job["status"] in ("DONE", "FAILED"):
+                    break
+                time.sleep(0.05)
+        finally:
+            current[0] = None
+        if job["status"] != "DONE":
+            raise RuntimeError(f"Report job failed: {job}")
+
+    event.remove(engine, "before_cursor_execute", on_execute)
+    return queries
+
+
+def check_explain(args):
+    """
+    Asserts via EXPLAIN QUERY PLAN that no route query falls back to a full
+    table scan. The queries are recorded from the routes (route_queries()),
+    so the check follows the code.
+    """
+    configure("sqlite://")
+    queries = route_queries()
+    from srcs.database import engine
+
+    failures = []
+    with engine.connect() as conn:
+        for route, statements in queries.items():
+            for sql, parameters in statements.items():
+                plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+                # "SCAN t USING [COVERING] INDEX" walks an index; a bare "SCAN t" reads the whole table,
+                # and a temp B-tree sorts every matching row before LIMIT applies
+                scans = [step for step in plan if (step.startswith("SCAN") and "INDEX" not in step) or "TEMP B-TREE" in step]
+                status = f"{Colors.YELLOW}TABLE SCAN{Colors.END}" if scans else f"{Colors.GREEN}INDEX{Colors.END}"
+                log(f"{route:<45} {status}", " | ".join(plan))
+                if scans:
+                    failures.append((route, sql, plan))
+
+    if failures:
+        for route, sql, plan in failures:
+            print(f"FAILED: {route} scans a table\n  {sql}\n  {plan}")
+        sys.exit(1)
+    log(f"All {sum(len(statements) for statements in queries.values())} route queries use an index", "OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mySettle backend benchmarks")
+    sub = parser.add_subparsers(dest="scenario", required=True)
+
+    p = sub.add_parser("dashboard", help="Dashboard read throughput under concurrent submits")
+    p.add_argument("--db", default="sqlite:///bench.db")
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--readers", type=int, default=8)
+    p.add_argument("--writers", type=int, default=2)
+    p.add_argument("--seed", type=int, default=50)
+    p.set_defaults(func=bench_dashboard)
+
+    p = sub.add_parser("sse-latency", help="Event-loop lag with many SSE subscribers while submits run")
+    p.add_argument("--db", default="sqlite:///bench.db")
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--subscribers", type=int, default=500)
+    p.add_argument("--sessions", type=int, default=50)
+    p.add_argument("--writers", type=int, default=8)
+    p.set_defaults(func=bench_sse_latency)
+
+    p = sub.add_parser("submit-commits", help="Commits / SQL round trips per /report/submit")
+    p.add_argument("--evidences", type=int, default=8)
+    p.set_defaults(func=bench_submit_commits)
+
+    p = sub.add_parser("stress", help="Concurrent joins, submits and signs across many sessions")
+    p.add_argument("--db", default="sqlite:///stress.db")
+    p.add_argument("--sessions", type=int, default=2000)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.set_defaults(func=bench_stress_transitions)
+
+    p = sub.add_parser("report-downloads", help="Render cache: coalesced cold downloads, repeat and 304 latency")
+    p.add_argument("--db", default="sqlite:///bench.db")
+    p.add_argument("--report-type", default="polis_repot", choices=["polis_repot", "rajah_kasar", "keputusan"])
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--requests", type=int, default=50)
+    p.set_defaults(func=bench_report_downloads)
+
+    p = sub.add_parser("pdf-batch", help="Sequential vs process-pool rendering of the three case documents")
+    p.add_argument("--rounds", type=int, default=10)
+    p.set_defaults(func=bench_pdf_batch)
+
+    p = sub.add_parser("pdf-render", help="Per-document PDF render time (first render vs steady state) and size")
+    p.add_argument("--rounds", type=int, default=50)
+    p.add_argument("--profile", default="standard", help="PDF output profile: standard or compact")
+    p.set_defaults(func=bench_pdf_render)
+
+    p = sub.add_parser("pdf-sign", help="Full render vs stamping signatures onto the cached unsigned base")
+    p.add_argument("--rounds", type=int, default=50)
+    p.add_argument("--profile", default="standard", help="PDF output profile: standard or compact")
+    p.set_defaults(func=bench_pdf_sign)
+
+    p = sub.add_parser("pdf-xref", help="Assert stamped signed documents have a valid xref in every profile")
+    p.set_defaults(func=check_pdf_xref)
+
+    p = sub.add_parser("tile-cache", help="Assert scene sketches reuse cached map tiles (local stand-in tile server)")
+    p.add_argument("--max-kb", type=int, default=1024, help="Tile cache size limit for the run")
+    p.add_argument("--locations", type=int, default=5)
+    p.set_defaults(func=check_tile_cache)
+
+    p = sub.add_parser("scene-sketch", help="Scene sketch latency and peak memory: Pillow compositor vs matplotlib")
+    p.add_argument("--rounds", type=int, default=5)
+    p.set_defaults(func=bench_scene_sketch)
+
+    p = sub.add_parser("scene-map-burst", help="Concurrent /util/scene-map requests: coalesced renders and queue depth")
+    p.add_argument("--clients", type=int, default=40)
+    p.add_argument("--spots", type=int, default=4)
+    p.set_defaults(func=bench_scene_map_burst)
+
+    p = sub.add_parser("tile-fetch", help="Cold tile downloads: sequential vs pooled concurrent TileFetcher")
+    p.add_argument("--latency-ms", type=int, default=100, help="Stand-in tile server latency per tile")
+    p.add_argument("--rounds", type=int, default=3)
+    p.set_defaults(func=bench_tile_fetch)
+
+    p = sub.add_parser("details-queries", help="Assert the police details endpoint stays one SQL statement")
+    p.add_argument("--max-statements", type=int, default=1)
+    p.set_defaults(func=check_details_queries)
+
+    p = sub.add_parser("idempotency", help="Assert both drivers can submit with the same Idempotency-Key")
+    p.add_argument("--key", default="retry-key-1")
+    p.set_defaults(func=check_idempotency)
+
+    p = sub.add_parser("upload-guards", help="Assert chunked uploads check the case, MIME type and size")
+    p.add_argument("--size", type=int, default=64 * 1024)
+    p.set_defaults(func=check_upload_guards)
+
+    p = sub.add_parser("explain", help="Assert every route query is served by an index")
+    p.set_defaults(func=check_explain)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
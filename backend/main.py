@@ -7,6 +7,7 @@ from contextlib import asynccontextmanager
 
 from srcs.database import create_db_and_tables
 from srcs.routes import auth, session, report, police, utility
+from srcs.services.pdf_service import PDFService
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,6 +15,7 @@ async def lifespan(app: FastAPI):
     create_db_and_tables()
     yield
     # Shutdown
+    PDFService.shutdown_pool()
 
 app = FastAPI(title="mySettle Backend", lifespan=lifespan)
 
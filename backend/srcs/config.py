@@ -7,3 +7,52 @@ HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
 GEMINI_API_LIST=os.getenv("GEMINI_API_LIST", "").split(',')
 GEMINI_MODEL_NAME=os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash")
+
+# Database
+# "sqlite:///mysettle.db" -> file-backed SQLite (WAL, pooled connections)
+# "sqlite://"             -> in-memory SQLite (tests / throwaway demos)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///mysettle.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+
+# Evidence media (photos, videos, sketches) is stored on disk, content-addressed
+BLOB_DIR = os.getenv("BLOB_DIR", "evidence_blobs")
+# Largest file accepted by the chunked evidence upload (dashcam videos)
+EVIDENCE_UPLOAD_MAX_BYTES = int(os.getenv("EVIDENCE_UPLOAD_MAX_BYTES", 512 * 1024 * 1024))
+
+# Process-wide cache of User profiles (they rarely change after /auth/login)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+
+# Rendered report PDFs, keyed by a hash of their inputs. Kept out of
+# generated_reports, which is served without authentication at /reports
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_cache")
+# A superseded render is only deleted once it has not been served for this long
+REPORT_CACHE_STALE_SECONDS = float(os.getenv("REPORT_CACHE_STALE_SECONDS", 3600))
+
+# Sketches scaled down to the Rajah Kasar sketch box, keyed by their blob hash
+SKETCH_CACHE_DIR = os.getenv("SKETCH_CACHE_DIR", os.path.join("report_cache", "sketches"))
+SKETCH_DPI = int(os.getenv("SKETCH_DPI", 150))
+
+# Opt-in compact PDF profile: sketches re-encoded at this resolution and JPEG quality
+PDF_COMPACT_IMAGE_DPI = int(os.getenv("PDF_COMPACT_IMAGE_DPI", 100))
+PDF_COMPACT_JPEG_QUALITY = int(os.getenv("PDF_COMPACT_JPEG_QUALITY", 75))
+
+# Map tiles of the scene sketches (MBTiles-style SQLite), least recently used evicted past the size limit
+MAP_TILE_CACHE_PATH = os.getenv("MAP_TILE_CACHE_PATH", "map_tiles.mbtiles")
+MAP_TILE_CACHE_MAX_BYTES = int(os.getenv("MAP_TILE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Tile downloads: threads, keep-alive connections per tile host, timeouts (seconds) and retries
+MAP_TILE_FETCH_WORKERS = int(os.getenv("MAP_TILE_FETCH_WORKERS", 16))
+MAP_TILE_HOST_CONNECTIONS = int(os.getenv("MAP_TILE_HOST_CONNECTIONS", 8))
+MAP_TILE_CONNECT_TIMEOUT = float(os.getenv("MAP_TILE_CONNECT_TIMEOUT", 3.05))
+MAP_TILE_READ_TIMEOUT = float(os.getenv("MAP_TILE_READ_TIMEOUT", 10))
+MAP_TILE_RETRIES = int(os.getenv("MAP_TILE_RETRIES", 2))
+
+# Threads rendering scene maps, and how many renders may wait for one before requests get 503
+MAP_RENDER_WORKERS = int(os.getenv("MAP_RENDER_WORKERS", 2))
+MAP_RENDER_MAX_QUEUE = int(os.getenv("MAP_RENDER_MAX_QUEUE", 16))
+
+# Worker processes rendering the final PDFs of closed cases
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
@@ -1,17 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, create_engine, Session
 
 from sqlmodel.pool import StaticPool
 
-sqlite_url = "sqlite://" # In-memory database
+from srcs.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_BUSY_TIMEOUT_MS
+from srcs.migrations import run_migrations
+
+
+def is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers (dashboard, details) run while a writer commits
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable across app crashes in WAL mode and avoids an fsync per commit
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL):
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+
+        if is_memory_sqlite(url):
+            # Every new connection to "sqlite://" is a fresh empty database,
+            # so the in-memory mode keeps one shared connection.
+            return create_engine(url, connect_args=connect_args, poolclass=StaticPool)
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args, poolclass=StaticPool)
+        connect_args["timeout"] = DB_BUSY_TIMEOUT_MS / 1000
+        file_engine = create_engine(
+            url,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+        )
+        event.listen(file_engine, "connect", _set_sqlite_pragmas)
+        return file_engine
+
+    return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+
+
+engine = build_engine()
+
+
+# Database work from async routes runs here instead of on the event loop.
+# The in-memory engine has a single shared connection, so it gets a single worker.
+db_executor = ThreadPoolExecutor(
+    max_workers=1 if is_memory_sqlite(DATABASE_URL) else DB_POOL_SIZE,
+    thread_name_prefix="db",
+)
 
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
 
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+async def run_in_session(work, *args):
+    """
+    Unit of work for async routes: runs work(db, *args) on the database thread pool
+    with its own Session and returns its result, so queries and commits never block
+    the event loop (and with it every open SSE stream).
+    Exceptions raised by work (e.g. HTTPException) propagate to the caller.
+    """
+    def unit_of_work():
+        with Session(engine) as db:
+            return work(db, *args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, unit_of_work)
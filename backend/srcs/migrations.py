@@ -0,0 +1,208 @@
+"""
+Versioned schema migrations.
+
+`SQLModel.metadata.create_all` only creates tables that are missing; it never
+touches a table that already exists in a file-backed database. Every schema
+change after the initial tables is therefore a numbered migration below,
+applied once, in order, and recorded in the `schema_version` table.
+
+To evolve the schema append a new (version, description, function) entry to
+MIGRATIONS. Never edit or renumber a migration that has shipped.
+"""
+from datetime import datetime
+
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+
+# --- Helpers ---
+
+def create_index(conn: Connection, name: str, table: str, columns: list[str], unique: bool = False):
+    unique_sql = "UNIQUE " if unique else ""
+    conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def drop_index(conn: Connection, name: str):
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str):
+    """
+    Adds a column unless create_all already created the table with it
+    (fresh databases get the current model straight away).
+    """
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def rebuild_table(conn: Connection, table: Table, index_names: list[str]):
+    """
+    SQLite cannot ALTER a column's constraints, so recreate the table from the
+    current model and copy the shared columns across. The given indexes are
+    dropped first (they would follow the renamed table) and must be recreated
+    by the calling migration.
+    """
+    for name in index_names:
+        drop_index(conn, name)
+
+    old_name = f"{table.name}_old"
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old_name}"))
+    table.create(conn)
+
+    old_columns = {col["name"] for col in inspect(conn).get_columns(old_name)}
+    shared = ", ".join(col.name for col in table.columns if col.name in old_columns)
+    conn.execute(text(f"INSERT INTO {table.name} ({shared}) SELECT {shared} FROM {old_name}"))
+    conn.execute(text(f"DROP TABLE {old_name}"))
+
+
+# --- Migrations ---
+
+def _m001_lookup_indexes(conn: Connection):
+    # /session/join, /session/reconnect
+    create_index(conn, "ix_accidentsession_otp", "accidentsession", ["otp"])
+    # /police/dashboard
+    create_index(conn, "ix_accidentsession_status", "accidentsession", ["status"])
+    # Participant lookups ("my sessions", officer assignment)
+    create_index(conn, "ix_accidentsession_driver_a_id", "accidentsession", ["driver_a_id"])
+    create_index(conn, "ix_accidentsession_driver_b_id", "accidentsession", ["driver_b_id"])
+    create_index(conn, "ix_accidentsession_police_id", "accidentsession", ["police_id"])
+    # /session/sign, /police/sign, /session/report/{id}/meta, details, download
+    create_index(conn, "ix_accidentreport_session_id", "accidentreport", ["session_id"])
+    create_index(conn, "ix_accidentreportdraft_session_id", "accidentreportdraft", ["session_id"])
+    # Evidence per draft, and the MAP_SKETCH lookup (draft_id IN (..) AND type = ..)
+    create_index(conn, "ix_evidence_draft_id_type", "evidence", ["draft_id", "type"])
+
+
+def _m002_evidence_blobs(conn: Connection):
+    from srcs.models.report import Evidence, BLOB_EVIDENCE_TYPES
+    from srcs.services.blob_store import blob_store, decode_media
+
+    columns = {col["name"]: col for col in inspect(conn).get_columns("evidence")}
+    if not columns["content"]["nullable"]:
+        # content becomes optional now that media moves out of the row
+        rebuild_table(conn, Evidence.__table__, ["ix_evidence_draft_id_type"])
+        create_index(conn, "ix_evidence_draft_id_type", "evidence", ["draft_id", "type"])
+    else:
+        add_column(conn, "evidence", "blob_sha256", "VARCHAR")
+        add_column(conn, "evidence", "size", "INTEGER")
+        add_column(conn, "evidence", "mime_type", "VARCHAR")
+
+    # Move inline base64 media of existing rows into the blob store
+    blob_types = ", ".join(f"'{t.name}'" for t in BLOB_EVIDENCE_TYPES)
+    rows = conn.execute(text(
+        f"SELECT id, content FROM evidence WHERE type IN ({blob_types}) "
+        "AND blob_sha256 IS NULL AND content IS NOT NULL AND content NOT LIKE 'http%'"
+    )).all()
+    for evidence_id, content in rows:
+        data, mime_type = decode_media(content)
+        sha256, size = blob_store.put_bytes(data)
+        conn.execute(
+            text("UPDATE evidence SET content = NULL, blob_sha256 = :sha, size = :size, mime_type = :mime WHERE id = :id"),
+            {"sha": sha256, "size": size, "mime": mime_type, "id": evidence_id},
+        )
+
+
+def _m003_submit_idempotency(conn: Connection):
+    add_column(conn, "accidentreportdraft", "idempotency_key", "VARCHAR")
+    add_column(conn, "accidentreportdraft", "submit_status", "VARCHAR")
+    # Unique: a concurrent retry fails on insert and replays the winner's result
+    create_index(conn, "ix_accidentreportdraft_idempotency_key", "accidentreportdraft", ["idempotency_key"], unique=True)
+
+
+def _m004_dashboard_keyset(conn: Connection):
+    # /police/dashboard pages walk (created_at, id) newest first within one status,
+    # optionally for one officer
+    create_index(conn, "ix_accidentsession_status_created_at_id", "accidentsession", ["status", "created_at", "id"])
+    create_index(conn, "ix_accidentsession_status_police_id_created_at_id", "accidentsession", ["status", "police_id", "created_at", "id"])
+    # Prefix of the composite index above
+    drop_index(conn, "ix_accidentsession_status")
+
+
+def _m005_police_case_views(conn: Connection):
+    from sqlmodel import Session
+    from srcs.services.case_view import refresh_case_view
+
+    # The policecaseview table itself comes from create_all; fill it for
+    # sessions that already have a submitted draft
+    session_ids = conn.execute(text(
+        "SELECT id FROM accidentsession WHERE driver_a_draft_id IS NOT NULL OR driver_b_draft_id IS NOT NULL"
+    )).scalars().all()
+    with Session(bind=conn) as db:
+        for session_id in session_ids:
+            refresh_case_view(db, session_id)
+        db.flush()
+
+
+def _m006_optimistic_versions(conn: Connection):
+    add_column(conn, "accidentsession", "version", "INTEGER NOT NULL DEFAULT 1")
+    add_column(conn, "accidentreport", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _m007_case_bundle_url(conn: Connection):
+    add_column(conn, "accidentreport", "case_bundle_url", "VARCHAR")
+    conn.execute(text(
+        "UPDATE accidentreport SET case_bundle_url = '/police/reports/' || session_id || '/download/bundle' "
+        "WHERE case_bundle_url IS NULL AND report_details_id IS NOT NULL"
+    ))
+
+
+def _m008_keputusan_letter_date(conn: Connection):
+    # Cases signed before this stay NULL, their letter falls back to tarikh_repot
+    add_column(conn, "policereportdetails", "tarikh_surat", "DATETIME")
+
+
+def _m009_submit_idempotency_per_driver(conn: Connection):
+    add_column(conn, "accidentreportdraft", "user_id", "VARCHAR")
+    # Drafts still linked from their session know their driver
+    for column, driver in (("driver_a_draft_id", "driver_a_id"), ("driver_b_draft_id", "driver_b_id")):
+        conn.execute(text(
+            f"UPDATE accidentreportdraft SET user_id = "
+            f"(SELECT {driver} FROM accidentsession WHERE accidentsession.{column} = accidentreportdraft.id) "
+            f"WHERE user_id IS NULL"
+        ))
+    # The other driver may pick the same key without replaying this one's result
+    drop_index(conn, "ix_accidentreportdraft_idempotency_key")
+    create_index(conn, "ix_accidentreportdraft_idempotency", "accidentreportdraft",
+                 ["session_id", "user_id", "idempotency_key"], unique=True)
+
+
+MIGRATIONS = [
+    (1, "Secondary indexes on hot lookup columns", _m001_lookup_indexes),
+    (2, "Evidence media moved to the blob store", _m002_evidence_blobs),
+    (3, "Idempotency key for draft submission", _m003_submit_idempotency),
+    (4, "Keyset indexes for the police dashboard", _m004_dashboard_keyset),
+    (5, "Police case read model backfill", _m005_police_case_views),
+    (6, "Version columns for compare-and-swap updates", _m006_optimistic_versions),
+    (7, "Merged case bundle download link", _m007_case_bundle_url),
+    (8, "Keputusan letter date", _m008_keputusan_letter_date),
+    (9, "Idempotency keys scoped to the submitting driver", _m009_submit_idempotency_per_driver),
+]
+
+
+def current_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("schema_version"):
+            return 0
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar_one()
+
+
+def run_migrations(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+
+    applied = current_version(engine)
+    for version, description, migrate in MIGRATIONS:
+        if version <= applied:
+            continue
+        # One transaction per migration so a failure leaves the previous version intact
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()},
+            )
+        print(f"Applied migration {version:03d}: {description}")
@@ -1,4 +1,5 @@
 from typing import List, Optional
+from sqlalchemy import Column, JSON
 from sqlmodel import Field, SQLModel, Relationship
 from datetime import datetime
 from enum import Enum
@@ -11,13 +12,21 @@ class EvidenceType(str, Enum):
     MAP_SKETCH = "MAP_SKETCH"
     TEXT = "TEXT"
 
+# Evidence types whose content is media bytes kept in the blob store
+BLOB_EVIDENCE_TYPES = {EvidenceType.PHOTO, EvidenceType.VIDEO, EvidenceType.MAP_SKETCH}
+
 class Evidence(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     report_id: int | None = Field(default=None, foreign_key="accidentreport.id")
     uploader_id: str = Field(foreign_key="user.id")
     title: str
     type: EvidenceType
-    content: str  # Base64 or URL or raw text
+    content: str | None = None  # Raw text or URL; media bytes live in the blob store
+
+    # Blob store reference (PHOTO / VIDEO / MAP_SKETCH)
+    blob_sha256: str | None = None
+    size: int | None = None  # bytes
+    mime_type: str | None = None
     
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
@@ -26,6 +35,25 @@ class Evidence(SQLModel, table=True):
     tag: EvidenceTag | None = None  # e.g. "Car Front", "Car Back"
 
 
+class EvidenceUpload(SQLModel, table=True):
+    """
+    A resumable chunked upload. Bytes are appended to a part file next to the
+    blob store; `received` is the offset the client resumes from.
+    """
+    id: str = Field(primary_key=True)  # UUID
+    session_id: str = Field(foreign_key="accidentsession.id")
+    uploader_id: str = Field(foreign_key="user.id")
+    type: EvidenceType
+    tag: EvidenceTag | None = None
+    title: str | None = None
+    mime_type: str | None = None
+    total_size: int | None = None  # Optional, checked on completion
+
+    received: int = 0
+    evidence_id: int | None = Field(default=None, foreign_key="evidence.id")  # Set once completed
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class AccidentReportDraft(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     session_id: str = Field(foreign_key="accidentsession.id")
@@ -46,6 +74,12 @@ class AccidentReportDraft(SQLModel, table=True):
     incident_type: str | None = None  # jenis_kejadian e.g., "Maut", "Cedera", "Rosak"
     light_condition: str | None = None  # Keadaan Cahaya e.g., Day, Night
 
+    # Submission bookkeeping: retries with the same key replay submit_status.
+    # A key belongs to one driver's submissions in one session
+    user_id: str | None = None
+    idempotency_key: str | None = None
+    submit_status: str | None = None  # "WAITING_FOR_PARTNER" / "SUBMITTED"
+
 
 class AccidentReport(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -65,9 +99,14 @@ class AccidentReport(SQLModel, table=True):
     polis_repot_url: str | None = None
     rajah_kasar_url: str | None = None
     keputusan_url: str | None = None
+    # All three documents in one PDF
+    case_bundle_url: str | None = None
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    # Bumped on every write, see srcs/services/session_state.py
+    version: int = Field(default=1)
+
 class PoliceReportDetails(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     session_id: str = Field(foreign_key="accidentsession.id", unique=True)
@@ -162,6 +201,7 @@ class PoliceReportDetails(SQLModel, table=True):
     seksyen_kesalahan: str # e.g., "Sek 10 LN 166/59"
     keputusan_awal: str # e.g., "Saman Pol 257 (Kpd B)"
     catatan_keputusan: str
+    tarikh_surat: datetime | None = None # Set when the police sign, dates the Keputusan letter
     
     # Pihak Yang Disalahkan (For the letter)
     saman_no: str | None = None
@@ -174,3 +214,15 @@ class PoliceReportDetails(SQLModel, table=True):
     
     pegawai_penyiasat_nama: str
     pegawai_penyiasat_pangkat: str
+
+
+class PoliceCaseView(SQLModel, table=True):
+    """
+    Read model behind GET /police/reports/{session_id}/details: the whole
+    response (session, report details, both drivers with their drafts and
+    evidence) stored as one JSON document. Every write that changes any of
+    those rows rewrites it in the same transaction.
+    """
+    session_id: str = Field(primary_key=True, foreign_key="accidentsession.id")
+    payload: dict = Field(sa_column=Column(JSON, nullable=False))
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -23,3 +23,6 @@ class AccidentSession(SQLModel, table=True):
     meet_link: str | None = None
     status: SessionStatus = Field(default=SessionStatus.CREATED)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    # Bumped on every write, see srcs/services/session_state.py
+    version: int = Field(default=1)
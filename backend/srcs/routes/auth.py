@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from srcs.database import get_session
 from srcs.models.user import User
+from srcs.services.user_cache import user_cache
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -125,7 +126,7 @@ def login(user_id: str, session: Session = Depends(get_session)) -> User:
     """
     Mock Login. Just checks if user exists, if not creates a dummy one for the demo.
     """
-    user: User | None = session.get(User, user_id)
+    user: User | None = user_cache.get(session, user_id)
     if isinstance(user, User):
         return user
 
@@ -147,5 +148,7 @@ def login(user_id: str, session: Session = Depends(get_session)) -> User:
     session.add(user)
     session.commit()
     session.refresh(user)
+    # Every write to a profile invalidates its cached copy
+    user_cache.invalidate(user.id)
 
     return user
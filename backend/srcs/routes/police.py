@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query, Response
+from sqlalchemy import tuple_
 from sqlmodel import Session, select
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
+from datetime import datetime, timedelta
+import base64
 import os
 
-from srcs.database import get_session
+from srcs.database import get_session, run_in_session
 from srcs.models.session import AccidentSession
-from srcs.models.report import AccidentReport, AccidentReportDraft, PoliceReportDetails, Evidence, EvidenceType
+from srcs.models.report import AccidentReport, AccidentReportDraft, PoliceReportDetails, Evidence, PoliceCaseView
 from srcs.models.user import User
 from srcs.models.enums import SessionStatus
 from srcs.services.event_service import event_manager
-from srcs.services.pdf_service import PDFService
-from fastapi.responses import FileResponse
+from srcs.services.pdf_service import PDFService, PDF_PROFILES
+from srcs.services.case_view import build_case_view, refresh_case_view
+from srcs.services.user_cache import user_cache
+from srcs.services.case_export import export_session_ids, stream_case_documents
+from srcs.services.report_cache import render_cache, document_inputs, document_kwargs, render_document, download_name, REPORT_TYPES, DOWNLOAD_TYPES
+from srcs.services.session_state import compare_and_swap, transition, retry_on_conflict
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
 router = APIRouter(prefix="/police", tags=["Police"])
 
@@ -36,103 +44,154 @@ class GenerateReportRequest(BaseModel):
 
 # -----------------------
 
+# Sessions that are ready for police or already processed
+POLICE_STATUSES = [
+    SessionStatus.PENDING_POLICE,
+    SessionStatus.MEETING_STARTED,
+    SessionStatus.POLICE_SIGNED,
+    SessionStatus.COMPLETED
+]
+
+# Columns the dashboard list view needs (fields=summary)
+DASHBOARD_SUMMARY_COLUMNS = [
+    AccidentSession.id,
+    AccidentSession.status,
+    AccidentSession.created_at,
+    AccidentSession.driver_a_id,
+    AccidentSession.driver_b_id,
+    AccidentSession.police_id
+]
+
+def _encode_cursor(created_at: datetime, session_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{session_id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), session_id
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
 @router.get("/dashboard")
-def get_dashboard(db: Session = Depends(get_session)):
-    # Return all sessions that are ready for police or already processed
-    stm = select(AccidentSession).where(
-        AccidentSession.status.in_([
-            SessionStatus.PENDING_POLICE,
-            SessionStatus.MEETING_STARTED,
-            SessionStatus.POLICE_SIGNED,
-            SessionStatus.COMPLETED
-        ])
-    )
-    results = db.exec(stm).all()
-    return results
+def get_dashboard(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    status: List[SessionStatus] | None = Query(None),
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    police_id: str | None = None,
+    fields: str = Query("full", pattern="^(full|summary)$"),
+    db: Session = Depends(get_session)
+):
+    """
+    Newest sessions first, keyset-paginated on (created_at, id): pass the returned
+    next_cursor to get the following page. Each page is an index range scan, so
+    its cost does not grow with the number of sessions.
+    """
+    statuses = status or POLICE_STATUSES
+    if any(s not in POLICE_STATUSES for s in statuses):
+        raise HTTPException(400, "Status not visible on the police dashboard")
+
+    columns = DASHBOARD_SUMMARY_COLUMNS if fields == "summary" else [AccidentSession]
+    stm = select(*columns)
+
+    if date_from:
+        stm = stm.where(AccidentSession.created_at >= date_from)
+    if date_to:
+        stm = stm.where(AccidentSession.created_at < date_to)
+    if police_id:
+        stm = stm.where(AccidentSession.police_id == police_id)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        stm = stm.where(tuple_(AccidentSession.created_at, AccidentSession.id) < tuple_(cursor_created_at, cursor_id))
+
+    # One extra row tells whether another page exists
+    stm = stm.order_by(AccidentSession.created_at.desc(), AccidentSession.id.desc()).limit(limit + 1)
+
+    # One index range per status, merged here. "status IN (...)" would make
+    # SQLite collect and sort every matching session before applying the limit.
+    rows = []
+    for s in statuses:
+        rows.extend(db.exec(stm.where(AccidentSession.status == s)).all())
+    rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [row._asdict() for row in rows] if fields == "summary" else rows
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
+
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/reports/{session_id}/details", response_model=PoliceContextResponse)
 def get_report_details(session_id: str, db: Session = Depends(get_session)):
-    # 1. Fetch Session
-    session_obj = db.get(AccidentSession, session_id)
-    if not session_obj:
-        raise HTTPException(404, "Session not found")
-
-    # 2. Fetch Report (if exists)
-    stmt_report = select(AccidentReport).where(AccidentReport.session_id == session_id)
-    report = db.exec(stmt_report).first()
-    
-    report_details = None
-    if report and report.report_details_id:
-        report_details = db.get(PoliceReportDetails, report.report_details_id)
+    """
+    Served from the PoliceCaseView read model: one primary-key lookup instead of
+    a query per session, report, user, draft and evidence list.
+    """
+    view = db.get(PoliceCaseView, session_id)
+    if view:
+        return JSONResponse(view.payload)
 
-    # 3. Fetch Drivers
-    user_a = db.get(User, session_obj.driver_a_id)
-    user_b = db.get(User, session_obj.driver_b_id) if session_obj.driver_b_id else None
-    
-    # 4. Fetch Drafts
-    draft_a = db.get(AccidentReportDraft, session_obj.driver_a_draft_id) if session_obj.driver_a_draft_id else None
-    draft_b = db.get(AccidentReportDraft, session_obj.driver_b_draft_id) if session_obj.driver_b_draft_id else None
-
-    # 5. Fetch Evidences & Organize
-    # We fetch all evidence for the drafts involved
-    evidences_a = []
-    evidences_b = []
-    
-    if draft_a:
-        stmt_ev_a = select(Evidence).where(Evidence.draft_id == draft_a.id)
-        evidences_a = db.exec(stmt_ev_a).all()
-        
-    if draft_b:
-        stmt_ev_b = select(Evidence).where(Evidence.draft_id == draft_b.id)
-        evidences_b = db.exec(stmt_ev_b).all()
-
-    # Construct Response
-    return PoliceContextResponse(
-        session_id=session_id,
-        report_id=report.id if report else None,
-        report_details=report_details,
-        driver_a=DriverInfo(user=user_a, draft=draft_a, evidences=evidences_a),
-        driver_b=DriverInfo(user=user_b, draft=draft_b, evidences=evidences_b) if user_b else DriverInfo(user=User(id="unknown", name="Unknown", ic_no="", phone_number="")) # Fallback if B missing
-    )
+    # No read model yet (the session has not reached a write that maintains it)
+    payload = build_case_view(db, session_id)
+    if payload is None:
+        raise HTTPException(404, "Session not found")
+    return JSONResponse(payload)
 
-@router.post("/meeting")
-async def start_meeting(session_id: str, police_id: str, db: Session = Depends(get_session)):
+@retry_on_conflict
+def _start_meeting(db: Session, session_id: str, police_id: str) -> str:
     session_obj = db.get(AccidentSession, session_id)
     if not session_obj:
         raise HTTPException(404, "Session not found")
         
     # Generate Google Meet Link (Mocked)
     link = f"https://meet.google.com/mock-{session_id[:8]}"
-    session_obj.meet_link = link
-    session_obj.police_id = police_id
-    session_obj.status = SessionStatus.MEETING_STARTED
+    transition(db, session_obj, SessionStatus.MEETING_STARTED, meet_link=link, police_id=police_id)
     
-    db.add(session_obj)
     db.commit()
+    return link
+
+@router.post("/meeting")
+async def start_meeting(session_id: str, police_id: str):
+    link = await run_in_session(_start_meeting, session_id, police_id)
     
     await event_manager.publish(session_id, "MEETING_STARTED", {"link": link})
     return {"link": link}
 
-@router.post("/sign")
-async def sign_report_police(session_id: str, police_id: str, signature: str, db: Session = Depends(get_session)):
+@retry_on_conflict
+def _sign_report_police(db: Session, session_id: str, signature: str):
     stm = select(AccidentReport).where(AccidentReport.session_id == session_id)
     report = db.exec(stm).first()
     if not report:
         raise HTTPException(404, "Report not found")
         
-    report.police_signature = signature
-    db.add(report)
-    
     session_obj = db.get(AccidentSession, session_id)
-    session_obj.status = SessionStatus.POLICE_SIGNED
-    db.add(session_obj)
+    transition(db, session_obj, SessionStatus.POLICE_SIGNED)
+    compare_and_swap(db, report, police_signature=signature)
+
+    # The Keputusan letter is dated by the signature, in Malaysia time like tarikh_repot
+    details = db.get(PoliceReportDetails, report.report_details_id) if report.report_details_id else None
+    if details and not details.tarikh_surat:
+        details.tarikh_surat = datetime.utcnow() + timedelta(hours=8)
+        db.add(details)
+    refresh_case_view(db, session_id)
     
     db.commit()
+
+@router.post("/sign")
+async def sign_report_police(session_id: str, police_id: str, signature: str):
+    await run_in_session(_sign_report_police, session_id, signature)
     
     await event_manager.publish(session_id, "POLICE_SIGNED", {"status": "SIGNED", "police_id": police_id})
     return {"status": "SIGNED"}
 
-pdf_service = PDFService()
+# One service per output profile (?profile= on downloads)
+pdf_services = {profile: PDFService(profile=profile) for profile in PDF_PROFILES}
+pdf_service = pdf_services["standard"]
 
 @router.post("/reports/generate")
 def generate_reports(req: GenerateReportRequest, db: Session = Depends(get_session)):
@@ -158,11 +217,11 @@ def generate_reports(req: GenerateReportRequest, db: Session = Depends(get_sessi
             faulty_car_model = None
             
             if req.faulty_driver == "A":
-                faulty_user = db.get(User, session_obj.driver_a_id)
+                faulty_user = user_cache.get(db, session_obj.driver_a_id)
                 faulty_car_no = details.kenderaan_a_no
                 faulty_car_model = details.kenderaan_a_jenis
             elif req.faulty_driver == "B" and session_obj.driver_b_id:
-                faulty_user = db.get(User, session_obj.driver_b_id)
+                faulty_user = user_cache.get(db, session_obj.driver_b_id)
                 faulty_car_no = details.kenderaan_b_no
                 faulty_car_model = details.kenderaan_b_jenis
             
@@ -184,71 +243,88 @@ def generate_reports(req: GenerateReportRequest, db: Session = Depends(get_sessi
         details.saman_no = f"SAMAN-{str(uuid.uuid4())[:8].upper()}"
 
     db.add(details)
+    refresh_case_view(db, report.session_id)
     db.commit()
     db.refresh(details)
     
-    # 3. Resolve Sketch (In-Memory)
-    import io
-    import base64
-    sketch_data = None
-    
-    stmt_sketch = select(Evidence).where(
-        Evidence.type == EvidenceType.MAP_SKETCH,
-        Evidence.draft_id.in_([report.driver_a_draft_id, report.driver_b_draft_id])
-    ).limit(1)
-    
-    sketch_ev = db.exec(stmt_sketch).first()
-    
-    if sketch_ev and sketch_ev.content:
-        try:
-            content = sketch_ev.content
-            if "," in content:
-                _, content = content.split(",", 1)
-            img_bytes = base64.b64decode(content)
-            sketch_data = io.BytesIO(img_bytes)
-        except Exception as e:
-            print(f"Failed to decode sketch: {e}")
-            sketch_data = None
-    
-    # 4. Determine Signatures
-    # We pass the Name of the signer if signature exists
-    signed_by_pengadu = None
-    signed_by_police = None
-    
-    if report.driver_a_signature:
-         signed_by_pengadu = details.pengadu_nama # Driver A is pengadu
-    if report.police_signature:
-         signed_by_police = details.pegawai_penyiasat_nama
+    # 3. Signer names and sketch, passed to each document's generator
+    documents = {
+        report_type: document_kwargs(report_type, **document_inputs(db, report, details, report_type))
+        for report_type in REPORT_TYPES
+    }
 
-    # 5. Generate PDFs
+    # 4. Generate PDFs, all three at once in the worker processes
     try:
-        # 1. Polis Repot
-        p_path = pdf_service.generate_polis_repot(
-            details, 
-            signed_by_pengadu=signed_by_pengadu, 
-            signed_by_police=signed_by_police
-        )
-        
-        # 2. Rajah Kasar 
-        r_path = pdf_service.generate_rajah_kasar(details, sketch_data=sketch_data)
-        
-        # 3. Keputusan
-        k_path = pdf_service.generate_keputusan(details)
+        paths = pdf_service.generate_batch(details, documents)
 
         return {
             "message": "Reports generated successfully",
             "files": {
-                "polis_repot": f"/reports/{os.path.basename(p_path)}",
-                "rajah_kasar": f"/reports/{os.path.basename(r_path)}",
-                "keputusan": f"/reports/{os.path.basename(k_path)}"
+                report_type: f"/reports/{os.path.basename(path)}"
+                for report_type, path in paths.items()
             }
         }
     except Exception as e:
         raise HTTPException(500, f"Failed to generate reports: {str(e)}")
 
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _stream_pdf(pdf: bytes, filename: str, headers: dict) -> StreamingResponse:
+    async def chunks():
+        view = memoryview(pdf)
+        for start in range(0, len(view), PDF_STREAM_CHUNK_SIZE):
+            yield view[start:start + PDF_STREAM_CHUNK_SIZE]
+
+    return StreamingResponse(chunks(), media_type='application/pdf', headers={
+        **headers,
+        "Content-Length": str(len(pdf)),
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+@router.get("/reports/export")
+def export_reports(
+    status: List[SessionStatus] | None = Query(None),
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    station: str | None = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_session)
+):
+    """
+    One ZIP with the three documents of every matching case, streamed while it
+    is built: only the list of session ids is held up front.
+    """
+    statuses = status or POLICE_STATUSES
+    if any(s not in POLICE_STATUSES for s in statuses):
+        raise HTTPException(400, "Status not visible on the police dashboard")
+
+    session_ids = export_session_ids(db, statuses, date_from, date_to, station, limit)
+    filename = f"cases_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_case_documents(pdf_service, session_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/reports/{session_id}/download/{report_type}")
-def download_report(session_id: str, report_type: str, db: Session = Depends(get_session)):
-    # report_type: 'polis_repot', 'rajah_kasar', 'keputusan'
+def download_report(
+    session_id: str,
+    report_type: str,
+    profile: str = "standard",
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_session)
+):
+    """
+    PDFs come from the render cache: the inputs are hashed first, so a repeat
+    download is a 304 or a file send and never runs ReportLab.
+    profile=compact trades image quality for size, for mobile clients.
+    """
+    # report_type: 'polis_repot', 'rajah_kasar', 'keputusan', or 'bundle' for all three in one file
+    if report_type not in DOWNLOAD_TYPES:
+        raise HTTPException(400, "Invalid report type")
+    if profile not in PDF_PROFILES:
+        raise HTTPException(400, "Invalid profile")
     
     # Needs session to find report to find drivers
     session_obj = db.get(AccidentSession, session_id)
@@ -262,60 +338,27 @@ def download_report(session_id: str, report_type: str, db: Session = Depends(get
         raise HTTPException(404, "Report details not found")
         
     details = db.get(PoliceReportDetails, report.report_details_id)
+    inputs = document_inputs(db, report, details, report_type)
+    
+    key = render_cache.key(report_type, details, profile=profile, **inputs)
+    etag = f'"{key}"'
+    # Same URL, new content once the details or signatures change: always revalidate
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
     
     try:
-        path = ""
-        
-        if report_type == "polis_repot":
-            # Check signatures again
-            signed_by_pengadu = None
-            signed_by_police = None
-            
-            # Driver A is Pengadu
-            if report.driver_a_signature:
-                signed_by_pengadu = details.pengadu_nama
-            if report.police_signature:
-                signed_by_police = details.pegawai_penyiasat_nama
-            
-            path = pdf_service.generate_polis_repot(
-                details,
-                signed_by_pengadu=signed_by_pengadu,
-                signed_by_police=signed_by_police
-            )
-            
-        elif report_type == "rajah_kasar":
-            # Re-fetch sketch
-            import io
-            import base64
-            sketch_data = None
-            
-            stmt_sketch = select(Evidence).where(
-                Evidence.type == EvidenceType.MAP_SKETCH,
-                Evidence.draft_id.in_([report.driver_a_draft_id, report.driver_b_draft_id])
-            ).limit(1)
-            
-            sketch_ev = db.exec(stmt_sketch).first()
-            
-            if sketch_ev and sketch_ev.content:
-                try:
-                    content = sketch_ev.content
-                    if "," in content:
-                        _, content = content.split(",", 1)
-                    img_bytes = base64.b64decode(content)
-                    sketch_data = io.BytesIO(img_bytes)
-                except:
-                    pass
-            
-            path = pdf_service.generate_rajah_kasar(details, sketch_data=sketch_data)
-            
-        elif report_type == "keputusan":
-            path = pdf_service.generate_keputusan(details)
-        else:
-            raise HTTPException(400, "Invalid report type")
-            
-        if not os.path.exists(path):
-             raise HTTPException(500, "Report file creation failed")
-             
-        return FileResponse(path, filename=os.path.basename(path), media_type='application/pdf')
+        path, pdf = render_cache.fetch_or_render(
+            report_type, details.id, key,
+            lambda: render_document(pdf_services[profile], report_type, details, **inputs),
+            profile
+        )
     except Exception as e:
         raise HTTPException(500, f"Error retrieving report: {str(e)}")
+    
+    filename = download_name(report_type, details)
+    if pdf is None:
+        return FileResponse(path, filename=filename, media_type='application/pdf', headers=headers)
+    # Rendered by this request: send the bytes from memory instead of reading the file back
+    return _stream_pdf(pdf, filename, headers)
@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import os
+import uuid
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import FileResponse
+from starlette.requests import ClientDisconnect
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 from typing import List
 from pydantic import BaseModel
 
-from srcs.database import get_session
+from srcs.config import EVIDENCE_UPLOAD_MAX_BYTES
+from srcs.database import get_session, run_in_session
 from srcs.models.session import AccidentSession
-from srcs.models.report import AccidentReport, Evidence, EvidenceType, AccidentReportDraft, PoliceReportDetails
+from srcs.models.report import AccidentReport, Evidence, EvidenceType, EvidenceUpload, AccidentReportDraft, PoliceReportDetails, BLOB_EVIDENCE_TYPES
 from srcs.models.enums import SessionStatus, EvidenceTag
 from srcs.models.user import User
 from srcs.services.event_service import event_manager
 from srcs.services.report_aggregator import generate_police_details
+from srcs.services.blob_store import blob_store, decode_media, sniff_mime_type
+from srcs.services.case_view import refresh_case_view
+from srcs.services.user_cache import user_cache
+from srcs.services.session_state import compare_and_swap, transition, retry_on_conflict
 
 router = APIRouter(prefix="/report", tags=["Report"])
 
@@ -34,14 +47,79 @@ class DraftData(BaseModel):
 class SubmitRequest(BaseModel):
     session_id: str
     user_id: str
-    evidences: List[EvidenceItem]
+    evidences: List[EvidenceItem] = []
+    evidence_ids: List[int] = [] # Evidence uploaded beforehand via /report/evidence/uploads
     draft: DraftData
 
-@router.post("/submit")
-async def submit_report(req: SubmitRequest, db: Session = Depends(get_session)):
-    # 1. Save Draft
+class UploadStartRequest(BaseModel):
+    session_id: str
+    user_id: str
+    type: EvidenceType
+    tag: EvidenceTag
+    title: str | None = None
+    mime_type: str | None = None
+    total_size: int | None = None
+
+def _find_submit(db: Session, req: SubmitRequest, idempotency_key: str):
+    # Only this driver's own submissions: the partner may send the same key
+    stmt = select(AccidentReportDraft).where(
+        AccidentReportDraft.session_id == req.session_id,
+        AccidentReportDraft.user_id == req.user_id,
+        AccidentReportDraft.idempotency_key == idempotency_key
+    )
+    draft = db.exec(stmt).first()
+    if not draft:
+        return None
+    # Replayed: original result, nothing written and no events re-published
+    return draft.submit_status, None, True
+
+@retry_on_conflict
+def _submit_report(db: Session, req: SubmitRequest, idempotency_key: str | None = None):
+    """
+    Returns (status, report_id, replayed). report_id is set when this submit completed the pair.
+    Runs again from the start if the other driver's submit changed the session meanwhile.
+    """
+    if idempotency_key:
+        replay = _find_submit(db, req, idempotency_key)
+        if replay:
+            return replay
+
+    try:
+        return _save_submit(db, req, idempotency_key)
+    except IntegrityError:
+        # A concurrent retry with the same key committed first
+        db.rollback()
+        replay = _find_submit(db, req, idempotency_key) if idempotency_key else None
+        if not replay:
+            raise
+        return replay
+
+def _save_submit(db: Session, req: SubmitRequest, idempotency_key: str | None):
+    """
+    Saves the draft, its evidence and, once both drivers are in, the final report
+    as a single transaction: one commit, evidence written in bulk.
+    """
     from datetime import datetime
-    
+
+    session_obj = db.get(AccidentSession, req.session_id)
+    if not session_obj:
+        raise HTTPException(404, "Session not found")
+    if session_obj.status not in (SessionStatus.CREATED, SessionStatus.HANDSHAKE):
+        raise HTTPException(409, "Drafts are locked once the case is with the police")
+    if req.user_id not in (session_obj.driver_a_id, session_obj.driver_b_id):
+        raise HTTPException(403, "User not part of this session")
+
+    # Evidence uploaded in chunks must belong to this user and not be attached yet
+    if req.evidence_ids:
+        stmt_uploaded = select(Evidence.id).where(
+            Evidence.id.in_(req.evidence_ids),
+            Evidence.uploader_id == req.user_id,
+            Evidence.draft_id == None
+        )
+        if len(db.exec(stmt_uploaded).all()) != len(set(req.evidence_ids)):
+            raise HTTPException(400, "Unknown or already submitted evidence id")
+
+    # 1. Save Draft
     # Parse time
     acc_time = None
     if req.draft.accident_time:
@@ -52,6 +130,7 @@ async def submit_report(req: SubmitRequest, db: Session = Depends(get_session)):
 
     new_draft = AccidentReportDraft(
         session_id=req.session_id,
+        user_id=req.user_id,
         weather=req.draft.weather,
         accident_time=acc_time,
         road_surface=req.draft.road_surface,
@@ -61,68 +140,64 @@ async def submit_report(req: SubmitRequest, db: Session = Depends(get_session)):
         at_fault_driver=req.draft.at_fault_driver,
         reason=req.draft.reason,
         incident_type=req.draft.incident_type,
-        light_condition=req.draft.light_condition
+        light_condition=req.draft.light_condition,
+        idempotency_key=idempotency_key
     )
     db.add(new_draft)
-    db.commit()
-    db.refresh(new_draft)
+    db.flush() # Assigns new_draft.id, nothing is committed yet
 
     # 2. Update Session (Link Draft)
-    session_obj = db.get(AccidentSession, req.session_id)
-    if not session_obj:
-        raise HTTPException(404, "Session not found")
-
-    is_driver_a = (session_obj.driver_a_id == req.user_id)
-    if is_driver_a:
-        session_obj.driver_a_draft_id = new_draft.id
-    elif session_obj.driver_b_id == req.user_id:
-        session_obj.driver_b_draft_id = new_draft.id
-    
-    db.add(session_obj)
-    db.commit()
+    # Version-checked: if both drivers submit at once, one of them re-runs and
+    # sees the other's draft, so exactly one of them creates the report
+    if session_obj.driver_a_id == req.user_id:
+        compare_and_swap(db, session_obj, driver_a_draft_id=new_draft.id)
+    else:
+        compare_and_swap(db, session_obj, driver_b_draft_id=new_draft.id)
 
-    # 3. Add Evidence (Link to Report? No, link to Draft or Session. The current model links to Report ID)
-    # Issue: We don't have an AccidentReport yet if this is the first submitter.
-    # Checks Evidence model: 'report_id' is optional, 'draft_id' is optional.
-    # Let's link to draft_id (newly created)
-    
+    # 3. Add Evidence, linked to the draft (the report does not exist yet for the first submitter)
+    # Media is written to the blob store up front; if the transaction fails the
+    # orphaned blobs are harmless since they are content-addressed.
+    now = datetime.utcnow()
+    evidence_rows = []
     for item in req.evidences:
-        final_title = item.title if item.title else item.tag.value
-        ev = Evidence(
-            draft_id=new_draft.id, # Linked to this specific draft
-            uploader_id=req.user_id,
-            type=item.type,
-            tag=item.tag,
-            title=final_title,
-            content=item.content
-        )
-        db.add(ev)
-    db.commit()
+        row = {
+            "draft_id": new_draft.id,
+            "uploader_id": req.user_id,
+            "type": item.type,
+            "tag": item.tag,
+            "title": item.title if item.title else item.tag.value,
+            "timestamp": now
+        }
+        if item.type in BLOB_EVIDENCE_TYPES and not item.content.startswith("http"):
+            # Media goes to the blob store, the row only keeps the reference
+            data, row["mime_type"] = decode_media(item.content)
+            row["blob_sha256"], row["size"] = blob_store.put_bytes(data)
+        else:
+            row["content"] = item.content
+        evidence_rows.append(row)
+
+    if evidence_rows:
+        db.execute(insert(Evidence), evidence_rows)
+    if req.evidence_ids:
+        db.execute(update(Evidence).where(Evidence.id.in_(req.evidence_ids)).values(draft_id=new_draft.id))
 
     # 4. Check if we should generate the Final Report
-    db.refresh(session_obj)
-    
+    report_id = None
     if session_obj.driver_a_draft_id and session_obj.driver_b_draft_id:
         # Both Submitted!
-        
-        # Fetch Users
-        user_a = db.get(User, session_obj.driver_a_id)
-        user_b = db.get(User, session_obj.driver_b_id)
-        
-        # Fetch Drafts
+        user_a = user_cache.get(db, session_obj.driver_a_id)
+        user_b = user_cache.get(db, session_obj.driver_b_id)
         draft_a = db.get(AccidentReportDraft, session_obj.driver_a_draft_id)
         draft_b = db.get(AccidentReportDraft, session_obj.driver_b_draft_id)
-        
+
         # Generate Details
         details = generate_police_details(req.session_id, draft_a, draft_b, user_a, user_b)
         db.add(details)
-        db.commit()
-        db.refresh(details)
-        
+        db.flush()
+
         # Create AccidentReport
         # Generate Download Links (Points to Police endpoint)
         base_url = f"/police/reports/{req.session_id}/download"
-        
         report = AccidentReport(
             session_id=req.session_id,
             driver_a_draft_id=draft_a.id,
@@ -130,33 +205,256 @@ async def submit_report(req: SubmitRequest, db: Session = Depends(get_session)):
             report_details_id=details.id,
             polis_repot_url=f"{base_url}/polis_repot",
             rajah_kasar_url=f"{base_url}/rajah_kasar",
-            keputusan_url=f"{base_url}/keputusan"
+            keputusan_url=f"{base_url}/keputusan",
+            case_bundle_url=f"{base_url}/bundle"
         )
         db.add(report)
-        
+        db.flush()
+        report_id = report.id
+
         # Update Session
-        session_obj.status = SessionStatus.PENDING_POLICE
-        session_obj.final_report_id = report.id # Wait, verifying field name -> session.py says final_report_id
-        # Let's check session.py line 21: final_report_id: int | None
-        # Yes.
-        
-        db.add(session_obj)
-        db.commit()
-        db.refresh(report)
-        
-        # Update Report ID in Evidences?
-        # Ideally evidence should point to the final report too? 
-        # Current Evidence model has 'report_id'.
-        # We can update all evidences related to these drafts to point to this report_id.
-        stmt_update_ev = select(Evidence).where(Evidence.draft_id.in_([draft_a.id, draft_b.id]))
-        evidences = db.exec(stmt_update_ev).all()
-        for e in evidences:
-            e.report_id = report.id
-            db.add(e)
-        db.commit()
-
-        await event_manager.publish(req.session_id, "ALL_REPORTS_SUBMITTED", {"report_id": report.id})
-        return {"status": "SUBMITTED"}
-    else:
-        await event_manager.publish(req.session_id, "REPORT_SUBMITTED", {"user_id": req.user_id})
-        return {"status": "WAITING_FOR_PARTNER"}
+        transition(db, session_obj, SessionStatus.PENDING_POLICE, final_report_id=report.id)
+
+        # Point every evidence of both drafts at the final report in one statement
+        db.execute(
+            update(Evidence)
+            .where(Evidence.draft_id.in_([draft_a.id, draft_b.id]))
+            .values(report_id=report.id)
+        )
+
+    new_draft.submit_status = "SUBMITTED" if report_id else "WAITING_FOR_PARTNER"
+    db.add(new_draft)
+    refresh_case_view(db, req.session_id)
+    db.commit()
+
+    return new_draft.submit_status, report_id, False
+
+@router.post("/submit")
+async def submit_report(req: SubmitRequest, idempotency_key: str | None = Header(default=None)):
+    """
+    Retries with the same Idempotency-Key header return the original result without writing again.
+    """
+    status, report_id, replayed = await run_in_session(_submit_report, req, idempotency_key)
+
+    if not replayed:
+        if report_id is not None:
+            await event_manager.publish(req.session_id, "ALL_REPORTS_SUBMITTED", {"report_id": report_id})
+        else:
+            await event_manager.publish(req.session_id, "REPORT_SUBMITTED", {"user_id": req.user_id})
+    return {"status": status}
+
+@router.get("/evidence/{evidence_id}/content")
+def get_evidence_content(evidence_id: int, db: Session = Depends(get_session)):
+    """
+    Streams an evidence file (photo, video, sketch) straight from the blob store.
+    """
+    ev = db.get(Evidence, evidence_id)
+    if not ev:
+        raise HTTPException(404, "Evidence not found")
+    if not ev.blob_sha256:
+        raise HTTPException(404, "Evidence has no stored file")
+
+    # Content-addressed, so the bytes behind this URL never change
+    return FileResponse(
+        blob_store.path_for(ev.blob_sha256),
+        media_type=ev.mime_type or "application/octet-stream",
+        headers={"Cache-Control": "private, max-age=31536000, immutable", "ETag": f'"{ev.blob_sha256}"'}
+    )
+
+# --- Chunked Evidence Upload ---
+# Large media (dashcam videos) is streamed as raw bytes in any number of PUTs,
+# each starting at the offset the server has stored. After a dropped connection
+# the client asks for the offset and continues from there.
+#
+# The offset lives in EvidenceUpload.received, so an upload resumes after a
+# restart. _active_uploads only keeps two chunks of one upload from being
+# written at once within this process; with several worker processes, the
+# PUTs of one upload must reach the same worker.
+
+_active_uploads: set[str] = set()
+
+# MIME type family each media evidence type may be uploaded as
+_UPLOAD_MIME_PREFIXES = {
+    EvidenceType.PHOTO: "image/",
+    EvidenceType.MAP_SKETCH: "image/",
+    EvidenceType.VIDEO: "video/",
+}
+
+def _upload_state(upload: EvidenceUpload) -> dict:
+    return {
+        "upload_id": upload.id,
+        "offset": upload.received,
+        "total_size": upload.total_size,
+        "evidence_id": upload.evidence_id
+    }
+
+def _upload_limit(upload: EvidenceUpload) -> int:
+    return min(upload.total_size or EVIDENCE_UPLOAD_MAX_BYTES, EVIDENCE_UPLOAD_MAX_BYTES)
+
+def _create_upload(db: Session, req: UploadStartRequest) -> dict:
+    session_obj = db.get(AccidentSession, req.session_id)
+    if not session_obj:
+        raise HTTPException(404, "Session not found")
+    if session_obj.status not in (SessionStatus.CREATED, SessionStatus.HANDSHAKE):
+        raise HTTPException(409, "Drafts are locked once the case is with the police")
+    if req.user_id not in (session_obj.driver_a_id, session_obj.driver_b_id):
+        raise HTTPException(403, "User not part of this session")
+
+    if req.type not in _UPLOAD_MIME_PREFIXES:
+        raise HTTPException(400, "Only photo, video and sketch evidence can be uploaded")
+    if req.mime_type and not req.mime_type.startswith(_UPLOAD_MIME_PREFIXES[req.type]):
+        raise HTTPException(415, f"{req.mime_type} is not a valid type for {req.type.value} evidence")
+    if req.total_size is not None and not 0 < req.total_size <= EVIDENCE_UPLOAD_MAX_BYTES:
+        raise HTTPException(413, f"total_size must be between 1 and {EVIDENCE_UPLOAD_MAX_BYTES} bytes")
+
+    upload = EvidenceUpload(
+        id=str(uuid.uuid4()),
+        session_id=req.session_id,
+        uploader_id=req.user_id,
+        type=req.type,
+        tag=req.tag,
+        title=req.title,
+        mime_type=req.mime_type,
+        total_size=req.total_size
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    return _upload_state(upload)
+
+def _get_upload(db: Session, upload_id: str) -> EvidenceUpload:
+    upload = db.get(EvidenceUpload, upload_id)
+    if not upload:
+        raise HTTPException(404, "Upload not found")
+    return upload
+
+def _advance_upload(db: Session, upload_id: str, offset: int, written: int) -> dict:
+    # Only from the offset the chunk was written at: a duplicate of a chunk that
+    # already moved the offset on must not count its bytes a second time
+    result = db.execute(
+        update(EvidenceUpload)
+        .where(EvidenceUpload.id == upload_id, EvidenceUpload.received == offset, EvidenceUpload.evidence_id.is_(None))
+        .values(received=offset + written)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    upload = _get_upload(db, upload_id)
+    if result.rowcount != 1:
+        raise HTTPException(409, {"message": "Offset mismatch, resume from the stored offset", "offset": upload.received})
+    return _upload_state(upload)
+
+def _open_part_file(path: str, offset: int):
+    # Drop anything past the stored offset (bytes of an interrupted chunk that were never acknowledged)
+    f = open(path, "r+b" if offset else "wb")
+    f.truncate(offset)
+    f.seek(offset)
+    return f
+
+def _complete_upload(db: Session, upload_id: str) -> dict:
+    upload = _get_upload(db, upload_id)
+    part_path = blob_store.upload_path(upload_id)
+    if upload.evidence_id:
+        # Completed before, but stopped between the commit and moving the bytes into the store
+        ev = db.get(Evidence, upload.evidence_id)
+        if ev and not blob_store.exists(ev.blob_sha256) and os.path.exists(part_path):
+            blob_store.put_file(part_path, ev.blob_sha256)
+        return _upload_state(upload)
+
+    if upload.received == 0 or not os.path.exists(part_path):
+        raise HTTPException(409, "Nothing received for this upload")
+    if upload.total_size is not None and upload.received != upload.total_size:
+        raise HTTPException(409, f"Upload incomplete: {upload.received} of {upload.total_size} bytes received")
+    if os.path.getsize(part_path) < upload.received:
+        raise HTTPException(409, {"message": "Stored bytes do not match the offset, resume from 0", "offset": 0})
+
+    # Bytes past the stored offset were never acknowledged
+    with open(part_path, "r+b") as f:
+        f.truncate(upload.received)
+        mime_type = upload.mime_type or sniff_mime_type(f.read(16))
+    sha256, size = blob_store.hash_file(part_path)
+
+    # The Evidence row and the link to it commit together, and only for the
+    # request that finds the upload still open: no orphan or duplicate rows
+    ev = Evidence(
+        uploader_id=upload.uploader_id,
+        type=upload.type,
+        tag=upload.tag,
+        title=upload.title or (upload.tag.value if upload.tag else upload.type.value),
+        blob_sha256=sha256,
+        size=size,
+        mime_type=mime_type
+    )
+    db.add(ev)
+    db.flush()
+    result = db.execute(
+        update(EvidenceUpload)
+        .where(EvidenceUpload.id == upload_id, EvidenceUpload.evidence_id.is_(None))
+        .values(evidence_id=ev.id, mime_type=mime_type)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        # Completed by a concurrent request
+        db.rollback()
+        return _upload_state(_get_upload(db, upload_id))
+    db.commit()
+
+    # Content-addressed, so moving it in after the commit is safe to repeat
+    blob_store.put_file(part_path, sha256)
+    db.refresh(upload)
+    return _upload_state(upload)
+
+@router.post("/evidence/uploads")
+async def start_evidence_upload(req: UploadStartRequest):
+    return await run_in_session(_create_upload, req)
+
+@router.get("/evidence/uploads/{upload_id}")
+async def get_evidence_upload(upload_id: str):
+    """
+    Current resume offset of an upload.
+    """
+    upload = await run_in_session(_get_upload, upload_id)
+    return _upload_state(upload)
+
+@router.put("/evidence/uploads/{upload_id}")
+async def upload_evidence_chunk(upload_id: str, offset: int, request: Request):
+    """
+    Appends the raw request body at `offset`, streaming it to disk chunk by chunk.
+    """
+    # Taken before the offset is read, so the check below cannot be stale
+    if upload_id in _active_uploads:
+        raise HTTPException(409, "A chunk for this upload is already in progress")
+    _active_uploads.add(upload_id)
+    try:
+        upload = await run_in_session(_get_upload, upload_id)
+        if upload.evidence_id:
+            raise HTTPException(409, "Upload already completed")
+        if offset != upload.received:
+            raise HTTPException(409, {"message": "Offset mismatch, resume from the stored offset", "offset": upload.received})
+
+        written = 0
+        limit = _upload_limit(upload)
+        try:
+            f = await asyncio.to_thread(_open_part_file, blob_store.upload_path(upload_id), offset)
+            try:
+                async for chunk in request.stream():
+                    # Nothing of this PUT is acknowledged, the next one truncates it
+                    if offset + written + len(chunk) > limit:
+                        raise HTTPException(413, {"message": f"Upload exceeds {limit} bytes", "offset": upload.received})
+                    await asyncio.to_thread(f.write, chunk)
+                    written += len(chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+        except ClientDisconnect:
+            # Keep whatever arrived, the client resumes from the stored offset
+            pass
+        return await run_in_session(_advance_upload, upload_id, offset, written)
+    finally:
+        _active_uploads.discard(upload_id)
+
+@router.post("/evidence/uploads/{upload_id}/complete")
+async def complete_evidence_upload(upload_id: str):
+    """
+    Moves the finished upload into the blob store and creates its Evidence row.
+    Pass the returned evidence_id in `evidence_ids` of /report/submit.
+    """
+    return await run_in_session(_complete_upload, upload_id)
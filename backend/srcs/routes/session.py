@@ -1,22 +1,39 @@
 import uuid
-import os
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
 from sse_starlette.sse import EventSourceResponse
 
-from srcs.database import get_session
+from srcs.database import get_session, run_in_session
 from srcs.models.session import AccidentSession
-from srcs.models.report import AccidentReport, PoliceReportDetails, Evidence, EvidenceType
+from srcs.models.report import AccidentReport
 from srcs.models.enums import SessionStatus
 from srcs.services.event_service import event_manager
 from srcs.services.qr_service import QRService
-from srcs.services.pdf_service import PDFService
+from srcs.services.case_view import refresh_case_view
+from srcs.services.user_cache import user_cache
+from srcs.services.session_state import compare_and_swap, transition, retry_on_conflict
+from srcs.services.report_jobs import report_jobs
 from srcs.config import HOST, PORT
 
 router = APIRouter(prefix="/session", tags=["Session"])
 
+def _otp_in_use(db: Session, otp: str) -> bool:
+    statement = select(AccidentSession.id).where(
+        AccidentSession.otp == otp,
+        AccidentSession.status != SessionStatus.COMPLETED
+    )
+    return db.exec(statement).first() is not None
+
+def _save_session(db: Session, new_session: AccidentSession) -> str:
+    # OTPs are only 6 digits: re-draw while an open session still uses this one
+    while _otp_in_use(db, new_session.otp):
+        new_session.otp = QRService.generate_otp()
+    db.add(new_session)
+    db.commit()
+    return new_session.otp
+
 @router.post("/create")
-async def create_session(user_id: str, db: Session = Depends(get_session)):
+async def create_session(user_id: str):
     session_id = str(uuid.uuid4())
     otp = QRService.generate_otp()
     
@@ -26,8 +43,7 @@ async def create_session(user_id: str, db: Session = Depends(get_session)):
         driver_a_id=user_id,
         status=SessionStatus.CREATED
     )
-    db.add(new_session)
-    db.commit()
+    otp = await run_in_session(_save_session, new_session)
     
     # Generate QR with OTP embedded logic (or just link to deep link)
     # For this demo, we can just encode the OTP or SessionID+OTP
@@ -43,9 +59,13 @@ async def create_session(user_id: str, db: Session = Depends(get_session)):
 
 from srcs.models.user import User
 
-@router.post("/join")
-async def join_session(otp: str, user_id: str, db: Session = Depends(get_session)):
-    statement = select(AccidentSession).where(AccidentSession.otp == otp)
+@retry_on_conflict
+def _join_session(db: Session, otp: str, user_id: str):
+    # OTPs are only unique among open sessions
+    statement = select(AccidentSession).where(
+        AccidentSession.otp == otp,
+        AccidentSession.status != SessionStatus.COMPLETED
+    )
     session_obj = db.exec(statement).first()
     
     if not session_obj:
@@ -55,22 +75,30 @@ async def join_session(otp: str, user_id: str, db: Session = Depends(get_session
     if session_obj.driver_b_id:
          if session_obj.driver_b_id != user_id:
              raise HTTPException(status_code=400, detail="Session full")
-    
-    session_obj.driver_b_id = user_id
-    session_obj.status = SessionStatus.HANDSHAKE
-    db.add(session_obj)
-    db.commit()
+    else:
+        # Two drivers scanning at once: only one of them wins the version check
+        transition(db, session_obj, SessionStatus.HANDSHAKE, driver_b_id=user_id)
+        refresh_case_view(db, session_obj.id)
+        db.commit()
     
     # Notify Listener (Driver A) - Include Driver B's details
-    driver_b = db.get(User, user_id)
+    driver_b = user_cache.get(db, user_id)
     driver_b_data = driver_b.model_dump() if driver_b else {"id": user_id, "name": "Unknown"}
+    return session_obj.id, driver_b_data
 
-    await event_manager.publish(session_obj.id, "HANDSHAKE_COMPLETE", {"driver_b": driver_b_data})
-    return {"session_id": session_obj.id, "status": "JOINED"}
+@router.post("/join")
+async def join_session(otp: str, user_id: str):
+    session_id, driver_b_data = await run_in_session(_join_session, otp, user_id)
 
-@router.post("/reconnect")
-async def reconnect_session(otp: str, user_id: str, db: Session = Depends(get_session)):
-    statement = select(AccidentSession).where(AccidentSession.otp == otp)
+    await event_manager.publish(session_id, "HANDSHAKE_COMPLETE", {"driver_b": driver_b_data})
+    return {"session_id": session_id, "status": "JOINED"}
+
+def _reconnect_session(db: Session, otp: str, user_id: str):
+    # Like join: a completed session may share its OTP with a newer one
+    statement = select(AccidentSession).where(
+        AccidentSession.otp == otp,
+        AccidentSession.status != SessionStatus.COMPLETED
+    )
     session_obj = db.exec(statement).first()
 
     if not session_obj:
@@ -91,7 +119,7 @@ async def reconnect_session(otp: str, user_id: str, db: Session = Depends(get_se
     # Fetch Partner Details
     partner = None
     if partner_id:
-        partner_obj = db.get(User, partner_id)
+        partner_obj = user_cache.get(db, partner_id)
         if partner_obj:
             partner = partner_obj.model_dump()
 
@@ -110,6 +138,10 @@ async def reconnect_session(otp: str, user_id: str, db: Session = Depends(get_se
         "has_submitted_draft": has_submitted
     }
 
+@router.post("/reconnect")
+async def reconnect_session(otp: str, user_id: str):
+    return await run_in_session(_reconnect_session, otp, user_id)
+
 @router.get("/stream/{session_id}")
 async def message_stream(request: Request, session_id: str):
     return EventSourceResponse(event_manager.subscribe(session_id))
@@ -122,10 +154,10 @@ def get_report_meta(session_id: str, db: Session = Depends(get_session)):
         raise HTTPException(404, "Report not found")
     return report
 
-@router.post("/sign")
-async def sign_session(session_id: str, user_id: str, signature: str, db: Session = Depends(get_session)):
+@retry_on_conflict
+def _sign_session(db: Session, session_id: str, user_id: str, signature: str) -> tuple[AccidentReport, bool]:
     """
-    User signs the final report.
+    Returns (report, closed). closed is True only for the signature that completed the case.
     """
     # Find Report
     statement = select(AccidentReport).where(AccidentReport.session_id == session_id)
@@ -134,85 +166,50 @@ async def sign_session(session_id: str, user_id: str, signature: str, db: Sessio
         raise HTTPException(404, "Report not found")
         
     session_obj = db.get(AccidentSession, session_id)
+    if session_obj.status == SessionStatus.COMPLETED:
+        raise HTTPException(409, "Case already closed")
     
     if user_id == session_obj.driver_a_id:
-        report.driver_a_signature = signature
+        signature_field = "driver_a_signature"
     elif user_id == session_obj.driver_b_id:
-        report.driver_b_signature = signature
+        signature_field = "driver_b_signature"
     else:
         raise HTTPException(400, "User is not a participant")
         
-    db.add(report)
-    db.commit()
+    # If the other driver signed since we read the report this retries, rather than dropping their signature
+    compare_and_swap(db, report, **{signature_field: signature})
     
     # Check Closure
-    if report.police_signature and report.driver_a_signature and report.driver_b_signature:
-        session_obj.status = SessionStatus.COMPLETED
-        db.add(session_obj)
-        
-        # Generate PDFs
-        pdf_service = PDFService()
-        if report.report_details_id:
-            details = db.get(PoliceReportDetails, report.report_details_id)
-            if details:
-                # 1. Polis Repot
-                # Use signatures
-                signed_by_pengadu = None
-                signed_by_police = None
-                
-                if report.driver_a_signature:
-                    signed_by_pengadu = details.pengadu_nama
-                if report.police_signature:
-                    signed_by_police = details.pegawai_penyiasat_nama
-                
-                f_polis = pdf_service.generate_polis_repot(
-                    details, 
-                    signed_by_pengadu=signed_by_pengadu,
-                    signed_by_police=signed_by_police
-                )
-                url_polis = f"/reports/{os.path.basename(f_polis)}"
-                report.polis_repot_url = url_polis
-                
-                # 2. Rajah Kasar
-                # Resolve sketch again for completeness
-                import io
-                import base64
-                sketch_data = None
-                
-                stmt_sketch = select(Evidence).where(
-                    Evidence.type == EvidenceType.MAP_SKETCH,
-                    Evidence.draft_id.in_([report.driver_a_draft_id, report.driver_b_draft_id])
-                ).limit(1)
-                
-                sketch_ev = db.exec(stmt_sketch).first()
-                if sketch_ev and sketch_ev.content:
-                    try:
-                        content = sketch_ev.content
-                        if "," in content:
-                            _, content = content.split(",", 1)
-                        sketch_data = io.BytesIO(base64.b64decode(content))
-                    except:
-                        pass
-
-                f_rajah = pdf_service.generate_rajah_kasar(details, sketch_data=sketch_data) 
-                url_rajah = f"/reports/{os.path.basename(f_rajah)}"
-                report.rajah_kasar_url = url_rajah
-                
-                # 3. Keputusan
-                f_keputusan = pdf_service.generate_keputusan(details)
-                url_keputusan = f"/reports/{os.path.basename(f_keputusan)}"
-                report.keputusan_url = url_keputusan
-
-        db.add(report)
-        db.commit()
-        
-        await event_manager.publish(session_id, "CASE_CLOSED", {
-            "polis_repot": report.polis_repot_url,
-            "rajah_kasar": report.rajah_kasar_url,
-            "keputusan": report.keputusan_url
-        })
-    else:
-        # Notify that someone signed
-        await event_manager.publish(session_id, "USER_SIGNED", {"user_id": user_id})
-        
+    closed = bool(report.police_signature and report.driver_a_signature and report.driver_b_signature)
+    if closed:
+        transition(db, session_obj, SessionStatus.COMPLETED)
+
+    db.commit()
+    # Loaded before the session closes; the caller only reads signature/URL fields
+    db.refresh(report)
+    return report, closed
+
+@router.post("/sign")
+async def sign_session(session_id: str, user_id: str, signature: str):
+    """
+    User signs the final report. The signature that closes the case queues the
+    final documents and returns straight away; CASE_CLOSED follows on the
+    event stream once they are rendered.
+    """
+    report, closed = await run_in_session(_sign_session, session_id, user_id, signature)
+
+    if closed:
+        job_id = report_jobs.submit(session_id)
+        return {"status": "SIGNED", "job_id": job_id}
+
+    # Notify that someone signed
+    await event_manager.publish(session_id, "USER_SIGNED", {"user_id": user_id})
     return {"status": "SIGNED"}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status of a background report job: QUEUED, RUNNING, DONE or FAILED."""
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
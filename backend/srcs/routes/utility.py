@@ -1,13 +1,25 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from srcs.services.map_service import MapService
+import base64
+
+from fastapi import APIRouter, Header, Query, Response
+from pydantic import BaseModel, Field
+from srcs.services.map_service import map_service, SCENE_FORMATS, SCENE_QUALITY
+from srcs.services.tile_cache import tile_cache
+from srcs.services.tile_fetcher import tile_fetcher
 from srcs.services.gemini_service import GeminiService
+from srcs.services.user_cache import user_cache
+from srcs.services.report_cache import render_cache
+from srcs.services.sketch_resolver import sketch_resolver
+from srcs.services.pdf_service import PDFService
 
 router = APIRouter(prefix="/util", tags=["Utility"])
 
 class MapRequest(BaseModel):
     lat: float
     lng: float
+    # Longer edge of the image in pixels; omitted, the full satellite resolution (about 750 px)
+    size: int | None = Field(None, ge=64, le=2048)
+    format: str = Field("png", pattern="^(png|jpeg|webp)$")
+    quality: int = Field(SCENE_QUALITY, ge=1, le=100)
 
 class VerifyRequest(BaseModel):
     image_base64: str
@@ -15,8 +27,47 @@ class VerifyRequest(BaseModel):
 
 @router.post("/scene-map")
 async def get_scene_map(req: MapRequest):
-    return {"image": await MapService.generate_scene_sketch(req.lat, req.lng)}
+    key = map_service.scene_key(req.lat, req.lng, req.size, req.format, req.quality)
+    image = await map_service.generate_scene_sketch(key)
+    return {"image": base64.b64encode(image).decode("utf-8"), "media_type": SCENE_FORMATS[req.format][1]}
+
+@router.get("/scene-map")
+async def get_scene_map_image(
+    lat: float,
+    lng: float,
+    size: int | None = Query(None, ge=64, le=2048),
+    format: str = Query("png", pattern="^(png|jpeg|webp)$"),
+    quality: int = Query(SCENE_QUALITY, ge=1, le=100),
+    if_none_match: str | None = Header(default=None)
+):
+    """
+    The scene map as the image itself, for clients that can display it
+    directly: no base64, and cacheable. The ETag is known before rendering,
+    so a revalidation never renders.
+    """
+    key = map_service.scene_key(lat, lng, size, format, quality)
+    etag = f'"{map_service.scene_etag(key)}"'
+    # Satellite imagery of a spot rarely changes; private, the URL carries an accident location
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    image = await map_service.generate_scene_sketch(key)
+    return Response(image, media_type=SCENE_FORMATS[format][1], headers=headers)
 
 @router.post("/verify-image")
 async def verify_image(req: VerifyRequest):
     return await GeminiService.validate_image(req.image_base64, req.description)
+
+@router.get("/metrics")
+def get_metrics():
+    """In-process cache counters and rendered PDF sizes, for checking hit rates and bandwidth under load."""
+    return {
+        "user_cache": user_cache.stats(),
+        "report_render_cache": render_cache.stats(),
+        "sketch_cache": sketch_resolver.stats(),
+        "tile_cache": tile_cache.stats(),
+        "tile_fetcher": tile_fetcher.stats(),
+        "scene_map": map_service.stats(),
+        "pdf_sizes": PDFService.size_stats()
+    }
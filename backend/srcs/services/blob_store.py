@@ -0,0 +1,133 @@
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+from typing import Iterator
+
+from srcs.config import BLOB_DIR
+
+CHUNK_SIZE = 1024 * 1024
+
+# Magic bytes -> MIME type, for raw base64 uploads without a data URI header
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF", "application/pdf"),
+]
+
+
+def sniff_mime_type(data: bytes) -> str:
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp":
+        return "video/mp4"
+    return "application/octet-stream"
+
+
+def decode_media(content: str) -> tuple[bytes, str]:
+    """
+    Turns an uploaded evidence string into (raw bytes, MIME type).
+    Accepts "data:<mime>;base64,<data>" URIs and bare base64. Anything that is
+    not valid base64 is kept verbatim as UTF-8 text.
+    """
+    mime_type = None
+    if content.startswith("data:") and "," in content:
+        header, content = content.split(",", 1)
+        mime_type = header[5:].split(";")[0] or None
+
+    try:
+        data = base64.b64decode(content, validate=True)
+    except (binascii.Error, ValueError):
+        return content.encode("utf-8"), "text/plain"
+
+    return data, mime_type or sniff_mime_type(data)
+
+
+class BlobStore:
+    """
+    Content-addressed blob storage on local disk.
+
+    Blobs are keyed by the SHA-256 of their bytes and sharded two levels deep
+    (ab/cd/abcd...), so identical uploads are stored once and no directory grows
+    unbounded. Writes go to a temp file first and are moved into place atomically.
+    """
+
+    def __init__(self, root: str = BLOB_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.uploads_dir = os.path.join(self.root, "uploads")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        os.makedirs(self.uploads_dir, exist_ok=True)
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def upload_path(self, upload_id: str) -> str:
+        """Part file of an in-progress chunked upload."""
+        return os.path.join(self.uploads_dir, f"{upload_id}.part")
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def _commit(self, tmp_path: str, sha256: str):
+        final_path = self.path_for(sha256)
+        if os.path.exists(final_path):
+            # Deduplicated: the same bytes are already stored
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+
+    def put_bytes(self, data: bytes) -> tuple[str, int]:
+        """Stores data and returns (sha256, size)."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        if self.exists(sha256):
+            return sha256, len(data)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self._commit(tmp_path, sha256)
+        return sha256, len(data)
+
+    @staticmethod
+    def hash_file(path: str) -> tuple[str, int]:
+        """(sha256, size) of a file, read in chunks."""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def put_file(self, src_path: str, sha256: str | None = None) -> tuple[str, int]:
+        """
+        Moves an already written file (e.g. a finished chunked upload) into the
+        store, hashing it in chunks unless its sha256 is given. Returns
+        (sha256, size).
+        """
+        if sha256 is None:
+            sha256, size = self.hash_file(src_path)
+        else:
+            size = os.path.getsize(src_path)
+        self._commit(src_path, sha256)
+        return sha256, size
+
+    def read(self, sha256: str) -> bytes:
+        with open(self.path_for(sha256), "rb") as f:
+            return f.read()
+
+    def iter_chunks(self, sha256: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self.path_for(sha256), "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+
+blob_store = BlobStore()
@@ -0,0 +1,120 @@
+import io
+import zipfile
+from datetime import datetime
+from typing import Iterator
+
+from sqlmodel import Session, select
+
+from srcs.database import engine
+from srcs.models.enums import SessionStatus
+from srcs.models.report import AccidentReport, PoliceReportDetails
+from srcs.models.session import AccidentSession
+from srcs.services.report_cache import render_cache, render_document, download_name, load_case, REPORT_TYPES
+
+# Bytes read from a cached PDF per ZIP write
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def export_session_ids(db: Session, statuses: list[SessionStatus], date_from: datetime | None = None,
+                       date_to: datetime | None = None, station: str | None = None, limit: int = 1000) -> list[str]:
+    """Sessions with report details matching the filters, oldest first."""
+    stm = (
+        select(AccidentSession.id, AccidentSession.created_at)
+        .join(AccidentReport, AccidentReport.session_id == AccidentSession.id)
+        .join(PoliceReportDetails, PoliceReportDetails.id == AccidentReport.report_details_id)
+    )
+    if date_from:
+        stm = stm.where(AccidentSession.created_at >= date_from)
+    if date_to:
+        stm = stm.where(AccidentSession.created_at < date_to)
+    if station:
+        stm = stm.where(PoliceReportDetails.balai_polis == station)
+    stm = stm.order_by(AccidentSession.created_at, AccidentSession.id).limit(limit)
+
+    # One index range per status, merged here, like the dashboard: "status IN (...)"
+    # would make SQLite sort every matching session before applying the limit
+    rows = []
+    for status in statuses:
+        rows.extend(db.exec(stm.where(AccidentSession.status == status)).all())
+    rows.sort(key=lambda row: (row.created_at, row.id))
+    return [row.id for row in rows[:limit]]
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Write end of a streamed ZIP: holds what zipfile wrote until the response
+    takes it. Not seekable, so zipfile writes sizes and CRCs after each entry
+    (data descriptors) instead of seeking back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_case_documents(pdf_service, session_ids: list[str]) -> Iterator[bytes]:
+    """
+    Yields a ZIP with every document of the given sessions, one entry at a
+    time: cached PDFs are copied in chunks, missing ones rendered on demand
+    (and cached). At most one document is held in memory.
+
+    The PDFs are already compressed, so entries are stored, not deflated.
+    A case whose documents cannot be loaded or rendered is left out (from the
+    failing document on) and listed in export_errors.txt.
+    """
+    sink = _ZipSink()
+    errors = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for session_id in session_ids:
+            try:
+                # A short session per case, not one held open for the whole download
+                with Session(engine) as db:
+                    _, details, inputs = load_case(db, session_id)
+
+                for report_type in REPORT_TYPES:
+                    key = render_cache.key(report_type, details, **inputs[report_type])
+                    path, pdf = render_cache.fetch_or_render(
+                        report_type, details.id, key,
+                        lambda: render_document(pdf_service, report_type, details, **inputs[report_type])
+                    )
+                    entry_name = f"{session_id}/{download_name(report_type, details)}"
+                    with archive.open(zipfile.ZipInfo(entry_name, date_time=details.tarikh_repot.timetuple()[:6]), "w") as entry:
+                        if pdf is not None:
+                            entry.write(pdf)
+                        else:
+                            with open(path, "rb") as f:
+                                while chunk := f.read(EXPORT_CHUNK_SIZE):
+                                    entry.write(chunk)
+                                    yield from _drain(sink)
+                    yield from _drain(sink)
+            except Exception as e:
+                print(f"Export of session {session_id} failed: {e}")
+                errors.append(f"{session_id}: {e}")
+
+        if errors:
+            archive.writestr("export_errors.txt", "\n".join(errors))
+    # Central directory
+    yield from _drain(sink)
+
+
+def _drain(sink: _ZipSink) -> Iterator[bytes]:
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from srcs.models.session import AccidentSession
+from srcs.models.report import AccidentReport, AccidentReportDraft, PoliceReportDetails, Evidence, PoliceCaseView
+from srcs.models.user import User
+from srcs.services.user_cache import user_cache
+
+
+def _dump(obj) -> dict | None:
+    return obj.model_dump(mode="json") if obj is not None else None
+
+
+def _driver_info(db: Session, user: User, draft: AccidentReportDraft | None) -> dict:
+    evidences = []
+    if draft:
+        evidences = db.exec(select(Evidence).where(Evidence.draft_id == draft.id)).all()
+    return {"user": _dump(user), "draft": _dump(draft), "evidences": [_dump(ev) for ev in evidences]}
+
+
+def build_case_view(db: Session, session_id: str) -> dict | None:
+    """
+    Assembles the police details payload from the normalized tables.
+    Returns None if the session does not exist.
+    """
+    session_obj = db.get(AccidentSession, session_id)
+    if not session_obj:
+        return None
+
+    report = db.exec(select(AccidentReport).where(AccidentReport.session_id == session_id)).first()
+    report_details = None
+    if report and report.report_details_id:
+        report_details = db.get(PoliceReportDetails, report.report_details_id)
+
+    user_a = user_cache.get(db, session_obj.driver_a_id)
+    user_b = user_cache.get(db, session_obj.driver_b_id)
+    draft_a = db.get(AccidentReportDraft, session_obj.driver_a_draft_id) if session_obj.driver_a_draft_id else None
+    draft_b = db.get(AccidentReportDraft, session_obj.driver_b_draft_id) if session_obj.driver_b_draft_id else None
+
+    # Fallback if B has not joined yet
+    unknown_user = User(id="unknown", name="Unknown", ic_no="", phone_number="", car_plate="", car_model="", insurance_policy="")
+    unknown = {"user": _dump(unknown_user), "draft": None, "evidences": []}
+
+    return {
+        "session_id": session_id,
+        "report_id": report.id if report else None,
+        "report_details": _dump(report_details),
+        "driver_a": _driver_info(db, user_a, draft_a),
+        "driver_b": _driver_info(db, user_b, draft_b) if user_b else unknown
+    }
+
+
+def refresh_case_view(db: Session, session_id: str):
+    """
+    Rewrites the stored read model of a session. Call it before the commit of
+    any write that changes what the details endpoint shows, so both land in
+    the same transaction.
+    """
+    payload = build_case_view(db, session_id)
+    if payload is None:
+        return
+
+    view = db.get(PoliceCaseView, session_id)
+    if view:
+        view.payload = payload
+        view.updated_at = datetime.utcnow()
+    else:
+        view = PoliceCaseView(session_id=session_id, payload=payload)
+    db.add(view)
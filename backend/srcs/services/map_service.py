@@ -1,66 +1,250 @@
-import requests
-import os
+import asyncio
+import hashlib
+import io
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import contextily as ctx
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+import mercantile
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image
 
+from srcs.config import MAP_RENDER_WORKERS, MAP_RENDER_MAX_QUEUE
+from srcs.services.tile_cache import TileCache, tile_cache
+from srcs.services.tile_fetcher import TileFetcher, tile_fetcher
+
+# Most detailed zoom, used when no output size is asked for
+SCENE_ZOOM = 19
+TILE_SIZE = 256
+# Output format -> (Pillow format, media type)
+SCENE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+SCENE_QUALITY = 80
+# Requests are rounded to this many decimals (about 11 m) and share a render:
+# both drivers' phones and their retries ask for practically the same spot
+COORD_DECIMALS = 4
 
-import asyncio
 
 class MapService:
+    """
+    Satellite scene sketches around an accident location. Tiles come from the
+    persistent TileCache and are only downloaded from the provider on a miss:
+    accidents cluster on the same roads, so most sketches are drawn from tiles
+    an earlier sketch already fetched. The missing tiles of a sketch are
+    downloaded all at once by the TileFetcher.
+
+    The mosaic is cropped and encoded with NumPy and Pillow, on arrays local to
+    the call, so any number of render threads can compose at once (no global
+    pyplot figure state).
+
+    Renders run on the service's own bounded thread pool, never the event
+    loop's default executor. Requests for a spot that is already being
+    rendered wait for that render instead of starting another; once more than
+    MAP_RENDER_MAX_QUEUE renders wait for a worker, new ones are refused.
+    """
+
+    def __init__(self, provider=ctx.providers.Esri.WorldImagery, cache: TileCache = tile_cache,
+                 workers: int = MAP_RENDER_WORKERS, max_queue: int = MAP_RENDER_MAX_QUEUE,
+                 fetcher: TileFetcher = tile_fetcher):
+        self.provider = provider
+        self.cache = cache
+        self.fetcher = fetcher
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="map")
+        # Renders in progress by request key; only touched on the event loop
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _fetch_tiles(self, tiles: list[mercantile.Tile]) -> list[bytes]:
+        data = [self.cache.get(self.provider.name, tile.z, tile.x, tile.y) for tile in tiles]
+        missing = [i for i, tile_data in enumerate(data) if tile_data is None]
+        if missing:
+            # Concurrently: a cold sketch takes about as long as its slowest tile
+            downloaded = self.fetcher.fetch_all([
+                self.provider.build_url(x=tiles[i].x, y=tiles[i].y, z=tiles[i].z) for i in missing
+            ])
+            for i, tile_data in zip(missing, downloaded):
+                self.cache.put(self.provider.name, tiles[i].z, tiles[i].x, tiles[i].y, tile_data)
+                data[i] = tile_data
+        return data
+
     @staticmethod
-    def _generate_scene_sketch_sync(lat: float, lon: float) -> str:
+    def _decode_tile(data: bytes) -> np.ndarray:
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert("RGBA"))
+
+    def tile_mosaic(self, west: float, south: float, east: float, north: float, zoom: int) -> tuple[np.ndarray, tuple]:
+        """
+        The tiles covering a lon/lat bbox merged into one RGBA array, and its
+        Spherical Mercator extent (left, right, bottom, top), like
+        ctx.bounds2img.
+        """
+        tiles = list(mercantile.tiles(west, south, east, north, [zoom]))
+        min_x = min(tile.x for tile in tiles)
+        min_y = min(tile.y for tile in tiles)
+        arrays = [self._decode_tile(data) for data in self._fetch_tiles(tiles)]
+
+        h, w, d = arrays[0].shape
+        n_x = max(tile.x for tile in tiles) - min_x + 1
+        n_y = max(tile.y for tile in tiles) - min_y + 1
+        image = np.zeros((h * n_y, w * n_x, d), dtype=np.uint8)
+        for tile, array in zip(tiles, arrays):
+            x, y = tile.x - min_x, tile.y - min_y
+            image[y * h:(y + 1) * h, x * w:(x + 1) * w, :] = array
+
+        top_left = mercantile.xy_bounds(mercantile.Tile(min_x, min_y, zoom))
+        bottom_right = mercantile.xy_bounds(mercantile.Tile(min_x + n_x - 1, min_y + n_y - 1, zoom))
+        return image, (top_left.left, bottom_right.right, bottom_right.bottom, top_left.top)
+
+    @staticmethod
+    def crop_mosaic(image: np.ndarray, extent: tuple, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """
+        The part of a tile mosaic (as returned by tile_mosaic) covering a
+        lon/lat bbox, at the resolution of the tiles. A view, nothing is copied.
+        """
+        left, right, bottom, top = extent
+        h, w = image.shape[:2]
+        x0, y0 = mercantile.xy(west, north)
+        x1, y1 = mercantile.xy(east, south)
+        col0 = max(int(np.floor((x0 - left) / (right - left) * w)), 0)
+        col1 = min(int(np.ceil((x1 - left) / (right - left) * w)), w)
+        row0 = max(int(np.floor((top - y0) / (top - bottom) * h)), 0)
+        row1 = min(int(np.ceil((top - y1) / (top - bottom) * h)), h)
+        return image[row0:row1, col0:col1]
+
+    @staticmethod
+    def scene_bbox(lat: float, lon: float) -> tuple[float, float, float, float]:
+        # Small buffer around the point: 0.001 degrees is roughly 100 meters
+        d = 0.001
+        return lon - d, lat - d, lon + d, lat + d
+
+    @staticmethod
+    def scene_zoom(west: float, south: float, east: float, north: float, size: int | None) -> int:
+        """
+        The least detailed zoom at which the bbox spans at least size pixels
+        along its longer edge, so no more tiles are fetched than the output
+        shows. SCENE_ZOOM without a size, or when even it falls short.
+        """
+        if size is None:
+            return SCENE_ZOOM
+        x0, y0 = mercantile.xy(west, north)
+        x1, y1 = mercantile.xy(east, south)
+        span = max(x1 - x0, y0 - y1)
+        for zoom in range(SCENE_ZOOM + 1):
+            if span / (2 * math.pi * 6378137 / (TILE_SIZE << zoom)) >= size:
+                return zoom
+        return SCENE_ZOOM
+
+    def scene_key(self, lat: float, lon: float, size: int | None = None, image_format: str = "png",
+                  quality: int = SCENE_QUALITY) -> tuple:
+        """
+        What a scene sketch request renders: (lat, lon, zoom, size, format,
+        quality), coordinates rounded to COORD_DECIMALS. Equal keys give the
+        same image.
+        """
+        lat, lon = round(lat, COORD_DECIMALS), round(lon, COORD_DECIMALS)
+        zoom = self.scene_zoom(*self.scene_bbox(lat, lon), size)
+        # PNG is lossless, quality does not change it
+        return lat, lon, zoom, size, image_format, None if image_format == "png" else quality
+
+    def scene_etag(self, key: tuple) -> str:
+        return hashlib.sha256(repr((self.provider.name,) + key).encode("utf-8")).hexdigest()
+
+    def _generate_scene_sketch_sync(self, lat: float, lon: float, size: int | None = None, image_format: str = "png",
+                                    quality: int = SCENE_QUALITY) -> bytes:
         """
         Synchronous implementation of scene sketch generation.
         :param lat: latitude
         :param lon: longitude
-        :return: Base64 encoded image
+        :param size: longer edge of the image in pixels, None for the full resolution of SCENE_ZOOM
+        :param image_format: a key of SCENE_FORMATS
+        :param quality: JPEG / WebP quality
+        :return: The encoded image
         """
         # 1. Define the area (small buffer around the point)
-        # 0.001 degrees is roughly 100 meters
-        d = 0.001
-        west, south = lon - d, lat - d
-        east, north = lon + d, lat + d
-
-        print(f"Fetching satellite data for {lat}, {lon}...")
-
-        # 2. Download the image from Esri World Imagery
-        # source=ctx.providers.Esri.WorldImagery is the key here
-        image, extent = ctx.bounds2img(
-            west, south, east, north,
-            ll=True,  # Input coordinates are Lat/Lon (WGS84)
-            source=ctx.providers.Esri.WorldImagery,
-            zoom=19
-        )
-
-        # 3. Save the image nicely
-        # We use matplotlib to save it without axes/borders
-        fig = plt.figure(frameon=False)
-        fig.set_size_inches(6, 6)  # Image size
-        ax = plt.Axes(fig, [0., 0., 1., 1.])
-        ax.set_axis_off()
-        fig.add_axes(ax)
-
-        ax.imshow(image, extent=extent, aspect='auto')
-
-        # Save to in-memory buffer
-        import io
-        import base64
+        west, south, east, north = self.scene_bbox(lat, lon)
+        zoom = self.scene_zoom(west, south, east, north, size)
+
+        print(f"Fetching satellite data for {lat}, {lon} at zoom {zoom}...")
+
+        # 2. The tiles of the area from Esri World Imagery, cached ones read from disk
+        image, extent = self.tile_mosaic(west, south, east, north, zoom)
 
+        # 3. Cut out the area, scale it down to size and encode it
+        # Satellite tiles are opaque, the alpha channel would only add bytes
+        scene = Image.fromarray(self.crop_mosaic(image, extent, west, south, east, north)).convert("RGB")
+        if size is not None:
+            # Never enlarges
+            scene.thumbnail((size, size), Image.LANCZOS)
+        pil_format, _ = SCENE_FORMATS[image_format]
         buf = io.BytesIO()
-        fig.savefig(buf, format='png', dpi=400, bbox_inches='tight', pad_inches=0)
-        plt.close(fig)
+        if pil_format == "PNG":
+            scene.save(buf, format=pil_format)
+        else:
+            scene.save(buf, format=pil_format, quality=quality)
 
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        print(f"Success! Generated {scene.width}x{scene.height} {image_format} image.")
+        return buf.getvalue()
 
-        print(f"Success! Generated base64 image.")
-        return img_base64
+    def _render(self, key: tuple) -> bytes:
+        lat, lon, _, size, image_format, quality = key
+        with self._stats_lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return self._generate_scene_sketch_sync(lat, lon, size, image_format, quality)
+        finally:
+            with self._stats_lock:
+                self.running -= 1
+                self.renders += 1
 
-    @staticmethod
-    async def generate_scene_sketch(lat: float, lon: float) -> str:
+    async def generate_scene_sketch(self, key: tuple) -> bytes:
         """
-        Async wrapper for sketch generation to prevent blocking.
+        Renders the scene sketch of a scene_key() on the map thread pool, or
+        waits for the identical render already in progress. Raises 503 when
+        the pool is saturated.
         """
-        return await asyncio.to_thread(MapService._generate_scene_sketch_sync, lat, lon)
\ No newline at end of file
+        future = self._in_flight.get(key)
+        if future is not None:
+            with self._stats_lock:
+                self.coalesced += 1
+        else:
+            with self._stats_lock:
+                if self.queued >= self.max_queue:
+                    self.rejected += 1
+                    raise HTTPException(503, "Map rendering is busy, please retry", headers={"Retry-After": "1"})
+                self.queued += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queued)
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._render, key)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # A caller that goes away must not cancel the render the others wait for
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queue_depth": self.max_queue_depth,
+                "max_queue": self.max_queue,
+                "renders": self.renders,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected
+            }
+
+
+map_service = MapService()
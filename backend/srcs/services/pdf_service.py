@@ -1,54 +1,553 @@
+import contextlib
+import copy
+import io
+import multiprocessing
 import os
-from datetime import datetime
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO
+import reportlab
+from reportlab import rl_config
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image, Frame, PageTemplate
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image, Frame, PageTemplate, Flowable, ActionFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas, pdfimages
+from srcs.config import PDF_WORKERS, PDF_COMPACT_IMAGE_DPI, PDF_COMPACT_JPEG_QUALITY
 from srcs.models.report import PoliceReportDetails
+from srcs.services.pdf_stamp import stamp_pages
+from srcs.services.sketch_resolver import sketch_fits, prepare_sketch
+
+# report_type -> PDFService method drawing it
+REPORT_GENERATORS = {
+    "polis_repot": "generate_polis_repot",
+    "rajah_kasar": "generate_rajah_kasar",
+    "keputusan": "generate_keputusan",
+    "bundle": "generate_bundle",
+}
+# Documents carrying the signature row (see PDFService.stamp_signatures)
+SIGNED_DOCUMENTS = ("polis_repot", "bundle")
+
+# Output profiles, chosen per PDFService. Page streams are deflated in both.
+# Fonts are the standard Helvetica faces, referenced by name and never
+# embedded, so there is nothing to subset.
+PDF_PROFILES = {
+    # ASCII85-armoured streams (ReportLab's default, 7-bit safe), images as given
+    "standard": {"ascii85": True, "image_dpi": None, "image_quality": None},
+    # Binary streams (a quarter smaller) and the sketch re-encoded smaller, for mobile clients
+    "compact": {"ascii85": False, "image_dpi": PDF_COMPACT_IMAGE_DPI, "image_quality": PDF_COMPACT_JPEG_QUALITY},
+}
+
+# ReportLab has no per-document (or per-canvas) switch for ASCII85 streams:
+# its PDF writer, pdfdoc and pdfimages, reads the process-wide
+# rl_config.useA85 while a document is built. Setting that global per build
+# would need every build in the process to take turns. Instead, the first
+# build in a non-default profile gives those two modules a view of rl_config
+# whose useA85 can be set for one thread (_ThreadConfig). Threads that never
+# set it, other ReportLab users included, see rl_config unchanged.
+# This relies on those modules reading rl_config as a module attribute, as
+# checked for the major versions below; on any other version builds fall
+# back to setting the global under a lock.
+_THREAD_CONFIG_VERSIONS = ("4", "5")
+_THREAD_CONFIG_MODULES = (pdfdoc, pdfimages)
+_thread_config_supported = (
+    reportlab.Version.split(".")[0] in _THREAD_CONFIG_VERSIONS
+    and all(getattr(module, "rl_config", None) is rl_config for module in _THREAD_CONFIG_MODULES)
+)
+_rl_default_a85 = rl_config.useA85
+_rl_config_lock = threading.Lock()
+
+
+class _ThreadConfig:
+    """rl_config, with useA85 overridable for the current thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        if name == "useA85":
+            return getattr(self._local, "useA85", rl_config.useA85)
+        return getattr(rl_config, name)
+
+    @contextlib.contextmanager
+    def use_a85(self, value: int):
+        self._local.useA85 = value
+        try:
+            yield
+        finally:
+            del self._local.useA85
+
+
+_thread_config: _ThreadConfig | None = None
+
+
+def _install_thread_config() -> _ThreadConfig:
+    global _thread_config
+    with _rl_config_lock:
+        if _thread_config is None:
+            _thread_config = _ThreadConfig()
+            for module in _THREAD_CONFIG_MODULES:
+                module.rl_config = _thread_config
+        return _thread_config
+
+
+@contextlib.contextmanager
+def _stream_encoding(ascii85: bool):
+    """ReportLab builds inside write ASCII85-armoured streams or binary ones."""
+    value = 1 if ascii85 else 0
+    if not _thread_config_supported:
+        with _rl_config_lock:
+            rl_config.useA85 = value
+            try:
+                yield
+            finally:
+                rl_config.useA85 = _rl_default_a85
+    elif value == _rl_default_a85:
+        # ReportLab's own setting, unless this thread overrides it (it does not)
+        yield
+    else:
+        with _install_thread_config().use_a85(value):
+            yield
+
+
+def _generate_in_worker(output_dir: str, profile: str, report_type: str, details_fields: dict, kwargs: dict) -> tuple[str, int]:
+    """Runs in a pool process: rebuilds the details row, draws one document and returns its path and size."""
+    service = PDFService(output_dir, profile)
+    filepath = getattr(service, REPORT_GENERATORS[report_type])(PoliceReportDetails(**details_fields), **kwargs)
+    return filepath, os.path.getsize(filepath)
+
+
+# Page layout shared by every document (see PDFService._create_doc)
+CONTENT_WIDTH = 6.5 * inch
+# Set margins to match the calculated content alignment (approx 0.88 inch)
+PAGE_MARGIN = (8.27 - 6.5) / 2 * inch
+FRAME_WIDTH = A4[0] - 2 * PAGE_MARGIN
+
+# 9-column label/value grid of the Polis Repot (penerima, jurubahasa, pengadu)
+GRID_COL_WIDTHS = [0.95*inch, 0.1*inch, 1.3*inch, 0.95*inch, 0.1*inch, 1.15*inch, 0.9*inch, 0.1*inch, 0.95*inch]
+SIGNATURE_COL_WIDTHS = [2.16*inch, 2.16*inch, 2.16*inch] # Equal split ~2.16 inch
+
+JURUBAHASA_FIELDS = ("jurubahasa_nama", "jurubahasa_ic", "jurubahasa_polis_id", "jurubahasa_pasport", "jurubahasa_bahasa_asal", "jurubahasa_alamat")
+
+
+class PrelaidFlowable(Flowable):
+    """
+    A fixed flowable wrapped once at the frame width. Documents draw the
+    stored layout instead of wrapping (line breaking, table sizing) again.
+    """
+
+    def __init__(self, flowable):
+        super().__init__()
+        self._flowable = flowable
+        self.width, self.height = flowable.wrap(FRAME_WIDTH, A4[1])
+        self.hAlign = getattr(flowable, 'hAlign', 'LEFT')
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def getSpaceBefore(self):
+        return self._flowable.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self._flowable.getSpaceAfter()
+
+    def draw(self):
+        # Drawing only reads the stored layout, but sets .canv on every flowable
+        # it draws: draw copies so concurrent renders do not share them
+        _drawing_copy(self._flowable).drawOn(self.canv, 0, 0)
+
+
+class DocumentBreak(ActionFlowable):
+    """
+    Ends a document inside a bundle: the next one starts on a new page laid
+    out like a first page (header and footer rules, see PDFService._create_doc)
+    and its page numbers start from 1 again (see PDFService._header_footer).
+    """
+
+    def apply(self, doc):
+        # SimpleDocTemplate moves on to its plain 'Later' template after each page
+        doc.handle_nextPageTemplate(0)
+        doc.handle_pageBreak()
+        # The page break only ends the page, the next one begins on the next flowable
+        doc.document_first_page = doc.page + 1
+
+
+def signature_display(signer: str | None) -> str:
+    # If signed, we replace the line with the name
+    if signer:
+        return f"{signer.upper()}<br/>(digital signature)"
+    return "_"*25
+
+
+class SignatureSlot(Flowable):
+    """
+    One signer's cell of the Polis Repot signature row. It always takes the
+    height of the signed state of expected_signer, so signing never moves
+    anything on the page. Given a layout dict it draws nothing and records
+    where it is instead, for PDFService.stamp_signatures().
+    """
+
+    def __init__(self, name: str, signer: str | None, expected_signer: str | None, style, layout: dict = None):
+        super().__init__()
+        self.name = name
+        self.style = style
+        self.layout = layout
+        self._paragraph = Paragraph(signature_display(signer), style)
+        self._reserved = Paragraph(signature_display(expected_signer or signer), style)
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height = max(self._paragraph.wrap(availWidth, availHeight)[1], self._reserved.wrap(availWidth, availHeight)[1])
+        return self.width, self.height
+
+    def draw(self):
+        if self.layout is None:
+            self._paragraph.drawOn(self.canv, 0, self.height - self._paragraph.height)
+            return
+        x, y = self.canv.absolutePosition(0, 0)
+        self.layout["slots"][self.name] = {"page": self.canv.getPageNumber(), "x": x, "y": y, "width": self.width, "height": self.height}
+        # Registers the font with the document, so a stamped page can use it
+        self.layout["fonts"][self.style.fontName] = self.canv._doc.getInternalFontName(self.style.fontName)
+
+
+def _drawing_copy(value):
+    if isinstance(value, (list, tuple)):
+        # Table cells hold flowables in (tuple subclass) sequences
+        return type(value)(_drawing_copy(item) for item in value)
+    if not isinstance(value, Flowable):
+        return value
+    drawn = copy.copy(value)
+    if isinstance(drawn, Table):
+        drawn._cellvalues = [[_drawing_copy(cell) for cell in row] for row in drawn._cellvalues]
+    return drawn
+
+
+class CompiledTemplates:
+    """
+    What the documents share regardless of the case: the stylesheet, every
+    paragraph and table style, and the fixed headings, labels and sentences,
+    built, parsed and laid out once per process. Only per-case values are
+    parsed and laid out per document.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='CenterTitle', parent=styles['Heading1'], alignment=TA_CENTER, spaceAfter=20, fontSize=12))
+        styles.add(ParagraphStyle(name='JustifyText', parent=styles['Normal'], alignment=TA_JUSTIFY, spaceAfter=6))
+        # Polis Repot
+        # Reduced padding between lines
+        styles.add(ParagraphStyle(name='Header1', parent=styles['CenterTitle'], spaceAfter=0, leading=16))
+        styles.add(ParagraphStyle(name='Header2', parent=styles['CenterTitle'], spaceAfter=4))
+        # Helper for wrapping text in Paragraphs to ensure multi-line alignment
+        styles.add(ParagraphStyle(name='ValueStyle', parent=styles['Normal'], fontName='Helvetica', fontSize=9, leading=11))
+        styles.add(ParagraphStyle('BoldSmall', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=9, leftIndent=0, firstLineIndent=0))
+        styles.add(ParagraphStyle('BodyUpper', parent=styles['Normal'], fontSize=9, leading=10))
+        # Keputusan letter
+        styles.add(ParagraphStyle(name='RightAlign', parent=styles['Normal'], alignment=TA_LEFT, leftIndent=3.5*inch))
+        styles.add(ParagraphStyle(name='Bold', parent=styles['Normal'], fontName='Helvetica-Bold'))
+        styles.add(ParagraphStyle(name='KeputusanTitle', parent=styles['Heading3'], fontName='Helvetica-Bold', leftIndent=0))
+        self.styles = styles
+
+        grid = [
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('LEFTPADDING', (0,0), (0,-1), 0),
+        ]
+        self.table_styles = {
+            "polis_meta": TableStyle([
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), 9),
+                ('ALIGN', (0,0), (0,-1), 'LEFT'),
+                ('ALIGN', (3,0), (3,-1), 'LEFT'),
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+                ('LEFTPADDING', (0,0), (0,-1), 0), # Align with header line
+            ]),
+            "grid": TableStyle(grid),
+            "pengadu": TableStyle(grid + [
+                ('SPAN', (2,5), (-1,5)), # Alamat Tinggal span across
+                ('SPAN', (2,6), (-1,6)), # IbuBapa
+                ('SPAN', (2,7), (-1,7)), # Pejabat
+                ('SPAN', (2,4), (-1,4)), # Pekerjaan
+                ('SPAN', (2,0), (-1,0)), # Nama
+                ('SPAN', (2,9), (-1,9)), # Emel
+            ]),
+            "signatures": TableStyle([
+                ('FONTSIZE', (0,0), (-1,-1), 9),
+                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+                ('LEFTPADDING', (0,0), (0,-1), 0),
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ]),
+            "sketch_meta": TableStyle([
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('FONTSIZE', (0,0), (-1,-1), 10),
+                ('ALIGN', (0,0), (0,-1), 'LEFT'),  # Label Left
+                ('ALIGN', (1,0), (1,-1), 'CENTER'), # Colon Center
+                ('ALIGN', (2,0), (2,-1), 'LEFT'),   # Value Left
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ]),
+            "sketch_box": TableStyle([
+                ('BOX', (0,0), (-1,-1), 1, colors.black), # The main border
+                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+                ('VALIGN', (0,0), (0,0), 'MIDDLE'), # Image Center
+                ('LEFTPADDING', (0,0), (-1,-1), 5),
+                ('RIGHTPADDING', (0,0), (-1,-1), 5),
+                ('TOPPADDING', (0,0), (-1,-1), 5),
+                ('BOTTOMPADDING', (0,0), (-1,-1), 5),
+            ]),
+            "keputusan_details": TableStyle([
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+                ('ALIGN', (0,0), (0,-1), 'LEFT'),
+                ('ALIGN', (1,0), (1,-1), 'CENTER'),
+                ('ALIGN', (2,0), (2,-1), 'LEFT'),
+                # Remove left padding for first column so text aligns with the Title above (which is at left frame edge)
+                ('LEFTPADDING', (0,0), (0,-1), 0),
+            ]),
+            "keputusan_offender": TableStyle([
+                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+                ('VALIGN', (0,0), (-1,-1), 'TOP'),
+                ('ALIGN', (0,0), (0,-1), 'LEFT'),
+                ('ALIGN', (1,0), (1,-1), 'CENTER'),
+            ]),
+        }
+
+        def grid(rows, col_widths, style):
+            table = Table(rows, colWidths=col_widths)
+            table.setStyle(style)
+            return table
+
+        value_none = Paragraph("---", styles['ValueStyle'])
+        self._flowables = {
+            "polis_header_1": Paragraph("POLIS DIRAJA MALAYSIA", styles['Header1']),
+            "polis_header_2": Paragraph("REPOT POLIS", styles['Header2']),
+            "penerima_heading": Paragraph("Butir-butir Penerima Repot :", styles['BoldSmall']),
+            "jurubahasa_heading": Paragraph("Butir-butir Jurubahasa (Jika Ada) :", styles['BoldSmall']),
+            # Most cases have no interpreter, the whole grid is then fixed
+            "jurubahasa_empty": grid([
+                ["Nama", ":", value_none, "No. K/P (Baru)", ":", value_none, "No. Polis", ":", value_none],
+                ["No. Pasport", ":", value_none, "Bahasa Asal", ":", value_none, "", "", ""],
+                ["Alamat", ":", value_none, "", "", "", "", "", ""]
+            ], GRID_COL_WIDTHS, self.table_styles["grid"]),
+            "pengadu_heading": Paragraph("Butir-butir Pengadu :", styles['BoldSmall']),
+            "pengadu_menyatakan": Paragraph("Pengadu Menyatakan :", styles['BoldSmall']),
+            "signature_labels": grid(
+                [["Tandatangan Pengadu:", "Tandatangan Jurubahasa\n(Jika ada):", "Tandatangan Penerima Repot:"]],
+                SIGNATURE_COL_WIDTHS, self.table_styles["signatures"]
+            ),
+            "sketch_title": Paragraph("RAJAH KASAR (TIDAK MENGIKUT SKALA)", styles['CenterTitle']),
+            "keputusan_title": Paragraph("<u>KEPUTUSAN PENYIASATAN KES</u>", styles['KeputusanTitle']),
+            "keputusan_intro": Paragraph("Dengan hormatnya saya merujuk kepada pengaduan yang dibuat sepertimana dinyatakan di atas", styles['JustifyText']),
+            "keputusan_para_3": Paragraph("3. Butir-butir pihak yang disalahkan adalah seperti berikut:", styles['Normal']),
+            "keputusan_slogan": Paragraph('"BERHATI-HATI DI JALAN RAYA"', styles['Bold']),
+        }
+        self._flowables = {name: PrelaidFlowable(flowable) for name, flowable in self._flowables.items()}
+        # Placeholder value inside the per-case grids, laid out by its table
+        self._flowables["value_none"] = value_none
+
+    def flowable(self, name: str):
+        """A fresh copy of a fixed flowable for one render."""
+        return copy.copy(self._flowables[name])
+
+
+_templates: CompiledTemplates | None = None
+_templates_lock = threading.Lock()
+
+
+def compiled_templates() -> CompiledTemplates:
+    global _templates
+    with _templates_lock:
+        if _templates is None:
+            _templates = CompiledTemplates()
+        return _templates
+
 
 class PDFService:
-    def __init__(self, output_dir: str = "generated_reports"):
+    # Worker processes shared by every instance, started on first use
+    _pool: ProcessPoolExecutor | None = None
+    _pool_lock = threading.Lock()
+    # (profile, report_type) -> [documents, total bytes, last bytes] rendered by this process
+    _sizes: dict[tuple[str, str], list[int]] = {}
+    _sizes_lock = threading.Lock()
+
+    def __init__(self, output_dir: str = "generated_reports", profile: str = "standard"):
+        if profile not in PDF_PROFILES:
+            raise ValueError(f"Unknown PDF profile: {profile}")
         self.output_dir = output_dir
+        self.profile = profile
+        self.settings = PDF_PROFILES[profile]
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
+    @classmethod
+    def process_pool(cls) -> ProcessPoolExecutor:
+        # spawn, not fork: the server process runs threads
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            return cls._pool
+
+    @classmethod
+    def shutdown_pool(cls):
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.shutdown(wait=False, cancel_futures=True)
+                cls._pool = None
+
+    def submit(self, report_type: str, data: PoliceReportDetails, **kwargs) -> Future:
+        """
+        Renders one document in a worker process; the future resolves to its path.
+        kwargs are those of the matching generate_* method. A sketch must be
+        passed as a file path or bytes buffer (it is pickled to the worker).
+        """
+        rendered = self.process_pool().submit(_generate_in_worker, self.output_dir, self.profile, report_type, data.model_dump(), kwargs)
+        # Resolved with the path once the size is recorded (the caller may move the file right away)
+        future = Future()
+
+        def finish(done: Future):
+            try:
+                filepath, size = done.result()
+            except BaseException as e:
+                future.set_exception(e)
+                return
+            self._record_size(report_type, size)
+            future.set_result(filepath)
+
+        rendered.add_done_callback(finish)
+        return future
+
+    def render_bytes(self, report_type: str, data: PoliceReportDetails, **kwargs) -> bytes:
+        """
+        Renders one document in memory and returns the PDF bytes; nothing is
+        written to disk. kwargs are those of the matching generate_* method.
+        """
+        buffer = io.BytesIO()
+        getattr(self, REPORT_GENERATORS[report_type])(data, output=buffer, **kwargs)
+        pdf = buffer.getvalue()
+        self._record_size(report_type, len(pdf))
+        return pdf
+
+    def render_signature_base(self, report_type: str, data: PoliceReportDetails, **kwargs) -> tuple[bytes, dict]:
+        """
+        Renders a document of SIGNED_DOCUMENTS with its signature slots left
+        empty. Returns the PDF bytes and the layout stamp_signatures() needs:
+        where each slot is and the document's names of the fonts it uses.
+        kwargs are those of the generate_* method, without the signers.
+        """
+        layout = {"slots": {}, "fonts": {}}
+        buffer = io.BytesIO()
+        getattr(self, REPORT_GENERATORS[report_type])(data, output=buffer, signature_layout=layout, **kwargs)
+        return buffer.getvalue(), layout
+
+    def stamp_signatures(self, report_type: str, base: bytes, layout: dict, signed_by_pengadu: str = None,
+                         signed_by_police: str = None) -> bytes | None:
+        """
+        The document in the given signature state, drawn onto its unsigned base
+        (render_signature_base) instead of being laid out again. Returns None
+        when a signature does not fit the room its slot reserved (a signer
+        other than the expected one); the document must then be rendered.
+        """
+        style = self._get_styles()['ValueStyle']
+        # Scratch canvas: only its drawing operators are used
+        scratch = canvas.Canvas(io.BytesIO(), pagesize=A4)
+        overlays: dict[int, list[str]] = {}
+        for name, signer in (("pengadu", signed_by_pengadu), ("police", signed_by_police)):
+            slot = layout["slots"][name]
+            paragraph = Paragraph(signature_display(signer), style)
+            _, height = paragraph.wrap(slot["width"], slot["height"])
+            if height > slot["height"]:
+                return None
+            scratch._code = []
+            paragraph.drawOn(scratch, slot["x"], slot["y"] + slot["height"] - height)
+            overlays.setdefault(slot["page"], []).extend(scratch._code)
+
+        # Font names of the scratch canvas -> names in the base document
+        fonts = {scratch._doc.getInternalFontName(font): internal for font, internal in layout["fonts"].items()}
+
+        def base_font(match):
+            if match.group(1) not in fonts:
+                raise KeyError(match.group(1))
+            return fonts[match.group(1)] + match.group(2)
+
+        try:
+            operators = {
+                page: re.sub(r"(/F\d+)(\s+[\d.]+\s+Tf)", base_font, "\n".join(code)).encode("latin-1")
+                for page, code in overlays.items()
+            }
+        except KeyError:
+            # A font the base never registered
+            return None
+        pdf = stamp_pages(base, operators, self.settings["ascii85"])
+        self._record_size(report_type, len(pdf))
+        return pdf
+
+    def _record_size(self, report_type: str, size: int):
+        with self._sizes_lock:
+            entry = self._sizes.setdefault((self.profile, report_type), [0, 0, 0])
+            entry[0] += 1
+            entry[1] += size
+            entry[2] = size
+
+    @classmethod
+    def size_stats(cls) -> dict:
+        """Sizes of the documents rendered through submit() and render_bytes(), per profile and report type."""
+        with cls._sizes_lock:
+            stats = {}
+            for (profile, report_type), (documents, total, last) in sorted(cls._sizes.items()):
+                stats.setdefault(profile, {})[report_type] = {
+                    "documents": documents,
+                    "avg_bytes": total // documents,
+                    "last_bytes": last
+                }
+            return stats
+
+    def generate_batch(self, data: PoliceReportDetails, documents: dict[str, dict]) -> dict[str, str]:
+        """
+        Renders several documents of one case concurrently across the worker
+        processes. documents maps a report type ("polis_repot", "rajah_kasar",
+        "keputusan") to the kwargs of its generate_* method; returns
+        {report_type: filepath} once all of them are written.
+        """
+        futures = {report_type: self.submit(report_type, data, **kwargs) for report_type, kwargs in documents.items()}
+        return {report_type: future.result() for report_type, future in futures.items()}
+
     def _header_footer(self, canvas, doc):
         canvas.saveState()
 
         page_width = A4[0]
-        content_width = 6.5 * inch
-        margin_x = (page_width - content_width) / 2
-        
-        # Header Line
-        header_y = A4[1] - doc.topMargin + 10 
-        canvas.setLineWidth(1)
-        canvas.line(margin_x, header_y, page_width - margin_x, header_y)
-        
-        # Footer
+        margin_x = (page_width - CONTENT_WIDTH) / 2
         footer_y = doc.bottomMargin - 15
-        # Footer Line
-        canvas.line(margin_x, footer_y + 12, page_width - margin_x, footer_y + 12)
-        
+
+        # Header and footer lines: one form per document, referenced by every page
+        if not canvas.hasForm("PageRules"):
+            canvas.beginForm("PageRules")
+            # Header Line
+            header_y = A4[1] - doc.topMargin + 10
+            canvas.setLineWidth(1)
+            canvas.line(margin_x, header_y, page_width - margin_x, header_y)
+            # Footer Line
+            canvas.line(margin_x, footer_y + 12, page_width - margin_x, footer_y + 12)
+            canvas.endForm()
+        canvas.doForm("PageRules")
+
         # Footer Text
-        footer_text = f"Muka surat {doc.page} daripada 1" 
+        # Page within the current document of a bundle
+        page_no = doc.page - getattr(doc, "document_first_page", 1) + 1
+        footer_text = f"Muka surat {page_no} daripada 1"
         canvas.setFont('Helvetica', 9)
         canvas.drawRightString(page_width - margin_x, footer_y, footer_text)
         
         canvas.restoreState()
 
     def _get_styles(self):
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='CenterTitle', parent=styles['Heading1'], alignment=TA_CENTER, spaceAfter=20, fontSize=12))
-        styles.add(ParagraphStyle(name='JustifyText', parent=styles['Normal'], alignment=TA_JUSTIFY, spaceAfter=6))
-        return styles
+        return compiled_templates().styles
 
     def _create_doc(self, filepath):
-        # Set margins to match the calculated content alignment (approx 0.88 inch)
-        margin = (8.27 - 6.5) / 2 * inch
-        doc = SimpleDocTemplate(filepath, pagesize=A4, leftMargin=margin, rightMargin=margin, topMargin=50, bottomMargin=50)
+        # filepath: a path, or a binary buffer to render into without touching disk
+        doc = SimpleDocTemplate(filepath, pagesize=A4, leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN, topMargin=50, bottomMargin=50)
         
         # Add Page Template for Header/Footer
         frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal', leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
@@ -56,28 +555,46 @@ class PDFService:
         doc.addPageTemplates([template])
         return doc
 
-    def generate_polis_repot(self, data: PoliceReportDetails, signed_by_pengadu: str = None, signed_by_police: str = None, filename: str = None) -> str:
+    def _build(self, doc, elements):
+        with _stream_encoding(self.settings["ascii85"]):
+            doc.build(elements)
+
+    def _embed_sketch(self, sketch_data):
+        """
+        The sketch as this profile embeds it: unchanged, or re-encoded as a
+        JPEG at the profile's resolution and quality unless it already is one.
+        """
+        if not self.settings["image_dpi"] or sketch_fits(sketch_data, self.settings["image_dpi"]):
+            return sketch_data
+        buffer = io.BytesIO()
+        prepare_sketch(sketch_data, buffer, self.settings["image_dpi"], self.settings["image_quality"])
+        buffer.seek(0)
+        return buffer
+
+    def generate_polis_repot(self, data: PoliceReportDetails, signed_by_pengadu: str = None, signed_by_police: str = None, filename: str = None, output: BinaryIO = None,
+                             signature_layout: dict = None) -> str | BinaryIO:
+        """signature_layout: leave the signatures empty and record where they go (see render_signature_base)"""
         if not filename:
             filename = f"PolisRepot_{data.report_no.replace('/', '_')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = output if output is not None else os.path.join(self.output_dir, filename)
         
         doc = self._create_doc(filepath)
-        styles = self._get_styles()
+        self._build(doc, self._polis_repot_elements(data, signed_by_pengadu, signed_by_police, signature_layout))
+        return filepath
+
+    def _polis_repot_elements(self, data: PoliceReportDetails, signed_by_pengadu: str = None, signed_by_police: str = None,
+                              signature_layout: dict = None) -> list:
+        templates = compiled_templates()
+        styles = templates.styles
+        table_styles = templates.table_styles
         elements = []
 
         # 1. Header
-        # Reduced padding between lines
-        style_header_1 = ParagraphStyle(name='Header1', parent=styles['CenterTitle'], spaceAfter=0, leading=16)
-        style_header_2 = ParagraphStyle(name='Header2', parent=styles['CenterTitle'], spaceAfter=4)
-        
-        elements.append(Paragraph("POLIS DIRAJA MALAYSIA", style_header_1))
-        elements.append(Paragraph("REPOT POLIS", style_header_2))
+        elements.append(templates.flowable("polis_header_1"))
+        elements.append(templates.flowable("polis_header_2"))
 
         # 2. Meta Block (Split into Left and Right columns)
 
-        # Helper styles
-        style_norm = styles['Normal']
-        
         # Parsing date/time
         date_str = data.tarikh_repot.strftime("%d/%m/%y")
         time_str = data.tarikh_repot.strftime("%I:%M %p") # 12hr format
@@ -90,13 +607,13 @@ class PDFService:
         col5_w = 0.1*inch # Sep Right
         col6_w = 1.4*inch # Value Right
         
-        # Helper for wrapping text in Paragraphs to ensure multi-line alignment
-        style_val = ParagraphStyle(name='ValueStyle', parent=styles['Normal'], fontName='Helvetica', fontSize=9, leading=11)
-        
+        style_val = styles['ValueStyle']
+
         def p(text):
             if text is None: return "-"
+            if text == "---": return templates.flowable("value_none")
             return Paragraph(str(text), style_val)
-        
+
         # Row 1
         r1 = ["Balai", ":", p(data.balai_polis), "Pegawai Penyiasat", ":", p(data.pegawai_penyiasat_sketch)]
         r2 = ["Daerah", ":", p(data.daerah), "No. Repot Bersangkut", ":", p(data.no_repot_bersangkut)]
@@ -108,55 +625,40 @@ class PDFService:
         
         meta_data = [r1, r2, r3, r4, r5, r6, r7]
         t_meta = Table(meta_data, colWidths=[col1_w, col2_w, col3_w, col4_w, col5_w, col6_w])
-        t_meta.setStyle(TableStyle([
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-            ('FONTSIZE', (0,0), (-1,-1), 9),
-            ('ALIGN', (0,0), (0,-1), 'LEFT'),
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (0,-1), 0), # Align with header line
-        ]))
+        t_meta.setStyle(table_styles["polis_meta"])
         elements.append(t_meta)
         elements.append(Spacer(1, 0.2*inch))
 
         # 3. Butir-butir Penerima Repot
-        style_bold_small = ParagraphStyle('BoldSmall', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=9, leftIndent=0, firstLineIndent=0)
-        elements.append(Paragraph("Butir-butir Penerima Repot :", style_bold_small))
+        elements.append(templates.flowable("penerima_heading"))
         
         # Nama : ... No. Badan : ... Pangkat : ...
         penerima_data = [
             ["Nama", ":", p(data.penerima_nama), "No. Badan", ":", p(data.penerima_id), "Pangkat", ":", p(data.penerima_pangkat)]
         ]
-        t_penerima = Table(penerima_data, colWidths=[0.95*inch, 0.1*inch, 1.3*inch, 0.95*inch, 0.1*inch, 1.15*inch, 0.9*inch, 0.1*inch, 0.95*inch])
-        t_penerima.setStyle(TableStyle([
-            ('FONTSIZE', (0,0), (-1,-1), 9), 
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (0,-1), 0),
-        ]))
+        t_penerima = Table(penerima_data, colWidths=GRID_COL_WIDTHS)
+        t_penerima.setStyle(table_styles["grid"])
         elements.append(t_penerima)
         elements.append(Spacer(1, 0.15*inch))
         
         # 4. Butir-butir Jurubahasa
-        elements.append(Paragraph("Butir-butir Jurubahasa (Jika Ada) :", style_bold_small))
-        jurubahasa_data = [
-            ["Nama", ":", p(data.jurubahasa_nama or "---"), "No. K/P (Baru)", ":", p(data.jurubahasa_ic or "---"), "No. Polis", ":", p(data.jurubahasa_polis_id or "---")],
-            ["No. Pasport", ":", p(data.jurubahasa_pasport or "---"), "Bahasa Asal", ":", p(data.jurubahasa_bahasa_asal or "---"), "", "", ""],
-            ["Alamat", ":", p(data.jurubahasa_alamat or "---"), "", "", "", "", "", ""]
-        ]
-        t_jurubahasa = Table(jurubahasa_data, colWidths=[0.95*inch, 0.1*inch, 1.3*inch, 0.95*inch, 0.1*inch, 1.15*inch, 0.9*inch, 0.1*inch, 0.95*inch])
-        t_jurubahasa.setStyle(TableStyle([
-            ('FONTSIZE', (0,0), (-1,-1), 9), 
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (0,-1), 0),
-        ]))
+        elements.append(templates.flowable("jurubahasa_heading"))
+        if any(getattr(data, field) for field in JURUBAHASA_FIELDS):
+            jurubahasa_data = [
+                ["Nama", ":", p(data.jurubahasa_nama or "---"), "No. K/P (Baru)", ":", p(data.jurubahasa_ic or "---"), "No. Polis", ":", p(data.jurubahasa_polis_id or "---")],
+                ["No. Pasport", ":", p(data.jurubahasa_pasport or "---"), "Bahasa Asal", ":", p(data.jurubahasa_bahasa_asal or "---"), "", "", ""],
+                ["Alamat", ":", p(data.jurubahasa_alamat or "---"), "", "", "", "", "", ""]
+            ]
+            t_jurubahasa = Table(jurubahasa_data, colWidths=GRID_COL_WIDTHS)
+            t_jurubahasa.setStyle(table_styles["grid"])
+        else:
+            t_jurubahasa = templates.flowable("jurubahasa_empty")
         elements.append(t_jurubahasa)
         elements.append(Spacer(1, 0.15*inch))
         
         # 5. Butir-butir Pengadu (The big one)
-        elements.append(Paragraph("Butir-butir Pengadu :", style_bold_small))
+        elements.append(templates.flowable("pengadu_heading"))
 
-        col_w_pengadu = [0.95*inch, 0.1*inch, 1.3*inch, 0.95*inch, 0.1*inch, 1.15*inch, 0.9*inch, 0.1*inch, 0.95*inch]
-        
         dob = data.pengadu_tarikh_lahir.strftime("%d/%m/%Y") if data.pengadu_tarikh_lahir else "---"
         
         pengadu_grid = [
@@ -172,70 +674,52 @@ class PDFService:
             ["Emel", ":", p(data.pengadu_email or "---"), "", "", "", "", "", ""]
         ]
         
-        t_pengadu = Table(pengadu_grid, colWidths=col_w_pengadu)
-        t_pengadu.setStyle(TableStyle([
-            ('FONTSIZE', (0,0), (-1,-1), 9),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (0,-1), 0),
-            ('SPAN', (2,5), (-1,5)), # Alamat Tinggal span across
-            ('SPAN', (2,6), (-1,6)), # IbuBapa
-            ('SPAN', (2,7), (-1,7)), # Pejabat
-            ('SPAN', (2,4), (-1,4)), # Pekerjaan
-            ('SPAN', (2,0), (-1,0)), # Nama
-            ('SPAN', (2,9), (-1,9)), # Emel
-        ]))
+        t_pengadu = Table(pengadu_grid, colWidths=GRID_COL_WIDTHS)
+        t_pengadu.setStyle(table_styles["pengadu"])
         elements.append(t_pengadu)
         elements.append(Spacer(1, 0.1*inch))
         
         # 6. Pengadu Menyatakan
-        elements.append(Paragraph("Pengadu Menyatakan :", style_bold_small))
+        elements.append(templates.flowable("pengadu_menyatakan"))
         elements.append(Spacer(1, 0.05*inch))
         # Upper case body text
-        elements.append(Paragraph(data.keterangan_kes.upper(), ParagraphStyle('BodyUpper', parent=styles['Normal'], fontSize=9, leading=10)))
+        elements.append(Paragraph(data.keterangan_kes.upper(), styles['BodyUpper']))
         elements.append(Spacer(1, 1*inch))
         
         # 7. Signatures
         # 6.5 inch total width
         
-        # Signature styling
-        # If signed, we replace the line with the name in Bold/Italic
-        
-        sig_pengadu_display = "_"*25
-        if signed_by_pengadu:
-            sig_pengadu_display = f"{signed_by_pengadu.upper()}<br/>(digital signature)"
-            
-        sig_police_display = "_"*25
-        if signed_by_police:
-             sig_police_display = f"{signed_by_police.upper()}<br/>(digital signature)"
+        # Signature styling: see signature_display()
+        # Driver A (Pengadu) and the investigating officer sign (see report_cache.document_inputs)
         
+        elements.append(templates.flowable("signature_labels"))
         sig_data = [
-            ["Tandatangan Pengadu:", "Tandatangan Jurubahasa\n(Jika ada):", "Tandatangan Penerima Repot:"],
             [Spacer(1, 0.4*inch), "", ""],
-            [Paragraph(sig_pengadu_display, style_val), "_"*25, Paragraph(sig_police_display, style_val)]
+            [SignatureSlot("pengadu", signed_by_pengadu, data.pengadu_nama, style_val, signature_layout), "_"*25,
+             SignatureSlot("police", signed_by_police, data.pegawai_penyiasat_nama, style_val, signature_layout)]
         ]
-        t_sig = Table(sig_data, colWidths=[2.16*inch, 2.16*inch, 2.16*inch]) # Equal split ~2.16 inch
-        t_sig.setStyle(TableStyle([
-            ('FONTSIZE', (0,0), (-1,-1), 9), 
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('LEFTPADDING', (0,0), (0,-1), 0),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ]))
+        t_sig = Table(sig_data, colWidths=SIGNATURE_COL_WIDTHS)
+        t_sig.setStyle(table_styles["signatures"])
         elements.append(t_sig)
         elements.append(Spacer(1, 0.3*inch))
 
-        doc.build(elements)
-        return filepath
+        return elements
 
-    def generate_rajah_kasar(self, data: PoliceReportDetails, sketch_data: any = None, filename: str = None) -> str:
+    def generate_rajah_kasar(self, data: PoliceReportDetails, sketch_data: any = None, filename: str = None, output: BinaryIO = None) -> str | BinaryIO:
         """
         sketch_data: Can be a file path (str) OR a file-like object (BytesIO)
+        output: render into this buffer instead of a file (returned instead of the path)
         """
         if not filename:
             filename = f"RajahKasar_{data.report_no.replace('/', '_')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = output if output is not None else os.path.join(self.output_dir, filename)
         
         doc = self._create_doc(filepath)
-        styles = self._get_styles()
+        self._build(doc, self._rajah_kasar_elements(data, sketch_data))
+        return filepath
+
+    def _rajah_kasar_elements(self, data: PoliceReportDetails, sketch_data: any = None) -> list:
+        templates = compiled_templates()
         elements = []
 
         # 1. Aligned Metadata Block
@@ -255,19 +739,12 @@ class PDFService:
         ]
         
         t_meta = Table(meta_data, colWidths=[lbl_w, sep_w, val_w])
-        t_meta.setStyle(TableStyle([
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-            ('FONTSIZE', (0,0), (-1,-1), 10),
-            ('ALIGN', (0,0), (0,-1), 'LEFT'),  # Label Left
-            ('ALIGN', (1,0), (1,-1), 'CENTER'), # Colon Center
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),   # Value Left
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ]))
+        t_meta.setStyle(templates.table_styles["sketch_meta"])
         elements.append(t_meta)
         elements.append(Spacer(1, 0.3*inch))
 
         # 2. Title
-        elements.append(Paragraph("RAJAH KASAR (TIDAK MENGIKUT SKALA)", styles['CenterTitle']))
+        elements.append(templates.flowable("sketch_title"))
         
         # 3. Sketch Box
         
@@ -284,7 +761,7 @@ class PDFService:
         
         if has_sketch:
              # reportlab Image supports file-like objects directly
-             box_content.append(Image(sketch_data, width=5.5*inch, height=4*inch, kind='proportional'))
+             box_content.append(Image(self._embed_sketch(sketch_data), width=5.5*inch, height=4*inch, kind='proportional'))
         else:
              # Placeholder space
              box_content.append(Spacer(1, 4*inch))
@@ -296,39 +773,33 @@ class PDFService:
         ]
         
         t_box = Table(final_box_data, colWidths=[6.5*inch])
-        t_box.setStyle(TableStyle([
-            ('BOX', (0,0), (-1,-1), 1, colors.black), # The main border
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('VALIGN', (0,0), (0,0), 'MIDDLE'), # Image Center
-            ('LEFTPADDING', (0,0), (-1,-1), 5),
-            ('RIGHTPADDING', (0,0), (-1,-1), 5),
-            ('TOPPADDING', (0,0), (-1,-1), 5),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 5),
-        ]))
+        t_box.setStyle(templates.table_styles["sketch_box"])
         
         elements.append(t_box)
 
-        doc.build(elements)
-        return filepath
+        return elements
 
-    def generate_keputusan(self, data: PoliceReportDetails, filename: str = None) -> str:
+    def generate_keputusan(self, data: PoliceReportDetails, filename: str = None, output: BinaryIO = None) -> str | BinaryIO:
         if not filename:
             filename = f"Keputusan_{data.report_no.replace('/', '_')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = output if output is not None else os.path.join(self.output_dir, filename)
         
         doc = self._create_doc(filepath)
-        styles = self._get_styles()
+        self._build(doc, self._keputusan_elements(data))
+        return filepath
+
+    def _keputusan_elements(self, data: PoliceReportDetails) -> list:
+        templates = compiled_templates()
+        styles = templates.styles
         elements = []
 
         # Styles for the Letter
-        style_right = ParagraphStyle(name='RightAlign', parent=styles['Normal'], alignment=TA_LEFT, leftIndent=3.5*inch)
-        style_bold = ParagraphStyle(name='Bold', parent=styles['Normal'], fontName='Helvetica-Bold')
+        style_right = styles['RightAlign']
 
         # 1. Top Right Info (Rujukan Kami, Tarikh)
-        # Malaysia Time
-        from datetime import timedelta
-        now_my = datetime.utcnow() + timedelta(hours=8)
-        fmt_now = now_my.strftime("%d/%m/%y %I:%M %p")
+        # Malaysia Time, from the case rather than the clock so a cached render stays right:
+        # when the police signed, the report date until then
+        fmt_now = (data.tarikh_surat or data.tarikh_repot).strftime("%d/%m/%y %I:%M %p")
         rujukan = f"Rujukan Kami: {data.no_kertas_siasatan or data.report_no}"
         
         elements.append(Paragraph(rujukan, style_right))
@@ -354,8 +825,7 @@ class PDFService:
         elements.append(Spacer(1, 0.4*inch))
 
         # 3. Title - Bold, Underline, No Italic
-        style_title_kv = ParagraphStyle(name='KeputusanTitle', parent=styles['Heading3'], fontName='Helvetica-Bold', leftIndent=0)
-        elements.append(Paragraph("<u>KEPUTUSAN PENYIASATAN KES</u>", style_title_kv))
+        elements.append(templates.flowable("keputusan_title"))
         
         # 4. Details List (Table with very small left col for alignment if needed, or just colon alignment)
 
@@ -375,20 +845,12 @@ class PDFService:
         
         # Ensure hAlign='LEFT' so table starts at frame edge
         t_details = Table(details_list, colWidths=[lbl_w, sep_w, val_w], hAlign='LEFT')
-        t_details.setStyle(TableStyle([
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('ALIGN', (0,0), (0,-1), 'LEFT'),
-            ('ALIGN', (1,0), (1,-1), 'CENTER'),
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),
-            # Remove left padding for first column so text aligns with the Title above (which is at left frame edge)
-            ('LEFTPADDING', (0,0), (0,-1), 0),
-        ]))
+        t_details.setStyle(templates.table_styles["keputusan_details"])
         elements.append(t_details)
         elements.append(Spacer(1, 0.2*inch))
         
         # 5. Body Paragraphs
-        elements.append(Paragraph("Dengan hormatnya saya merujuk kepada pengaduan yang dibuat sepertimana dinyatakan di atas", styles['JustifyText']))
+        elements.append(templates.flowable("keputusan_intro"))
         elements.append(Spacer(1, 0.1*inch))
         
         # Paragraph 2
@@ -403,7 +865,7 @@ class PDFService:
         elements.append(Spacer(1, 0.1*inch))
         
         # Paragraph 3
-        elements.append(Paragraph("3. Butir-butir pihak yang disalahkan adalah seperti berikut:", styles['Normal']))
+        elements.append(templates.flowable("keputusan_para_3"))
         elements.append(Spacer(1, 0.1*inch))
         
         # Offender Details Table aligned
@@ -419,17 +881,12 @@ class PDFService:
         ]
         
         t_offender = Table(offender_data, colWidths=[lbl_w, sep_w, val_w])
-        t_offender.setStyle(TableStyle([
-             ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-             ('VALIGN', (0,0), (-1,-1), 'TOP'),
-             ('ALIGN', (0,0), (0,-1), 'LEFT'),
-             ('ALIGN', (1,0), (1,-1), 'CENTER'),
-        ]))
+        t_offender.setStyle(templates.table_styles["keputusan_offender"])
         elements.append(t_offender)
         elements.append(Spacer(1, 0.4*inch))
         
         # Safety Slogan
-        elements.append(Paragraph('"BERHATI-HATI DI JALAN RAYA"', style_bold))
+        elements.append(templates.flowable("keputusan_slogan"))
         elements.append(Spacer(1, 0.4*inch))
         
         # Signoff Block
@@ -447,5 +904,26 @@ class PDFService:
         sk_text = f"S.K. NO KST: {data.no_kertas_siasatan or data.report_no}<br/>(Notis ini hanya sebagai makluman anda sahaja)"
         elements.append(Paragraph(sk_text, styles['Normal']))
 
-        doc.build(elements)
+        return elements
+
+    def generate_bundle(self, data: PoliceReportDetails, signed_by_pengadu: str = None, signed_by_police: str = None,
+                        sketch_data: any = None, filename: str = None, output: BinaryIO = None,
+                        signature_layout: dict = None) -> str | BinaryIO:
+        """
+        The whole case in one PDF: Polis Repot, Rajah Kasar and Keputusan, each
+        starting on a new page and numbered from 1. Fonts, the page rules form
+        and the document metadata are written once for the file instead of once
+        per document.
+        """
+        if not filename:
+            filename = f"Kes_{data.report_no.replace('/', '_')}.pdf"
+        filepath = output if output is not None else os.path.join(self.output_dir, filename)
+
+        doc = self._create_doc(filepath)
+        elements = self._polis_repot_elements(data, signed_by_pengadu, signed_by_police, signature_layout)
+        elements.append(DocumentBreak())
+        elements.extend(self._rajah_kasar_elements(data, sketch_data))
+        elements.append(DocumentBreak())
+        elements.extend(self._keputusan_elements(data))
+        self._build(doc, elements)
         return filepath
@@ -0,0 +1,131 @@
+"""
+Drawing onto a finished ReportLab PDF without re-rendering it.
+
+The overlay is appended as an incremental update: the original bytes stay as
+they are, followed by new content streams, a redefinition of each stamped
+page that draws them after its original content, and a new xref section
+pointing back at the original one. Only what ReportLab itself writes needs to
+be understood: a single /Pages node and uncompressed object dictionaries.
+
+Objects are looked up through the xref table, never by searching the file:
+with binary streams (the compact profile) a pattern could match inside
+stream data.
+"""
+import base64
+import re
+import zlib
+
+
+def _stream_object(number: int, content: bytes, ascii85: bool) -> bytes:
+    data = zlib.compress(content)
+    filters = "/FlateDecode"
+    if ascii85:
+        data = base64.a85encode(data) + b"~>"
+        filters = "/ASCII85Decode /FlateDecode"
+    header = f"{number} 0 obj\n<< /Filter [ {filters} ] /Length {len(data)} >>\nstream\n".encode()
+    return header + data + b"\nendstream\nendobj\n"
+
+
+def read_xref(pdf: bytes, offset: int) -> tuple[dict[int, int], bytes]:
+    """
+    The xref section at offset: {object number: offset} of the objects in use,
+    and the trailer dictionary that follows it.
+    """
+    if not pdf.startswith(b"xref", offset):
+        raise ValueError(f"No xref section at {offset}")
+    trailer_start = pdf.find(b"trailer", offset)
+    trailer_end = pdf.find(b"startxref", trailer_start)
+    if trailer_start < 0 or trailer_end < 0:
+        raise ValueError("xref section without trailer")
+    # Subsections: "first count", then count entries of "offset generation n|f"
+    tokens = pdf[offset + len(b"xref"):trailer_start].split()
+    entries = {}
+    i = 0
+    while i < len(tokens):
+        first, count = int(tokens[i]), int(tokens[i + 1])
+        i += 2
+        for number in range(first, first + count):
+            if tokens[i + 2] == b"n":
+                entries[number] = int(tokens[i])
+            i += 3
+    return entries, pdf[trailer_start:trailer_end]
+
+
+def _ref(data: bytes, key: bytes) -> int:
+    match = re.search(rb"/%s\s+(\d+)\s+\d+\s+R" % key, data)
+    if not match:
+        raise ValueError(f"No /{key.decode()} reference")
+    return int(match.group(1))
+
+
+def _object_body(pdf: bytes, xref: dict[int, int], number: int) -> bytes:
+    if number not in xref:
+        raise ValueError(f"Object {number} not in the xref table")
+    # Dictionaries only (catalog, pages, page): nothing between the header and endobj is stream data
+    match = re.compile(rb"(\d+)\s+\d+\s+obj\s*(.*?)\s*endobj", re.S).match(pdf, xref[number])
+    if not match or int(match.group(1)) != number:
+        raise ValueError(f"xref entry of object {number} does not point at it")
+    return match.group(2)
+
+
+def stamp_pages(pdf: bytes, overlays: dict[int, bytes], ascii85: bool = True) -> bytes:
+    """
+    Returns pdf with overlays[page] (content stream operators, pages counted
+    from 1) drawn on top of the given pages. Each page's original content is
+    wrapped in q/Q, so the overlay starts from the default graphics state.
+    """
+    startxref = re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", pdf)
+    if not startxref:
+        raise ValueError("No startxref at the end of the PDF")
+    xref, trailer = read_xref(pdf, int(startxref.group(1)))
+    if b"/Prev" in trailer:
+        raise ValueError("Not a single-section PDF")
+    size = int(re.search(rb"/Size\s+(\d+)", trailer).group(1))
+    refs = b" ".join(
+        match.group(0) for match in (
+            re.search(rb"/Root\s+\d+\s+\d+\s+R", trailer),
+            re.search(rb"/Info\s+\d+\s+\d+\s+R", trailer),
+            re.search(rb"/ID\s*\[\s*<[0-9a-fA-F]*>\s*<[0-9a-fA-F]*>\s*\]", trailer),
+        ) if match
+    )
+    pages = _object_body(pdf, xref, _ref(_object_body(pdf, xref, _ref(trailer, b"Root")), b"Pages"))
+    kids = [int(n) for n in re.findall(rb"(\d+)\s+0\s+R", re.search(rb"/Kids\s*\[([^\]]*)\]", pages).group(1))]
+
+    out = bytearray(pdf)
+    if not out.endswith(b"\n"):
+        out += b"\n"
+    offsets = {}
+
+    def add(number: int, body: bytes):
+        offsets[number] = len(out)
+        out.extend(body)
+
+    # Shared by every stamped page: saves the state before the original content
+    save_state = size
+    add(save_state, f"{save_state} 0 obj\n<< /Length 1 >>\nstream\nq\nendstream\nendobj\n".encode())
+    next_number = size + 1
+    for page, operators in sorted(overlays.items()):
+        page_number = kids[page - 1]
+        overlay = next_number
+        next_number += 1
+        add(overlay, _stream_object(overlay, b"Q\n" + operators, ascii85))
+
+        body = _object_body(pdf, xref, page_number)
+        body, replaced = re.subn(
+            rb"/Contents\s+(\d+\s+\d+\s+R|\[[^\]]*\])",
+            lambda m: b"/Contents [ %d 0 R %s %d 0 R ]" % (save_state, m.group(1).strip(b"[] "), overlay),
+            body, count=1
+        )
+        if not replaced:
+            raise ValueError(f"Page object {page_number} has no /Contents")
+        add(page_number, b"%d 0 obj\n%s\nendobj\n" % (page_number, body))
+
+    xref_offset = len(out)
+    # Object 0 heads the free list, as in the original section
+    out += b"xref\n0 1\n0000000000 65535 f\r\n"
+    for number in sorted(offsets):
+        out += b"%d 1\n%010d 00000 n\r\n" % (number, offsets[number])
+    out += b"trailer\n<< /Size %d %s /Prev %s >>\nstartxref\n%d\n%%%%EOF\n" % (
+        next_number, refs, startxref.group(1), xref_offset
+    )
+    return bytes(out)
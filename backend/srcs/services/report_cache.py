@@ -0,0 +1,322 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from typing import Callable
+
+from sqlmodel import Session, select
+
+from srcs.config import REPORT_CACHE_DIR, REPORT_CACHE_STALE_SECONDS
+from srcs.models.report import AccidentReport, PoliceReportDetails, Evidence, EvidenceType
+from srcs.services.pdf_service import PDF_PROFILES, SIGNED_DOCUMENTS
+from srcs.services.sketch_resolver import sketch_resolver, SKETCH_JPEG_QUALITY
+
+# Bump when a PDF template changes so earlier renders stop matching
+RENDER_VERSION = 4
+
+REPORT_TYPES = ("polis_repot", "rajah_kasar", "keputusan")
+# The three documents merged into one PDF (PDFService.generate_bundle)
+CASE_BUNDLE = "bundle"
+DOWNLOAD_TYPES = REPORT_TYPES + (CASE_BUNDLE,)
+
+REPORT_FILE_PREFIXES = {
+    "polis_repot": "PolisRepot",
+    "rajah_kasar": "RajahKasar",
+    "keputusan": "Keputusan",
+    "bundle": "Kes"
+}
+
+
+def download_name(report_type: str, details: PoliceReportDetails) -> str:
+    return f"{REPORT_FILE_PREFIXES[report_type]}_{details.report_no.replace('/', '_')}.pdf"
+
+
+def load_case(db: Session, session_id: str) -> tuple[AccidentReport, PoliceReportDetails, dict]:
+    """The report, its details and document_inputs() per download type of a session."""
+    report = db.exec(select(AccidentReport).where(AccidentReport.session_id == session_id)).first()
+    if not report or not report.report_details_id:
+        raise ValueError(f"No report details for session {session_id}")
+    details = db.get(PoliceReportDetails, report.report_details_id)
+    inputs = {report_type: document_inputs(db, report, details, report_type) for report_type in DOWNLOAD_TYPES}
+    return report, details, inputs
+
+
+def document_inputs(db: Session, report: AccidentReport, details: PoliceReportDetails, report_type: str) -> dict:
+    """
+    What a document depends on besides the details: signer names for the
+    Polis Repot, the sketch for the Rajah Kasar, both for the bundle. Part of
+    the cache key.
+    """
+    inputs = {"signed_by_pengadu": None, "signed_by_police": None, "sketch_sha256": None}
+    if report_type in ("polis_repot", CASE_BUNDLE):
+        # Driver A is Pengadu
+        if report.driver_a_signature:
+            inputs["signed_by_pengadu"] = details.pengadu_nama
+        if report.police_signature:
+            inputs["signed_by_police"] = details.pegawai_penyiasat_nama
+    if report_type in ("rajah_kasar", CASE_BUNDLE):
+        stmt_sketch = select(Evidence).where(
+            Evidence.type == EvidenceType.MAP_SKETCH,
+            Evidence.draft_id.in_([report.driver_a_draft_id, report.driver_b_draft_id])
+        ).limit(1)
+        sketch_ev = db.exec(stmt_sketch).first()
+        if sketch_ev and sketch_ev.blob_sha256:
+            inputs["sketch_sha256"] = sketch_ev.blob_sha256
+    return inputs
+
+
+def document_kwargs(report_type: str, signed_by_pengadu: str | None = None, signed_by_police: str | None = None,
+                    sketch_sha256: str | None = None, profile: str = "standard") -> dict:
+    """
+    Maps document_inputs() to the kwargs of the matching PDFService.generate_*
+    method, with the sketch prepared for the output profile.
+    """
+    kwargs = {}
+    if report_type in ("polis_repot", CASE_BUNDLE):
+        kwargs.update(signed_by_pengadu=signed_by_pengadu, signed_by_police=signed_by_police)
+    if report_type in ("rajah_kasar", CASE_BUNDLE):
+        # Decoded and scaled once per sketch, not per render
+        settings = PDF_PROFILES[profile]
+        kwargs["sketch_data"] = sketch_resolver.resolve(
+            sketch_sha256, settings["image_dpi"], settings["image_quality"] or SKETCH_JPEG_QUALITY
+        ) if sketch_sha256 else None
+    return kwargs
+
+
+def render_document(pdf_service, report_type: str, details: PoliceReportDetails, **inputs) -> bytes:
+    """
+    Renders one document from document_inputs() in memory, in the profile of
+    pdf_service. Documents of SIGNED_DOCUMENTS are stamped onto their cached
+    unsigned base, so signing does not lay the document out again.
+    """
+    kwargs = document_kwargs(report_type, profile=pdf_service.profile, **inputs)
+    if report_type not in SIGNED_DOCUMENTS:
+        return pdf_service.render_bytes(report_type, details, **kwargs)
+
+    signed_by_pengadu = kwargs.pop("signed_by_pengadu")
+    signed_by_police = kwargs.pop("signed_by_police")
+    base_type = f"{report_type}-base"
+    base_key = render_cache.key(base_type, details, sketch_sha256=inputs.get("sketch_sha256"), profile=pdf_service.profile)
+    base, layout = render_cache.fetch_base(
+        base_type, details.id, base_key,
+        lambda: pdf_service.render_signature_base(report_type, details, **kwargs),
+        pdf_service.profile
+    )
+    pdf = pdf_service.stamp_signatures(report_type, base, layout, signed_by_pengadu, signed_by_police)
+    if pdf is None:
+        # A signer the slot was not sized for
+        return pdf_service.render_bytes(
+            report_type, details, signed_by_pengadu=signed_by_pengadu, signed_by_police=signed_by_police, **kwargs
+        )
+    render_cache.count_stamped()
+    return pdf
+
+
+class ReportRenderCache:
+    """
+    Rendered report PDFs on disk, keyed by a hash of everything that goes into
+    them: the report type, every PoliceReportDetails field, the signature state
+    and the sketch bytes (by their blob SHA-256) and resolution. The same inputs always give
+    the same key, so a cached file never needs invalidating and the key doubles
+    as a strong ETag.
+
+    Concurrent requests for a key that is not rendered yet are coalesced: the
+    first one renders, the others wait on the same per-key lock and then serve
+    its file. fetch_or_render() also hands the rendering request the bytes it
+    rendered, so it can answer from memory instead of reading the file back.
+
+    Signed documents also keep their unsigned base (fetch_base()): the PDF
+    with empty signature slots and a .json of where the slots are.
+
+    A new render of a document supersedes the older ones, but a request may
+    still be about to send one of them. Serving a file touches its mtime, and
+    superseded files are only deleted once they have gone unserved for
+    stale_seconds.
+    """
+
+    def __init__(self, root: str = REPORT_CACHE_DIR, stale_seconds: float = REPORT_CACHE_STALE_SECONDS):
+        self.root = root
+        self.stale_seconds = stale_seconds
+        os.makedirs(self.root, exist_ok=True)
+        # Per-key render locks, dropped once no request holds them
+        self._locks: weakref.WeakValueDictionary[str, threading.Lock] = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.base_renders = 0
+        self.stamped = 0
+
+    @staticmethod
+    def key(report_type: str, details: PoliceReportDetails, signed_by_pengadu: str | None = None,
+            signed_by_police: str | None = None, sketch_sha256: str | None = None, profile: str = "standard") -> str:
+        payload = json.dumps({
+            "version": RENDER_VERSION,
+            "type": report_type,
+            "profile": profile,
+            "details": details.model_dump(mode="json"),
+            "signed_by_pengadu": signed_by_pengadu,
+            "signed_by_police": signed_by_police,
+            "sketch": sketch_sha256,
+            "sketch_dpi": sketch_resolver.dpi,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _file_prefix(report_type: str, details_id: int, profile: str) -> str:
+        # Each profile keeps its own current render of a document
+        if profile == "standard":
+            return f"{report_type}_{details_id}_"
+        return f"{report_type}-{profile}_{details_id}_"
+
+    def path_for(self, report_type: str, details_id: int, key: str, profile: str = "standard") -> str:
+        return os.path.abspath(os.path.join(self.root, f"{self._file_prefix(report_type, details_id, profile)}{key}.pdf"))
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_or_render(self, report_type: str, details_id: int, key: str, render: Callable[[str], str]) -> str:
+        """
+        Returns the path of the cached PDF, calling render(filepath) to write it
+        on a miss. Older renders of the same document that are no longer
+        served are removed.
+        """
+        path = self.path_for(report_type, details_id, key)
+        if self._touch(path):
+            self._count("hits")
+            return path
+
+        lock = self._lock_for(key)
+        with lock:
+            if self._touch(path):
+                # Rendered by the request we were waiting for
+                self._count("coalesced")
+                return path
+
+            tmp_path = self._tmp_path()
+            try:
+                render(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._count("renders")
+
+        self._remove_stale(report_type, details_id, path)
+        return path
+
+    def fetch_or_render(self, report_type: str, details_id: int, key: str,
+                        render: Callable[[], bytes], profile: str = "standard") -> tuple[str, bytes | None]:
+        """
+        Like get_or_render(), but render() returns the PDF bytes, in the given
+        output profile. Returns (path, pdf): pdf is the rendered bytes when
+        this call rendered them, None when the file was already cached.
+        """
+        path = self.path_for(report_type, details_id, key, profile)
+        if self._touch(path):
+            self._count("hits")
+            return path, None
+
+        lock = self._lock_for(key)
+        with lock:
+            if self._touch(path):
+                self._count("coalesced")
+                return path, None
+
+            pdf = render()
+            # Written from memory, never read back by this request
+            tmp_path = self._tmp_path()
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(pdf)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._count("renders")
+
+        self._remove_stale(report_type, details_id, path, profile)
+        return path, pdf
+
+    def fetch_base(self, base_type: str, details_id: int, key: str,
+                   render: Callable[[], tuple[bytes, dict]], profile: str = "standard") -> tuple[bytes, dict]:
+        """
+        Returns the unsigned base of a signed document and its signature
+        layout, calling render() for both on a miss.
+        """
+        path = self.path_for(base_type, details_id, key, profile)
+        layout_path = os.path.splitext(path)[0] + ".json"
+        # Keyed apart from the documents: a document render holds its own key's lock while fetching its base
+        with self._lock_for(f"base:{key}"):
+            if self._touch(path) and self._touch(layout_path):
+                with open(path, "rb") as f:
+                    base = f.read()
+                with open(layout_path, "r", encoding="utf-8") as f:
+                    return base, json.load(f)
+
+            base, layout = render()
+            # The layout lands first, so a base on disk always has one
+            for target, data in ((layout_path, json.dumps(layout).encode("utf-8")), (path, base)):
+                tmp_path = self._tmp_path()
+                try:
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, target)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            self._count("base_renders")
+
+        self._remove_stale(base_type, details_id, path, profile)
+        return base, layout
+
+    def count_stamped(self):
+        self._count("stamped")
+
+    def _tmp_path(self) -> str:
+        return os.path.abspath(os.path.join(self.root, f".{uuid.uuid4().hex}.tmp"))
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Marks a cached file as just served. False if it is not (or no longer) on disk."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _remove_stale(self, report_type: str, details_id: int, path: str, profile: str = "standard"):
+        # Files of the current render (a base's .json too) share its name
+        current = os.path.splitext(path)[0]
+        unused_since = time.time() - self.stale_seconds
+        for stale in glob.glob(os.path.join(self.root, f"{self._file_prefix(report_type, details_id, profile)}*")):
+            if os.path.splitext(os.path.abspath(stale))[0] != current:
+                try:
+                    if os.path.getmtime(stale) < unused_since:
+                        os.remove(stale)
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "hits": self.hits, "renders": self.renders, "coalesced": self.coalesced,
+                "base_renders": self.base_renders, "stamped": self.stamped
+            }
+
+
+render_cache = ReportRenderCache()
@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from srcs.database import run_in_session
+from srcs.models.report import PoliceReportDetails
+from srcs.services.event_service import event_manager
+from srcs.services.pdf_service import PDFService
+from srcs.services.report_cache import render_cache, document_kwargs, load_case, DOWNLOAD_TYPES
+
+# Finished jobs kept for status lookups
+MAX_TRACKED_JOBS = 1000
+
+
+class ReportJobQueue:
+    """
+    Renders the documents of a closed case in PDFService's process pool, the
+    three documents and the merged bundle at once, so neither the event loop nor a request waits on ReportLab.
+    Files land in the render cache, where the download endpoint finds them;
+    CASE_CLOSED is published once all of them are ready.
+
+    Job state is kept in memory (most recent MAX_TRACKED_JOBS).
+    """
+
+    def __init__(self):
+        self.pdf_service = PDFService()
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, session_id: str) -> str:
+        """Queues the case documents of a session. Must be called from the event loop."""
+        job_id = str(uuid.uuid4())
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "status": "QUEUED",
+            "files": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None
+        }
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            self._jobs.popitem(last=False)
+
+        # Keep a reference, the loop only holds tasks weakly
+        task = asyncio.create_task(self._run(job_id, session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        return self._jobs.get(job_id)
+
+    def _render(self, report_type: str, details: PoliceReportDetails, inputs: dict) -> str:
+        key = render_cache.key(report_type, details, **inputs)
+        # Holding the cache's key lock while the worker draws coalesces a download of the same file
+        return render_cache.get_or_render(
+            report_type, details.id, key,
+            lambda filepath: self.pdf_service.submit(
+                report_type, details, filename=filepath, **document_kwargs(report_type, **inputs)
+            ).result()
+        )
+
+    async def _run(self, job_id: str, session_id: str):
+        job = self._jobs[job_id]
+        job["status"] = "RUNNING"
+        try:
+            report, details, inputs = await run_in_session(load_case, session_id)
+            await asyncio.gather(*(
+                asyncio.to_thread(self._render, report_type, details, inputs[report_type])
+                for report_type in DOWNLOAD_TYPES
+            ))
+        except Exception as e:
+            print(f"Report job {job_id} for session {session_id} failed: {e}")
+            job.update(status="FAILED", error=str(e), finished_at=datetime.utcnow().isoformat())
+            return
+
+        # The report URLs point at the download endpoint, which now serves the cached files
+        files = {
+            "polis_repot": report.polis_repot_url,
+            "rajah_kasar": report.rajah_kasar_url,
+            "keputusan": report.keputusan_url,
+            "bundle": report.case_bundle_url
+        }
+        job.update(status="DONE", files=files, finished_at=datetime.utcnow().isoformat())
+        await event_manager.publish(session_id, "CASE_CLOSED", files)
+
+
+report_jobs = ReportJobQueue()
@@ -0,0 +1,86 @@
+"""
+Optimistic concurrency for AccidentSession and AccidentReport.
+
+Both tables carry a `version` column. Writes go through compare_and_swap(),
+an UPDATE ... WHERE id = :id AND version = :read_version that bumps the
+version: if another request changed the row since it was read, no row matches
+and StaleVersionError is raised instead of silently overwriting that change.
+Units of work decorated with @retry_on_conflict then roll back and run again
+on fresh rows, so concurrent submits and signatures serialize per session
+without any global lock.
+
+Status changes additionally go through transition(), which only allows the
+moves in SESSION_TRANSITIONS.
+"""
+import functools
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session
+
+from srcs.models.enums import SessionStatus
+from srcs.models.session import AccidentSession
+
+# Allowed status moves. A status listed under itself may be re-entered
+# (a new meeting link, a police re-sign).
+SESSION_TRANSITIONS = {
+    SessionStatus.CREATED: {SessionStatus.HANDSHAKE},
+    SessionStatus.HANDSHAKE: {SessionStatus.PENDING_POLICE},
+    SessionStatus.PENDING_POLICE: {SessionStatus.MEETING_STARTED, SessionStatus.POLICE_SIGNED},
+    SessionStatus.MEETING_STARTED: {SessionStatus.MEETING_STARTED, SessionStatus.POLICE_SIGNED},
+    SessionStatus.POLICE_SIGNED: {SessionStatus.POLICE_SIGNED, SessionStatus.COMPLETED},
+    SessionStatus.COMPLETED: set(),
+}
+
+CAS_MAX_ATTEMPTS = 10
+
+
+class StaleVersionError(Exception):
+    """The row was changed by another request after it was read."""
+
+
+def compare_and_swap(db: Session, obj, **values):
+    """
+    Writes `values` to obj's row only if its version is still the one obj was
+    read with, and bumps the version. obj is updated in place.
+
+    Change versioned rows only through here: plain attribute changes on obj
+    would be flushed without the version check.
+    """
+    model = type(obj)
+    new_version = obj.version + 1
+    result = db.execute(
+        update(model)
+        .where(model.id == obj.id, model.version == obj.version)
+        .values(version=new_version, **values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise StaleVersionError(f"{model.__name__} {obj.id} was modified concurrently")
+
+    for key, value in {**values, "version": new_version}.items():
+        set_committed_value(obj, key, value)
+
+
+def transition(db: Session, session_obj: AccidentSession, status: SessionStatus, **values):
+    """Moves a session to `status` (plus any other column changes) if the state machine allows it."""
+    if status not in SESSION_TRANSITIONS[session_obj.status]:
+        raise HTTPException(409, f"Cannot move session from {session_obj.status.value} to {status.value}")
+    compare_and_swap(db, session_obj, status=status, **values)
+
+
+def retry_on_conflict(work):
+    """
+    Re-runs a `work(db, *args)` unit of work from scratch when one of its
+    compare_and_swap() calls lost a race.
+    """
+    @functools.wraps(work)
+    def wrapper(db: Session, *args):
+        for _ in range(CAS_MAX_ATTEMPTS):
+            try:
+                return work(db, *args)
+            except StaleVersionError:
+                db.rollback()
+        raise HTTPException(409, "Session was modified concurrently, please retry")
+    return wrapper
@@ -0,0 +1,110 @@
+import os
+import threading
+import uuid
+from typing import BinaryIO
+
+from PIL import Image
+
+from srcs.config import SKETCH_CACHE_DIR, SKETCH_DPI
+from srcs.services.blob_store import blob_store
+
+# Sketch box of the Rajah Kasar (see PDFService.generate_rajah_kasar)
+SKETCH_BOX_INCHES = (5.5, 4)
+# Saved without chroma subsampling, so thin coloured lines stay sharp
+SKETCH_JPEG_QUALITY = 90
+
+
+def sketch_box_pixels(dpi: int) -> tuple[int, int]:
+    return round(SKETCH_BOX_INCHES[0] * dpi), round(SKETCH_BOX_INCHES[1] * dpi)
+
+
+def sketch_fits(src: str | BinaryIO, dpi: int) -> bool:
+    """Whether src is already a JPEG no larger than the sketch box at dpi (reads the header only)."""
+    with Image.open(src) as image:
+        max_w, max_h = sketch_box_pixels(dpi)
+        fits = image.format == "JPEG" and image.width <= max_w and image.height <= max_h
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return fits
+
+
+def prepare_sketch(src: str | BinaryIO, dest: str | BinaryIO, dpi: int, quality: int = SKETCH_JPEG_QUALITY):
+    """
+    Writes src scaled down to fit the sketch box at dpi and flattened onto
+    white to dest as JPEG. src and dest are paths or binary files.
+    """
+    max_size = sketch_box_pixels(dpi)
+    with Image.open(src) as image:
+        # JPEG decoders can scale down while decoding
+        image.draft("RGB", max_size)
+        image = image.convert("RGBA")
+    # Fits the box keeping the aspect ratio, never enlarges
+    image.thumbnail(max_size, Image.LANCZOS)
+    # Transparent canvas areas become the white of the sketch box
+    flat = Image.new("RGB", image.size, "white")
+    flat.paste(image, mask=image.getchannel("A"))
+    flat.save(dest, "JPEG", quality=quality, subsampling=0)
+
+
+class SketchResolver:
+    """
+    Sketches prepared for the PDFs: the uploaded image is decoded once, scaled
+    down to fit the sketch box at SKETCH_DPI, flattened onto white and stored
+    as JPEG, keyed by the blob SHA-256 of the upload. ReportLab embeds a JPEG
+    as is, while any other image (canvas PNGs) is decoded and deflated again
+    on every render. Every render of a case (single documents, bundles,
+    exports, worker processes) uses the prepared file.
+    """
+
+    def __init__(self, root: str = SKETCH_CACHE_DIR, dpi: int = SKETCH_DPI):
+        self.root = root
+        self.dpi = dpi
+        os.makedirs(self.root, exist_ok=True)
+        # Preparing is rare (once per sketch and resolution), one lock keeps it simple
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.prepared = 0
+
+    def path_for(self, sha256: str, dpi: int, quality: int) -> str:
+        return os.path.abspath(os.path.join(self.root, f"{sha256}_{dpi}dpi_q{quality}.jpg"))
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def resolve(self, sha256: str, dpi: int | None = None, quality: int = SKETCH_JPEG_QUALITY) -> str:
+        """
+        Path of the sketch of a blob prepared at dpi (default SKETCH_DPI) and
+        JPEG quality, preparing it on first use. Falls back to the original
+        blob if it cannot be read as an image.
+        """
+        dpi = dpi or self.dpi
+        path = self.path_for(sha256, dpi, quality)
+        if os.path.exists(path):
+            self._count("hits")
+            return path
+
+        with self._lock:
+            if os.path.exists(path):
+                self._count("hits")
+                return path
+            tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}.tmp")
+            try:
+                prepare_sketch(blob_store.path_for(sha256), tmp_path, dpi, quality)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Sketch {sha256} could not be prepared, embedding the upload as is: {e}")
+                return blob_store.path_for(sha256)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._count("prepared")
+        return path
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"hits": self.hits, "prepared": self.prepared, "dpi": self.dpi}
+
+
+sketch_resolver = SketchResolver()
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import threading
+import time
+
+from srcs.config import MAP_TILE_CACHE_PATH, MAP_TILE_CACHE_MAX_BYTES
+
+# Evicting frees down to this share of max_bytes, so a full cache does not evict on every put
+EVICT_TO_RATIO = 0.9
+
+
+class TileCache:
+    """
+    Map tiles on disk in an MBTiles-style SQLite file, shared by every scene
+    map render. A tile is keyed by its provider and z/x/y; rows are stored the
+    MBTiles way (TMS, y counted from the south). Tiles never change for a
+    provider, so entries are only ever evicted, least recently used first,
+    once the tiles take more than max_bytes.
+    """
+
+    def __init__(self, path: str = MAP_TILE_CACHE_PATH, max_bytes: int = MAP_TILE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared by the render threads, serialised by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            "provider TEXT NOT NULL, zoom_level INTEGER NOT NULL, tile_column INTEGER NOT NULL, "
+            "tile_row INTEGER NOT NULL, tile_data BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (provider, zoom_level, tile_column, tile_row))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_tiles_last_used ON tiles (last_used)")
+        self._lock = threading.Lock()
+        self.bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(provider: str, z: int, x: int, y: int) -> tuple:
+        return provider, z, x, (1 << z) - 1 - y
+
+    def get(self, provider: str, z: int, x: int, y: int) -> bytes | None:
+        """The encoded tile (as the provider served it), or None if it is not cached."""
+        key = self._key(provider, z, x, y)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tile_data FROM tiles WHERE provider = ? AND zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE tiles SET last_used = ? WHERE provider = ? AND zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (time.time(), *key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, provider: str, z: int, x: int, y: int, data: bytes):
+        key = self._key(provider, z, x, y)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT LENGTH(tile_data) FROM tiles WHERE provider = ? AND zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tiles (provider, zoom_level, tile_column, tile_row, tile_data, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, sqlite3.Binary(data), time.time())
+            )
+            self.bytes += len(data) - (previous[0] if previous else 0)
+            if self.bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICT_TO_RATIO))
+
+    def _evict(self, target_bytes: int):
+        # Caller holds the lock
+        while self.bytes > target_bytes:
+            rows = self._conn.execute(
+                "SELECT rowid, LENGTH(tile_data) FROM tiles ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for rowid, size in rows:
+                if self.bytes <= target_bytes:
+                    break
+                evicted.append((rowid,))
+                self.bytes -= size
+            self._conn.executemany("DELETE FROM tiles WHERE rowid = ?", evicted)
+            self.evictions += len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiles = self._conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "tiles": tiles,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+tile_cache = TileCache()
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from srcs.config import (
+    MAP_TILE_FETCH_WORKERS, MAP_TILE_HOST_CONNECTIONS, MAP_TILE_CONNECT_TIMEOUT, MAP_TILE_READ_TIMEOUT, MAP_TILE_RETRIES
+)
+
+
+class TileFetcher:
+    """
+    Downloads map tiles concurrently over one keep-alive requests.Session,
+    shared by every scene map render. Each host gets a pool of at most
+    host_connections connections; further requests to it wait for a free one
+    (pool_block) instead of opening more, so no render floods the provider.
+    Throttling and server errors are retried with backoff, and every request
+    has a connect and a read timeout.
+    """
+
+    def __init__(self, workers: int = MAP_TILE_FETCH_WORKERS, host_connections: int = MAP_TILE_HOST_CONNECTIONS,
+                 timeout: tuple[float, float] = (MAP_TILE_CONNECT_TIMEOUT, MAP_TILE_READ_TIMEOUT),
+                 retries: int = MAP_TILE_RETRIES):
+        self.workers = workers
+        self.host_connections = host_connections
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "mySettle"
+        retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_maxsize=host_connections, pool_block=True, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tiles")
+        self._stats_lock = threading.Lock()
+        self.downloads = 0
+        self.failures = 0
+        self.bytes = 0
+
+    def _fetch(self, url: str) -> bytes:
+        try:
+            res = self.session.get(url, timeout=self.timeout)
+            res.raise_for_status()
+        except requests.RequestException:
+            with self._stats_lock:
+                self.failures += 1
+            raise
+        with self._stats_lock:
+            self.downloads += 1
+            self.bytes += len(res.content)
+        return res.content
+
+    def fetch_all(self, urls: list[str]) -> list[bytes]:
+        """
+        The tiles at urls, in the same order, downloaded at the same time.
+        Raises the first failure; tiles not started yet are then skipped.
+        """
+        futures = [self._executor.submit(self._fetch, url) for url in urls]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "host_connections": self.host_connections,
+                "downloads": self.downloads,
+                "failures": self.failures,
+                "bytes": self.bytes
+            }
+
+
+tile_fetcher = TileFetcher()
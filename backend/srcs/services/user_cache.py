@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlmodel import Session
+
+from srcs.config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
+from srcs.models.user import User
+
+
+class UserCache:
+    """
+    Size-bounded LRU cache of User profiles with a TTL, shared by every route
+    and DB worker thread.
+
+    Entries are plain field dicts, not ORM instances: an instance belongs to the
+    session that loaded it, so each hit hands out a fresh detached User. Never
+    db.add() a cached user; load it with db.get() to modify it, then call
+    invalidate().
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, user_id: str | None) -> User | None:
+        if user_id is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return User(**entry[1])
+            self.misses += 1
+
+        user = db.get(User, user_id)
+        if user:
+            self.put(user)
+        return user
+
+    def put(self, user: User):
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user.model_dump())
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl
+            }
+
+
+user_cache = UserCache()
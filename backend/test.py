@@ -95,6 +95,20 @@ def sse_listener(session_id: str, user_name: str):
         log_action(user_name, "SSE", "RECEIVE", "Stream closed", "DISCONNECTED")
 
 
+def get_dashboard() -> list:
+    """
+    Every case on the police dashboard: the endpoint is paged, follow next_cursor to the end.
+    """
+    items = []
+    params = {"fields": "summary", "limit": 200}
+    while True:
+        page = client.get("/police/dashboard", params=params)
+        items.extend(page["items"])
+        if not page["next_cursor"]:
+            return items
+        params["cursor"] = page["next_cursor"]
+
+
 def run_tests():
     print(f"{Colors.BOLD}{'=' * 80}{Colors.END}")
     print(f"{Colors.BOLD}Running E2E Test Flow{Colors.END}")
@@ -228,7 +242,7 @@ def run_tests():
 
     # Check Dashboard (Should be PENDING_POLICE)
     log_action("Police", "GET", "SEND", "/police/dashboard", "PENDING")
-    dash_res = client.get("/police/dashboard")
+    dash_res = get_dashboard()
     found = any(s['id'] == session_id for s in dash_res)
     log_action("Police", "GET", "RECEIVE", f"Dashboard check (PENDING_POLICE): {found}", "SUCCESS" if found else "FAILED", dash_res)
 
@@ -240,7 +254,7 @@ def run_tests():
 
     # Check Dashboard (Should be MEETING_STARTED)
     log_action("Police", "GET", "SEND", "/police/dashboard", "PENDING")
-    dash_res = client.get("/police/dashboard")
+    dash_res = get_dashboard()
     found = any(s['id'] == session_id for s in dash_res)
     found_status = next((s['status'] for s in dash_res if s['id'] == session_id), None)
     log_action("Police", "GET", "RECEIVE", f"Dashboard check (MEETING_STARTED): {found}", "SUCCESS" if found else "FAILED", {"status": found_status})
@@ -295,7 +309,7 @@ def run_tests():
 
     # Check Dashboard (Should be POLICE_SIGNED)
     log_action("Police", "GET", "SEND", "/police/dashboard", "PENDING")
-    dash_res = client.get("/police/dashboard")
+    dash_res = get_dashboard()
     found = any(s['id'] == session_id for s in dash_res)
     found_status = next((s['status'] for s in dash_res if s['id'] == session_id), None)
     log_action("Police", "GET", "RECEIVE", f"Dashboard check (POLICE_SIGNED): {found}", "SUCCESS" if found else "FAILED", {"status": found_status})
@@ -321,7 +335,7 @@ def run_tests():
     
     # Check Dashboard (Should be COMPLETED)
     log_action("Police", "GET", "SEND", "/police/dashboard", "PENDING")
-    dash_res = client.get("/police/dashboard")
+    dash_res = get_dashboard()
     found = any(s['id'] == session_id for s in dash_res)
     found_status = next((s['status'] for s in dash_res if s['id'] == session_id), None)
     log_action("Police", "GET", "RECEIVE", f"Dashboard check (COMPLETED): {found}", "SUCCESS" if found else "FAILED", {"status": found_status})
@@ -10,11 +10,27 @@ const api = axios.create({
     },
 });
 
+// One page of GET /police/dashboard
+interface DashboardPage {
+    items: any[];
+    next_cursor: string | null;
+}
+
 export const reportService = {
     // Stage 3: Police Dashboard - List all sessions
+    // The endpoint is cursor-paginated; the table filters and searches on the
+    // client, so follow next_cursor until every page is loaded.
     getDashboard: async () => {
-        const response = await api.get('/police/dashboard');
-        return response.data;
+        const items: any[] = [];
+        let cursor: string | null = null;
+        do {
+            const response = await api.get<DashboardPage>('/police/dashboard', {
+                params: { fields: 'summary', limit: 200, ...(cursor ? { cursor } : {}) },
+            });
+            items.push(...response.data.items);
+            cursor = response.data.next_cursor;
+        } while (cursor);
+        return items;
     },
 
     // Get Session Details